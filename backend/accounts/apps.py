@@ -1,7 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .throttling import check_shared_cache
+        checks.register(check_shared_cache, checks.Tags.caches, deploy=True)
@@ -0,0 +1,64 @@
+"""
+Bounded thread pool for password hashing
+
+Login and registration hash a password, which takes tens to hundreds of
+milliseconds of CPU. Their async views run that work here, on at most
+``WORKERS`` threads per process, so a burst of logins queues up instead of
+taking every core (or, under ASGI, the single thread sync views share)
+from the other endpoints. Only under ASGI does the wait cost nothing; a
+WSGI server still parks one of its threads on each queued login. hashlib's PBKDF2 and scrypt and argon2-cffi
+release the GIL, so the pool hashes in parallel with other requests.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'QUEUE_SIZE': 64,
+}
+
+
+def _get_setting(name):
+    return getattr(settings, 'AUTH_POOL', {}).get(name, DEFAULTS[name])
+
+
+class AuthPoolBusy(Exception):
+    """More auth requests are waiting than the pool's QUEUE_SIZE"""
+
+
+_executor = ThreadPoolExecutor(max_workers=_get_setting('WORKERS'), thread_name_prefix='auth')
+_slots = threading.BoundedSemaphore(_get_setting('WORKERS') + _get_setting('QUEUE_SIZE'))
+
+
+def _run(func, *args, **kwargs):
+    # Pool threads outlive requests, so manage their connections the way
+    # Django does around each request
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_auth_pool(func, *args, **kwargs):
+    """Await ``func(*args, **kwargs)`` run on the auth pool
+
+    Raises AuthPoolBusy instead of queueing past QUEUE_SIZE.
+    """
+    if not _slots.acquire(blocking=False):
+        raise AuthPoolBusy()
+    try:
+        loop = asyncio.get_running_loop()
+        # Carry the request's context along, like sync_to_async does
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            _executor, functools.partial(context.run, _run, func, *args, **kwargs),
+        )
+    finally:
+        _slots.release()
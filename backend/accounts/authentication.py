@@ -0,0 +1,73 @@
+"""
+JWT authentication with cached user resolution
+
+simplejwt's ``JWTAuthentication`` verifies the token and then SELECTs the
+user on every request. ``CachedJWTAuthentication`` still verifies every
+token but keeps the resolved users in a bounded per-worker LRU, keyed by
+user id and token id, for ``TIMEOUT`` seconds. Entries are stamped with
+the user's version in the cache; saving or deleting a user bumps it (see
+``accounts.signals``).
+
+With a shared cache a deactivated user is refused on their next request in
+every worker. With a per-process cache only the worker that saved the user
+sees the bump, and the others may keep serving their cached copy for up to
+``TIMEOUT`` seconds, so keep it short. The stamps are never moved to the
+database: reading one there would cost as much as the SELECT it saves.
+"""
+import copy
+import time
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from courses.cache import LRUCache, bump_stamp, get_stamp
+
+DEFAULTS = {
+    'TIMEOUT': 10,
+    'MAXSIZE': 10000,
+}
+
+
+def _get_setting(name):
+    return getattr(settings, 'JWT_USER_CACHE', {}).get(name, DEFAULTS[name])
+
+
+_local = LRUCache(_get_setting('MAXSIZE'))
+
+
+def _stamp_key(user_id):
+    return f'auth_user_version:{user_id}'
+
+
+def invalidate_user(user_id):
+    """Drop every cached copy of a user in workers sharing the cache"""
+    bump_stamp(_stamp_key(user_id), database=False)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that skips the user SELECT for recently seen tokens"""
+
+    def get_user(self, validated_token):
+        timeout = _get_setting('TIMEOUT')
+        if timeout <= 0:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        key = (str(user_id), validated_token.get(api_settings.JTI_CLAIM))
+        # Read the stamp before the user so a concurrent save can't be missed
+        stamp = get_stamp(_stamp_key(user_id), database=False)
+        now = time.monotonic()
+        entry = _local.get(key)
+        if entry is not None and entry[0] == stamp and entry[1] > now:
+            user = entry[2]
+        else:
+            # Inactive and unknown users raise here and are never cached
+            user = super().get_user(validated_token)
+            _local.set(key, (stamp, now + timeout, user))
+        # Views get their own copy, so changes to request.user stay local
+        return copy.copy(user)
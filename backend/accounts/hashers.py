@@ -0,0 +1,56 @@
+"""
+Password hashers with work factors from settings.PASSWORD_HASHER_PARAMS
+
+Each keeps Django's algorithm name, so existing hashes still verify. When
+a stored hash's parameters differ from the configured ones, ``must_update``
+is true and Django rehashes the password on the user's next login. Use
+``manage.py tune_password_hasher`` to pick parameters for a target latency.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+DEFAULTS = {
+    'PBKDF2_ITERATIONS': hashers.PBKDF2PasswordHasher.iterations,
+    'SCRYPT_WORK_FACTOR': hashers.ScryptPasswordHasher.work_factor,
+    'ARGON2_TIME_COST': hashers.Argon2PasswordHasher.time_cost,
+    'ARGON2_MEMORY_COST': hashers.Argon2PasswordHasher.memory_cost,
+    'ARGON2_PARALLELISM': hashers.Argon2PasswordHasher.parallelism,
+}
+
+
+def get_param(name):
+    return getattr(settings, 'PASSWORD_HASHER_PARAMS', {}).get(name, DEFAULTS[name])
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return get_param('PBKDF2_ITERATIONS')
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return get_param('SCRYPT_WORK_FACTOR')
+
+    @property
+    def maxmem(self):
+        # scrypt needs 128 * r * N bytes; OpenSSL refuses over 32 MiB by default
+        return 2 * 128 * self.block_size * self.work_factor
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Needs ``pip install argon2-cffi``"""
+
+    @property
+    def time_cost(self):
+        return get_param('ARGON2_TIME_COST')
+
+    @property
+    def memory_cost(self):
+        return get_param('ARGON2_MEMORY_COST')
+
+    @property
+    def parallelism(self):
+        return get_param('ARGON2_PARALLELISM')
+
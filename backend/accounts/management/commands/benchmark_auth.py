@@ -0,0 +1,58 @@
+"""
+Management command to compare per-request JWT authentication overhead
+Run: python manage.py benchmark_auth --requests 2000
+
+Authenticates the same access token repeatedly with simplejwt's
+JWTAuthentication and with CachedJWTAuthentication, and reports the mean
+time and database queries per request. Run it against the real database:
+the saving is mostly the user SELECT's round trip.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import CachedJWTAuthentication
+
+
+class Command(BaseCommand):
+    help = 'Measure JWT authentication time and queries per request, stock vs cached'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--email', help='User to authenticate as (default: first active user)')
+
+    def measure(self, authentication, request, count):
+        start = time.perf_counter()
+        for _ in range(count):
+            authentication.authenticate(request)
+        elapsed = time.perf_counter() - start
+        # Counted in a separate pass; capturing queries slows them down
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(100):
+                authentication.authenticate(request)
+        return elapsed / count * 1e6, len(queries) / 100
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(is_active=True)
+        if options['email']:
+            users = users.filter(email=options['email'])
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No active user to authenticate as')
+
+        token = AccessToken.for_user(user)
+        request = Request(APIRequestFactory().get('/api/user/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+        count = options['requests']
+        for name, authentication in (('JWTAuthentication', JWTAuthentication()),
+                                     ('CachedJWTAuthentication', CachedJWTAuthentication())):
+            authentication.authenticate(request)  # warm up
+            micros, queries = self.measure(authentication, request, count)
+            self.stdout.write(f'{name:<24} {micros:8.1f} us/request  {queries:.2f} queries/request')
+        self.stdout.write(self.style.SUCCESS(f'Authenticated {count} requests with each class'))
@@ -0,0 +1,92 @@
+"""
+Management command to measure catalogue latency during a burst of logins
+Run: python manage.py benchmark_login_storm --url http://localhost:8000 --logins 200
+
+Against a running server: registers a throwaway user, times GET /api/courses/
+on its own, then again while --concurrency clients log in as fast as they
+can, and prints the latency percentiles of both runs. Start the server
+with THROTTLE_ENABLED=0, or most of the logins will be throttled.
+"""
+import json
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _post(url, payload):
+    request = Request(url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+    try:
+        with urlopen(request) as response:
+            return response.status
+    except HTTPError as e:
+        return e.code
+
+
+def _timed_get(url):
+    start = time.perf_counter()
+    with urlopen(url) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def _summary(latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return f'p50 {statistics.median(latencies):7.1f} ms  p95 {p95:7.1f} ms  max {latencies[-1]:7.1f} ms'
+
+
+class Command(BaseCommand):
+    help = 'Compare catalogue latency with and without concurrent logins against a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--samples', type=int, default=50, help='Catalogue requests per run')
+
+    def handle(self, *args, **options):
+        base = options['url'].rstrip('/')
+        catalogue = f'{base}/api/courses/'
+        suffix = uuid.uuid4().hex[:12]
+        credentials = {'email': f'storm-{suffix}@example.com', 'password': f'Storm-{suffix}!'}
+        status = _post(f'{base}/api/register/', {
+            **credentials, 'username': f'storm-{suffix}', 'password2': credentials['password'],
+        })
+        if status != 201:
+            raise CommandError(f'Registering the test user failed with HTTP {status}')
+
+        _timed_get(catalogue)  # warm up
+        baseline = [_timed_get(catalogue) for _ in range(options['samples'])]
+
+        statuses = []
+        done = threading.Event()
+
+        def storm():
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                statuses.extend(pool.map(
+                    lambda _: _post(f'{base}/api/login/', credentials), range(options['logins']),
+                ))
+            done.set()
+
+        start = time.perf_counter()
+        threading.Thread(target=storm, daemon=True).start()
+        during = []
+        while not done.is_set() or len(during) < options['samples']:
+            during.append(_timed_get(catalogue))
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f'catalogue alone        {_summary(baseline)}')
+        self.stdout.write(f'catalogue during storm {_summary(during)}')
+        ok = statuses.count(200)
+        self.stdout.write(
+            f'{ok}/{len(statuses)} logins succeeded ({statuses.count(503)} shed with 503, '
+            f'{statuses.count(429)} throttled), '
+            f'{len(statuses) / elapsed:.1f} logins/s'
+        )
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,20 @@
+"""
+Management command to delete revoked refresh tokens that have expired
+Run: python manage.py purge_revoked_tokens
+
+Workers already purge in the background every PURGE_INTERVAL; this is for
+cron when few refreshes happen.
+"""
+from django.core.management.base import BaseCommand
+from accounts.revocation import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired rows from the refresh-token revocation table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired revoked tokens'))
@@ -0,0 +1,69 @@
+"""
+Management command to pick password hasher parameters for a target latency
+Run: python manage.py tune_password_hasher --target-ms 250
+
+Times the preferred hasher (PASSWORD_HASHER) on this machine and prints the
+settings that bring one hash closest to the target without exceeding it.
+Run it on the production hardware; hashes made with the old parameters
+are upgraded on each user's next login.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from accounts.hashers import get_param
+
+# Setting tuned per algorithm, its lower bound, and the next value to try
+TUNED_PARAMS = {
+    'pbkdf2_sha256': ('PBKDF2_ITERATIONS', 10000, lambda value: int(value * 1.25)),
+    'scrypt': ('SCRYPT_WORK_FACTOR', 2 ** 10, lambda value: value * 2),
+    'argon2': ('ARGON2_TIME_COST', 1, lambda value: value + 1),
+}
+
+
+class Command(BaseCommand):
+    help = 'Suggest password hasher parameters that make one hash take about --target-ms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250)
+        parser.add_argument('--rounds', type=int, default=3, help='Hashes timed per candidate (best is kept)')
+
+    def time_hash(self, name, value, rounds):
+        params = {**getattr(settings, 'PASSWORD_HASHER_PARAMS', {}), name: value}
+        with override_settings(PASSWORD_HASHER_PARAMS=params):
+            hasher = get_hasher()
+            best = None
+            for _ in range(rounds):
+                start = time.perf_counter()
+                hasher.encode('correct horse battery staple', hasher.salt())
+                elapsed = (time.perf_counter() - start) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        hasher = get_hasher()
+        if hasher.algorithm not in TUNED_PARAMS:
+            raise CommandError(f'No tunable parameter for {hasher.algorithm}')
+        if hasher.library:
+            try:
+                hasher._load_library()
+            except ValueError as e:
+                raise CommandError(str(e))
+        name, value, step = TUNED_PARAMS[hasher.algorithm]
+        target = options['target_ms']
+
+        chosen, chosen_ms = value, self.time_hash(name, value, options['rounds'])
+        self.stdout.write(f'{name}={value}: {chosen_ms:.1f} ms')
+        while chosen_ms < target:
+            value = step(value)
+            elapsed = self.time_hash(name, value, options['rounds'])
+            self.stdout.write(f'{name}={value}: {elapsed:.1f} ms')
+            if elapsed > target:
+                break
+            chosen, chosen_ms = value, elapsed
+
+        self.stdout.write(f'Currently {name}={get_param(name)}')
+        self.stdout.write(self.style.SUCCESS(f'Set {name}={chosen} in .env ({chosen_ms:.1f} ms per hash)'))
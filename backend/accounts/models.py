@@ -16,3 +16,13 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+
+
+class RevokedToken(models.Model):
+    """A refresh token id that may no longer be used, kept until the token expires"""
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
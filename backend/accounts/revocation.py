@@ -0,0 +1,188 @@
+"""
+Refresh-token revocation
+
+Rotating a refresh token records its id (``jti``) in ``RevokedToken``
+until the token would have expired. Every refresh costs that one INSERT;
+its unique constraint decides races, so a token can only be rotated once
+even if two workers see it at the same time.
+
+Lookups go through a per-worker Bloom filter of the revoked ids instead of
+the table. A miss (the common case) needs no query; a hit is confirmed with
+one, so false positives never refuse a valid token. The filter picks up
+other workers' revocations every ``SYNC_INTERVAL`` seconds, reading only
+rows added since its last sync. Expired rows are purged, and the filter
+rebuilt without them, in a background thread every ``PURGE_INTERVAL``
+seconds (or with ``manage.py purge_revoked_tokens``).
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+DEFAULTS = {
+    'CAPACITY': 1000000,
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 5,
+    'PURGE_INTERVAL': 60 * 60,
+}
+
+
+def _get_setting(name):
+    return getattr(settings, 'REFRESH_TOKEN_REVOCATION', {}).get(name, DEFAULTS[name])
+
+
+def _expiry(exp):
+    expires_at = datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+    return expires_at if settings.USE_TZ else timezone.make_naive(expires_at)
+
+
+class BloomFilter:
+    """Fixed-size set of strings with no false negatives"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        positions = self._positions(key)
+        # Setting a bit is a read-modify-write; concurrent adds could lose one
+        with self.lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationFilter:
+    """Bloom filter of unexpired revoked ids, synced from RevokedToken"""
+
+    def __init__(self):
+        self.bloom = None
+        self.last_id = 0
+        self.synced_at = None
+        self.lock = threading.Lock()
+
+    def _load(self, bloom, last_id):
+        rows = (
+            RevokedToken.objects
+            .filter(pk__gt=last_id, expires_at__gt=timezone.now())
+            .order_by('pk')
+            .values_list('pk', 'jti')
+        )
+        for pk, jti in rows.iterator(chunk_size=5000):
+            bloom.add(jti)
+            last_id = pk
+        return last_id
+
+    def _is_fresh(self):
+        return self.synced_at is not None and time.monotonic() - self.synced_at < _get_setting('SYNC_INTERVAL')
+
+    def sync(self):
+        """Add rows revoked by other workers, at most every SYNC_INTERVAL"""
+        if self._is_fresh():
+            return
+        with self.lock:
+            if self._is_fresh():
+                return
+            if self.bloom is None:
+                self.bloom = BloomFilter(_get_setting('CAPACITY'), _get_setting('ERROR_RATE'))
+            self.last_id = self._load(self.bloom, self.last_id)
+            self.synced_at = time.monotonic()
+
+    def rebuild(self):
+        """Reload from the table, dropping expired ids and growing if full"""
+        count = RevokedToken.objects.filter(expires_at__gt=timezone.now()).count()
+        bloom = BloomFilter(max(_get_setting('CAPACITY'), count * 2), _get_setting('ERROR_RATE'))
+        last_id = self._load(bloom, 0)
+        with self.lock:
+            # Rows added meanwhile have larger ids and come in with the next sync
+            self.bloom = bloom
+            self.last_id = last_id
+            self.synced_at = time.monotonic()
+
+    def add(self, jti):
+        bloom = self.bloom
+        if bloom is not None:
+            bloom.add(jti)
+
+    def __contains__(self, jti):
+        self.sync()
+        return jti in self.bloom
+
+
+_filter = RevocationFilter()
+_purge = {'at': time.monotonic(), 'lock': threading.Lock()}
+
+
+def is_revoked(jti):
+    """Whether a refresh token id has been revoked"""
+    if jti not in _filter:
+        return False
+    # A Bloom filter hit may be a false positive
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def revoke(jti, exp):
+    """Revoke a token id until its ``exp`` timestamp; False if already revoked"""
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=_expiry(exp))
+    except IntegrityError:
+        return False
+    _filter.add(jti)
+    _schedule_purge()
+    return True
+
+
+def purge_expired(batch_size=10000):
+    """Delete expired rows in batches; returns how many were deleted"""
+    deleted = 0
+    while True:
+        ids = list(
+            RevokedToken.objects
+            .filter(expires_at__lte=timezone.now())
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += RevokedToken.objects.filter(pk__in=ids).delete()[0]
+
+
+def _purge_in_background():
+    try:
+        purge_expired()
+        _filter.rebuild()
+    finally:
+        # The thread opened its own connection
+        connection.close()
+
+
+def _schedule_purge():
+    now = time.monotonic()
+    if now - _purge['at'] < _get_setting('PURGE_INTERVAL'):
+        return
+    with _purge['lock']:
+        if now - _purge['at'] < _get_setting('PURGE_INTERVAL'):
+            return
+        _purge['at'] = now
+    threading.Thread(target=_purge_in_background, name='purge-revoked-tokens', daemon=True).start()
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
 from .models import User
+from .tokens import RevocableRefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -71,3 +73,7 @@ class LoginSerializer(serializers.Serializer):
         
         return attrs
 
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """Refresh serializer that rotates through the revocation store"""
+    token_class = RevocableRefreshToken
@@ -0,0 +1,17 @@
+"""
+Cache invalidation signals for the accounts app
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    user_id = instance.pk
+    invalidate_user(user_id)
+    # Again after commit, in case a request recached the old row meanwhile
+    transaction.on_commit(lambda: invalidate_user(user_id))
@@ -0,0 +1,159 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import revocation, throttling
+from .models import RevokedToken
+from .tokens import RevocableRefreshToken
+
+User = get_user_model()
+
+
+class RefreshRotationTests(APITestCase):
+    """Rotated refresh tokens are revoked, and checked through the Bloom filter"""
+
+    def setUp(self):
+        # A fresh filter per test, as the test database is rolled back
+        patcher = mock.patch.object(revocation, '_filter', revocation.RevocationFilter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email='student@example.com', username='student', password='pw-12345')
+
+    def refresh(self, token):
+        return self.client.post('/api/token/refresh/', {'refresh': str(token)}, format='json')
+
+    def test_rotation(self):
+        first = RevocableRefreshToken.for_user(self.user)
+        response = self.refresh(first)
+        self.assertEqual(response.status_code, 200, response.content)
+        second = response.data['refresh']
+        self.assertNotEqual(second, str(first))
+        # The rotated token can't be used again; the new one can
+        self.assertEqual(self.refresh(first).status_code, 401)
+        self.assertEqual(self.refresh(second).status_code, 200)
+
+    def test_refresh_queries(self):
+        token = RevocableRefreshToken.for_user(self.user)
+        revocation._filter.sync()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh(token).status_code, 200)
+        # The Bloom filter answers the lookup; only the revocation is written
+        statements = [query['sql'] for query in queries if query['sql'].startswith(('SELECT', 'INSERT', 'UPDATE'))]
+        self.assertEqual(len(statements), 1, statements)
+        self.assertTrue(statements[0].startswith('INSERT'))
+
+    def test_revoked_by_another_worker(self):
+        token = RevocableRefreshToken.for_user(self.user)
+        revocation._filter.sync()
+        RevokedToken.objects.create(jti=token['jti'], expires_at=timezone.now() + timedelta(days=1))
+        # Before this worker's filter syncs, the INSERT's unique constraint refuses it
+        self.assertEqual(self.refresh(token).status_code, 401)
+        # After, the filter does
+        with self.settings(REFRESH_TOKEN_REVOCATION={'SYNC_INTERVAL': 0}):
+            self.assertTrue(revocation.is_revoked(token['jti']))
+
+    def test_bloom_filter(self):
+        bloom = revocation.BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'revoked-{i}')
+        self.assertTrue(all(f'revoked-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'valid-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_false_positive_is_confirmed(self):
+        revocation._filter.sync()
+        with mock.patch.object(revocation.BloomFilter, '__contains__', return_value=True):
+            self.assertFalse(revocation.is_revoked('never-revoked'))
+
+    def test_purge(self):
+        RevokedToken.objects.create(jti='expired', expires_at=timezone.now() - timedelta(seconds=1))
+        RevokedToken.objects.create(jti='current', expires_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(revocation.purge_expired(batch_size=1), 1)
+        revocation._filter.rebuild()
+        self.assertTrue(revocation.is_revoked('current'))
+        self.assertFalse(revocation.is_revoked('expired'))
+
+
+THROTTLE = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'LOCAL_MAXSIZE': 100,
+    'POLICIES': {
+        'login': {'ip': '5/min', 'user': '2/min'},
+        'register': {'ip': '3/hour'},
+    },
+}
+
+
+@override_settings(THROTTLE=THROTTLE)
+class ThrottleTests(APITestCase):
+    """Token buckets refuse with 429 and Retry-After, and refill over time"""
+
+    def setUp(self):
+        cache.clear()
+        throttling._blocked.clear()
+
+    def login(self, email, **extra):
+        return self.client.post('/api/login/', {'email': email, 'password': 'wrong'}, format='json', **extra)
+
+    def test_login_buckets(self):
+        self.assertEqual([self.login('a@example.com').status_code for _ in range(3)], [400, 400, 429])
+        # The account bucket ignores case and spaces
+        response = self.login(' A@example.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertIn('detail', response.json())
+        # Other accounts share the address's bucket, which refused requests didn't drain
+        self.assertEqual([self.login(f'{i}@example.com').status_code for i in range(4)], [400, 400, 400, 429])
+        # Another address has its own
+        self.assertEqual(self.login('b@example.com', REMOTE_ADDR='10.0.0.9').status_code, 400)
+
+    def test_refill(self):
+        request = RequestFactory().post('/api/register/')
+        now = 1000.0
+        with mock.patch.object(throttling, 'time') as clock:
+            clock.time.side_effect = lambda: now
+            self.assertEqual([throttling.check('register', request) for _ in range(3)], [None] * 3)
+            self.assertAlmostEqual(throttling.check('register', request), 1200)
+            # One token every 20 minutes
+            now += 1199
+            self.assertAlmostEqual(throttling.check('register', request), 1)
+            now += 1
+            self.assertIsNone(throttling.check('register', request))
+            self.assertAlmostEqual(throttling.check('register', request), 1200)
+            # An idle bucket refills to its capacity, not beyond
+            now += 10 ** 5
+            self.assertEqual([throttling.check('register', request) is None for _ in range(4)], [True] * 3 + [False])
+
+    def test_disabled(self):
+        with self.settings(THROTTLE={**THROTTLE, 'ENABLED': False}):
+            self.assertEqual({self.login('a@example.com').status_code for _ in range(5)}, {400})
+
+
+class ThrottleCacheCheckTests(APITestCase):
+    """accounts.W001 flags per-process throttle caches at deployment"""
+
+    def test_per_process_cache(self):
+        with self.settings(THROTTLE=THROTTLE):
+            self.assertEqual([error.id for error in throttling.check_shared_cache(None)], ['accounts.W001'])
+            ids = {error.id for error in checks.run_checks(include_deployment_checks=True)}
+            self.assertIn('accounts.W001', ids)
+            self.assertNotIn('accounts.W001', {error.id for error in checks.run_checks()})
+
+    def test_shared_cache(self):
+        shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'throttle_cache'}
+        with self.settings(CACHES={**settings.CACHES, 'shared': shared}, THROTTLE={**THROTTLE, 'CACHE_ALIAS': 'shared'}):
+            self.assertEqual(throttling.check_shared_cache(None), [])
+
+    def test_disabled(self):
+        with self.settings(THROTTLE={**THROTTLE, 'ENABLED': False}):
+            self.assertEqual(throttling.check_shared_cache(None), [])
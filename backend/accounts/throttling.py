@@ -0,0 +1,187 @@
+"""
+Token-bucket rate limits for expensive endpoints
+
+Each policy in ``THROTTLE['POLICIES']`` maps scopes to rates: ``"ip"``
+buckets are per client address (see ``NUM_PROXIES`` in REST_FRAMEWORK) and
+``"user"`` buckets per account. A rate of ``"N/period"`` lets a client
+burst N requests and refills N tokens per period.
+
+Buckets live in the cache as a start time plus a counter of tokens taken
+since, so a token costs one ``incr``. With a shared cache whose ``incr`` is
+atomic (Redis, Memcached), workers never overwrite each other's updates.
+A per-process cache gives every worker its own buckets, so a client gets
+the configured rate once per worker; the ``accounts.W001`` deployment
+check (``manage.py check --deploy``) warns about that. A client turned away is remembered in a
+per-worker LRU until its next token is due, so an abusive client is
+refused without touching the shared cache at all.
+"""
+import hashlib
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+from courses.cache import IN_PROCESS_CACHES, LRUCache
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'LOCAL_MAXSIZE': 10000,
+    'POLICIES': {},
+}
+SCOPES = ('ip', 'user')
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def _get_setting(name):
+    return getattr(settings, 'THROTTLE', {}).get(name, DEFAULTS[name])
+
+
+# Bucket key -> time its next token is due, for clients recently refused
+_blocked = LRUCache(_get_setting('LOCAL_MAXSIZE'))
+
+
+def _shared_cache():
+    return caches[_get_setting('CACHE_ALIAS')]
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """System check: throttle buckets should live in a cache all workers share"""
+    if not _get_setting('ENABLED') or not isinstance(_shared_cache(), IN_PROCESS_CACHES):
+        return []
+    return [checks.Warning(
+        f"THROTTLE['CACHE_ALIAS'] ({_get_setting('CACHE_ALIAS')!r}) is a per-process cache, so each worker "
+        "keeps its own throttle buckets and clients get the configured rates once per worker.",
+        hint='Point it at a cache shared between workers, such as Redis or Memcached.',
+        id='accounts.W001',
+    )]
+
+
+def parse_rate(rate):
+    """``"10/min"`` -> ``(10, 60)``: bucket capacity and refill period in seconds"""
+    try:
+        num, period = rate.split('/')
+        return int(num), PERIODS[period[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f'Invalid throttle rate {rate!r}, expected e.g. "10/min"')
+
+
+def _buckets(policy, request, user):
+    """``(key, capacity, period)`` of each of ``policy``'s buckets this request draws on"""
+    if not _get_setting('ENABLED'):
+        return []
+    idents = {'ip': BaseThrottle().get_ident(request), 'user': user}
+    buckets = []
+    for scope, rate in _get_setting('POLICIES').get(policy, {}).items():
+        if scope not in SCOPES:
+            raise ImproperlyConfigured(f'Unknown throttle scope {scope!r} in policy {policy!r}')
+        if not rate or idents[scope] is None:
+            continue
+        # Idents can be anything a client sends; hash them into safe keys
+        digest = hashlib.md5(str(idents[scope]).encode()).hexdigest()
+        buckets.append((f'throttle:{policy}:{scope}:{digest}', *parse_rate(rate)))
+    return buckets
+
+
+def _local_wait(buckets, now):
+    waits = [_blocked.get(key, 0) - now for key, _capacity, _period in buckets]
+    wait = max(waits, default=0)
+    return wait if wait > 0 else None
+
+
+def _take(cache, key, capacity, period, now):
+    """Take a token from the bucket at ``key``
+
+    Returns ``(wait, counter)``: the seconds until a token is due if the
+    bucket is empty (else None) and the counter key a token was taken from.
+    """
+    interval = period / capacity
+    timeout = 2 * math.ceil(period)
+    base = cache.get(key)
+    if base is not None:
+        counter = f'{key}:{base}'
+        try:
+            taken = cache.incr(counter)
+        except ValueError:
+            taken = None
+        if taken is not None and base + (taken - 1) * interval >= now:
+            wait = base + (taken - capacity) * interval - now
+            if wait > 0:
+                _refund(cache, counter)
+                return wait, None
+            if now - base > period:
+                # Move the start up so the keys don't expire under a
+                # client that keeps the bucket drained
+                counter = f'{key}:{now}'
+                cache.set(counter, math.ceil(taken - (now - base) / interval), timeout)
+                cache.set(key, now, timeout)
+            return None, counter
+    # New, expired or completely refilled bucket: start it full
+    counter = f'{key}:{now}'
+    cache.set(counter, 1, timeout)
+    cache.set(key, now, timeout)
+    return None, counter
+
+
+def _refund(cache, counter):
+    try:
+        cache.decr(counter)
+    except ValueError:
+        pass
+
+
+def check(policy, request, user=None):
+    """Take a token from each of ``policy``'s buckets for this request
+
+    ``user`` identifies the account for ``"user"`` scopes; they're skipped
+    when it's None. Returns the seconds to wait if any bucket is empty, in
+    which case no token is taken, else None.
+    """
+    buckets = _buckets(policy, request, user)
+    now = time.time()
+    wait = _local_wait(buckets, now)
+    if wait is not None:
+        return wait
+    cache = _shared_cache()
+    counters = []
+    for key, capacity, period in buckets:
+        wait, counter = _take(cache, key, capacity, period, now)
+        if wait is not None:
+            _blocked.set(key, now + wait)
+            for counter in counters:
+                _refund(cache, counter)
+            return wait
+        counters.append(counter)
+    return None
+
+
+async def acheck(policy, request, user=None):
+    """``check`` for async views"""
+    if isinstance(_shared_cache(), IN_PROCESS_CACHES):
+        return check(policy, request, user)
+    wait = _local_wait(_buckets(policy, request, user), time.time())
+    if wait is not None:
+        return wait
+    return await sync_to_async(check)(policy, request, user)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """DRF throttle drawing on the buckets of ``policy``"""
+    policy = None
+
+    @classmethod
+    def for_policy(cls, policy):
+        return type(f'{policy.title().replace("_", "")}Throttle', (cls,), {'policy': policy})
+
+    def allow_request(self, request, view):
+        user = request.user.pk if request.user and request.user.is_authenticated else None
+        self._wait = check(self.policy, request, user)
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
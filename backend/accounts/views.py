@@ -1,83 +1,141 @@
+import functools
+import io
+
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import ParseError, Throttled
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from courses.parsers import FastJSONParser
+from courses.renderers import FastJSONRenderer
+from .auth_pool import AuthPoolBusy, run_in_auth_pool
+from .throttling import acheck
 from .serializers import RegisterSerializer, LoginSerializer, UserSerializer
+from .tokens import RevocableRefreshToken
 
 User = get_user_model()
 
 
 def get_tokens_for_user(user):
     """Generate JWT tokens for user"""
-    refresh = RefreshToken.for_user(user)
+    refresh = RevocableRefreshToken.for_user(user)
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
     }
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def register_view(request):
+def format_errors(serializer_errors):
+    """Format validation errors for better frontend display"""
+    errors = {}
+    for field, error_list in serializer_errors.items():
+        if isinstance(error_list, list):
+            errors[field] = error_list[0] if error_list else 'Invalid value'
+        else:
+            errors[field] = str(error_list)
+    return errors
+
+
+def json_response(payload, status=status.HTTP_200_OK, headers=None):
+    """Response rendered by the API's JSON renderer, like a DRF view's"""
+    return HttpResponse(
+        FastJSONRenderer().render(payload), status=status, headers=headers,
+        content_type=FastJSONRenderer.media_type,
+    )
+
+
+def throttled_response(wait):
+    """429 response for a throttled request, as DRF answers it"""
+    exc = Throttled(wait)
+    return json_response({'detail': str(exc.detail)}, status=exc.status_code, headers={'Retry-After': '%d' % exc.wait})
+
+
+def auth_pool_view(policy, user_field=None):
+    """Async JSON POST view whose sync body runs on the auth pool
+
+    DRF 3.14 can't run async views, so these are plain Django views that
+    answer like the DRF ones. Requests are throttled by ``policy``, with
+    ``data[user_field]`` as the account for per-user buckets.
+    ``view(data, request)`` returns ``(payload, status)``.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request):
+            if request.method != 'POST':
+                return json_response(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED, headers={'Allow': 'POST'},
+                )
+            if request.content_type == 'application/json':
+                try:
+                    data = FastJSONParser().parse(io.BytesIO(request.body or b'{}'))
+                except ParseError as e:
+                    return json_response({'detail': str(e.detail)}, status=e.status_code)
+            else:
+                data = request.POST
+            user = data.get(user_field) if user_field and isinstance(data, dict) else None
+            wait = await acheck(policy, request, user=str(user).strip().lower() if user else None)
+            if wait is not None:
+                return throttled_response(wait)
+            try:
+                payload, response_status = await run_in_auth_pool(view, data, request)
+            except AuthPoolBusy:
+                return json_response(
+                    {'error': 'Too many sign-in requests, please try again shortly'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'},
+                )
+            return json_response(payload, status=response_status)
+
+        # Token auth only, like DRF's views (csrf_exempt isn't async-aware in 4.2)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+@auth_pool_view('register')
+def register_view(data, request):
     """User Registration API"""
-    serializer = RegisterSerializer(data=request.data)
+    serializer = RegisterSerializer(data=data)
     if serializer.is_valid():
         try:
             user = serializer.save()
             tokens = get_tokens_for_user(user)
-            return Response({
+            return {
                 'user': UserSerializer(user).data,
                 'tokens': tokens,
                 'message': 'Registration successful'
-            }, status=status.HTTP_201_CREATED)
+            }, status.HTTP_201_CREATED
         except Exception as e:
-            return Response({
+            return {
                 'error': str(e),
                 'message': 'Registration failed'
-            }, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Format validation errors for better frontend display
-    errors = {}
-    for field, error_list in serializer.errors.items():
-        if isinstance(error_list, list):
-            errors[field] = error_list[0] if error_list else 'Invalid value'
-        else:
-            errors[field] = str(error_list)
-    
-    return Response({
-        'errors': errors,
+            }, status.HTTP_400_BAD_REQUEST
+
+    return {
+        'errors': format_errors(serializer.errors),
         'message': 'Validation failed'
-    }, status=status.HTTP_400_BAD_REQUEST)
+    }, status.HTTP_400_BAD_REQUEST
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def login_view(request):
+@auth_pool_view('login', user_field='email')
+def login_view(data, request):
     """User Login API"""
-    serializer = LoginSerializer(data=request.data, context={'request': request})
+    serializer = LoginSerializer(data=data, context={'request': request})
     if serializer.is_valid():
         user = serializer.validated_data['user']
         tokens = get_tokens_for_user(user)
-        return Response({
+        return {
             'user': UserSerializer(user).data,
             'tokens': tokens,
             'message': 'Login successful'
-        }, status=status.HTTP_200_OK)
-    
-    # Format validation errors for better frontend display
-    errors = {}
-    for field, error_list in serializer.errors.items():
-        if isinstance(error_list, list):
-            errors[field] = error_list[0] if error_list else 'Invalid value'
-        else:
-            errors[field] = str(error_list)
-    
-    return Response({
-        'errors': errors,
+        }, status.HTTP_200_OK
+
+    return {
+        'errors': format_errors(serializer.errors),
         'message': 'Login failed'
-    }, status=status.HTTP_400_BAD_REQUEST)
+    }, status.HTTP_400_BAD_REQUEST
 
 
 @api_view(['GET'])
@@ -86,4 +144,3 @@ def user_view(request):
     """Get logged-in user details"""
     serializer = UserSerializer(request.user)
     return Response(serializer.data, status=status.HTTP_200_OK)
-
@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import Course, PDF, Quiz, Question, Choice, QuizAttempt
+from django.contrib import admin, messages
+from .ingestion import ingest_pdfs
+from .models import Course, PDF, Quiz, Question, Choice, QuizAttempt, AttemptAnswer
 
 
 @admin.register(Course)
@@ -12,9 +13,18 @@ class CourseAdmin(admin.ModelAdmin):
 
 @admin.register(PDF)
 class PDFAdmin(admin.ModelAdmin):
-    list_display = ('title', 'course', 'filename', 'is_active', 'created_at')
+    list_display = ('title', 'course', 'filename', 'page_count', 'file_size', 'is_active', 'created_at')
     list_filter = ('course', 'is_active', 'created_at')
     search_fields = ('title', 'filename')
+    readonly_fields = ('file_size', 'page_count', 'content_hash', 'thumbnail', 'ingested_at')
+    actions = ['reingest']
+    
+    @admin.action(description='Re-ingest selected PDFs (metadata, text, thumbnail)')
+    def reingest(self, request, queryset):
+        file_paths = queryset.values_list('file_path', flat=True)
+        report = ingest_pdfs(file_paths=file_paths, force=True)
+        level = messages.WARNING if report.errors else messages.SUCCESS
+        self.message_user(request, f'Ingestion finished: {report}', level)
 
 
 class ChoiceInline(admin.TabularInline):
@@ -36,9 +46,19 @@ class QuizAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description')
 
 
+class AttemptAnswerInline(admin.TabularInline):
+    model = AttemptAnswer
+    extra = 0
+    readonly_fields = ('question', 'choice', 'is_correct')
+    can_delete = False
+
+
 @admin.register(QuizAttempt)
 class QuizAttemptAdmin(admin.ModelAdmin):
     list_display = ('user', 'quiz', 'score', 'total_questions', 'completed_at')
     list_filter = ('quiz', 'completed_at')
     readonly_fields = ('completed_at',)
+    list_select_related = ('user', 'quiz')
+    show_full_result_count = False
+    inlines = [AttemptAnswerInline]
 
@@ -0,0 +1,115 @@
+"""
+Async variants of the public catalogue endpoints
+
+Served instead of the DRF views when ``ASYNC_READ_API`` is on, for ASGI
+deployments (see the README). They run the same queries as the sync
+views, the lists through the async ORM and the detail serializers in one
+thread hop, and answer with the same JSON bytes, ETags and cached
+responses, so clients can't tell the two apart. DRF 3.14 can't run
+async views, so these are plain Django views that use DRF's serializers,
+pagination and JSON renderer directly; they don't offer the browsable API.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from pycoder_backend.routers import read_from_replica
+
+from .cache import CATALOGUE_STAMP_QUERIES
+from .conditional import conditional_get
+from .fast_serializers import course_detail_data, quiz_detail_data
+from .instrumentation import query_budget
+from .models import Course, PDF, Quiz, Question, Choice
+from .pagination import CreatedAtCursorPagination
+from .queries import course_list_queryset, pdf_list_queryset, quiz_list_queryset
+from .renderers import FastJSONRenderer
+from .response_cache import cached_response, course_group
+from .serializers import CourseListSerializer, PDFSerializer, QuizListSerializer
+
+
+def json_response(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def not_found():
+    return json_response({'detail': NotFound.default_detail}, status=404)
+
+
+def require_safe(view):
+    """Async-aware ``require_safe`` (Django's isn't until 5.0), answering like DRF"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            response['Allow'] = 'GET, HEAD'
+            return response
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def paginated_response(request, queryset, serializer_class):
+    paginator = CreatedAtCursorPagination()
+    page = await paginator.apaginate_queryset(queryset, Request(request))
+    data = serializer_class(page, many=True).data
+    return json_response(paginator.get_paginated_response(data).data)
+
+
+@query_budget(2 + CATALOGUE_STAMP_QUERIES)
+@read_from_replica
+@require_safe
+@conditional_get(Course, PDF, Quiz, Question)
+@cached_response(lambda request: 'courses')
+async def course_list_view(request):
+    """Get all courses"""
+    return await paginated_response(request, course_list_queryset(), CourseListSerializer)
+
+
+@query_budget(4 + CATALOGUE_STAMP_QUERIES)
+@read_from_replica
+@require_safe
+@conditional_get(Course, PDF, Quiz, Question)
+@cached_response(lambda request, slug: f'course:{slug}')
+async def course_detail_view(request, slug):
+    """Get a course with its PDFs and quizzes"""
+    data = await sync_to_async(course_detail_data)(slug)
+    if data is None:
+        return not_found()
+    return json_response(data)
+
+
+@query_budget(2 + CATALOGUE_STAMP_QUERIES)
+@read_from_replica
+@require_safe
+@conditional_get(PDF, Course)
+@cached_response(lambda request: f'pdfs:{course_group(request)}')
+async def pdf_list_view(request):
+    """Get all PDFs"""
+    queryset = pdf_list_queryset(request.GET.get('course'))
+    return await paginated_response(request, queryset, PDFSerializer)
+
+
+@query_budget(2 + CATALOGUE_STAMP_QUERIES)
+@read_from_replica
+@require_safe
+@conditional_get(Quiz, Course, Question)
+@cached_response(lambda request: f'quizzes:{course_group(request)}')
+async def quiz_list_view(request):
+    """Get all quizzes"""
+    queryset = quiz_list_queryset(request.GET.get('course'))
+    return await paginated_response(request, queryset, QuizListSerializer)
+
+
+@query_budget(4 + CATALOGUE_STAMP_QUERIES)
+@read_from_replica
+@require_safe
+@conditional_get(Quiz, Course, Question, Choice)
+@cached_response(lambda request, pk: f'quiz:{pk}')
+async def quiz_detail_view(request, pk):
+    """Get quiz details with questions (without correct answers)"""
+    data = await sync_to_async(quiz_detail_data)(pk)
+    if data is None:
+        return not_found()
+    return json_response(data)
@@ -0,0 +1,370 @@
+"""
+Synthetic data and request scenarios for ``benchmark_api``
+
+``seed`` fills an empty database with courses, PDFs, quizzes of 10 to 200
+questions, users and attempts at one of the ``SCALES``. Rows get explicit
+ids, so children can point at parents without reading ids back (MySQL's
+bulk inserts don't return them). Only the newest attempts get per-question
+answers, as they would after importing older history; stats, leaderboards
+and the search index are rebuilt from the seeded rows.
+
+``scenarios`` lists a request for every URL in ``courses.urls`` and
+``accounts.urls``; ``measure`` times them through Django's test client,
+in process, so the numbers are the application's own cost without any
+network or server in between.
+"""
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.tokens import RevocableRefreshToken
+from . import leaderboard, search, stats
+from .models import AttemptAnswer, Choice, Course, PDF, Question, Quiz, QuizAttempt
+
+SCALES = {
+    'small': {
+        'courses': 5, 'pdfs_per_course': 5, 'quizzes_per_course': 4, 'questions': (10, 50),
+        'users': 100, 'attempts': 20_000, 'answered_attempts': 2_000,
+    },
+    'medium': {
+        'courses': 20, 'pdfs_per_course': 10, 'quizzes_per_course': 10, 'questions': (10, 200),
+        'users': 2_000, 'attempts': 500_000, 'answered_attempts': 20_000,
+    },
+    'large': {
+        'courses': 50, 'pdfs_per_course': 20, 'quizzes_per_course': 20, 'questions': (10, 200),
+        'users': 20_000, 'attempts': 5_000_000, 'answered_attempts': 50_000,
+    },
+}
+PASSWORD = 'Benchmark-Password-1'
+CHOICES_PER_QUESTION = 4
+BATCH_SIZE = 5000
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        model.objects.bulk_create(rows[start:start + BATCH_SIZE])
+
+
+def _question_counts(quizzes, low, high):
+    """Question counts spread evenly from ``low`` to ``high``"""
+    if quizzes == 1:
+        return [high]
+    return [low + (high - low) * i // (quizzes - 1) for i in range(quizzes)]
+
+
+def seed(scale, rng=None, log=print):
+    """Fill an empty database with ``SCALES[scale]`` worth of rows"""
+    config = SCALES[scale]
+    rng = rng or random.Random(0)
+    User = get_user_model()
+
+    with transaction.atomic():
+        log('Seeding courses, PDFs and quizzes...')
+        courses = [
+            Course(id=i, title=f'Benchmark course {i}', slug=f'bench-{i}', description=f'Course {i} about python',
+                   level='beginner', duration='4 weeks')
+            for i in range(1, config['courses'] + 1)
+        ]
+        _insert(Course, courses)
+        pdfs = [
+            PDF(id=(c.id - 1) * config['pdfs_per_course'] + j + 1, title=f'Python notes {c.id}.{j}',
+                filename=f'bench-{c.id}-{j}.pdf', file_path=f'bench/{c.id}-{j}.pdf', course_id=c.id,
+                page_count=rng.randint(5, 300))
+            for c in courses for j in range(config['pdfs_per_course'])
+        ]
+        _insert(PDF, pdfs)
+
+        quiz_count = config['courses'] * config['quizzes_per_course']
+        quizzes = [
+            Quiz(id=i + 1, title=f'Python quiz {i + 1}', course_id=i // config['quizzes_per_course'] + 1)
+            for i in range(quiz_count)
+        ]
+        _insert(Quiz, quizzes)
+        questions, choices = [], []
+        # quiz id -> [(question id, correct choice id, wrong choice id)]
+        answer_keys = {}
+        question_counts = _question_counts(quiz_count, *config['questions'])
+        rng.shuffle(question_counts)
+        for quiz, count in zip(quizzes, question_counts):
+            key = answer_keys[quiz.id] = []
+            for order in range(count):
+                question_id = len(questions) + 1
+                questions.append(Question(id=question_id, quiz_id=quiz.id, order=order,
+                                          question_text=f'What does python snippet {question_id} print?'))
+                correct = rng.randrange(CHOICES_PER_QUESTION)
+                first_choice = len(choices) + 1
+                for option in range(CHOICES_PER_QUESTION):
+                    choices.append(Choice(id=first_choice + option, question_id=question_id, order=option,
+                                          choice_text=f'Option {option}', is_correct=option == correct))
+                key.append((question_id, first_choice + correct, first_choice + (correct + 1) % CHOICES_PER_QUESTION))
+        _insert(Question, questions)
+        _insert(Choice, choices)
+
+        log(f'Seeding {config["users"]} users...')
+        password = make_password(PASSWORD)
+        _insert(User, [
+            User(id=i, email=f'bench{i}@example.com', username=f'bench{i}', password=password)
+            for i in range(1, config['users'] + 1)
+        ] + [
+            User(id=config['users'] + 1, email='bench-staff@example.com', username='bench-staff',
+                 password=password, is_staff=True),
+        ])
+
+    log(f'Seeding {config["attempts"]} attempts...')
+    now = timezone.now()
+    first_answered = config['attempts'] - config['answered_attempts'] + 1
+    answer_id = 0
+    for start in range(1, config['attempts'] + 1, BATCH_SIZE):
+        attempts, answers = [], []
+        for attempt_id in range(start, min(start + BATCH_SIZE, config['attempts'] + 1)):
+            quiz_id = rng.randint(1, quiz_count)
+            key = answer_keys[quiz_id]
+            if attempt_id >= first_answered:
+                correct = 0
+                for question_id, right, wrong in key:
+                    is_correct = rng.random() < 0.7
+                    correct += is_correct
+                    answer_id += 1
+                    answers.append(AttemptAnswer(id=answer_id, attempt_id=attempt_id, question_id=question_id,
+                                                 choice_id=right if is_correct else wrong, is_correct=is_correct))
+                score = round(correct / len(key) * 100)
+            else:
+                score = rng.randint(0, 100)
+            attempts.append(QuizAttempt(id=attempt_id, user_id=rng.randint(1, config['users']), quiz_id=quiz_id,
+                                        score=score, total_questions=len(key)))
+        with transaction.atomic():
+            QuizAttempt.objects.bulk_create(attempts)
+            AttemptAnswer.objects.bulk_create(answers, batch_size=BATCH_SIZE)
+            # completed_at is auto_now_add; spread the batch over the past year
+            QuizAttempt.objects.filter(pk__gte=start, pk__lt=start + BATCH_SIZE).update(
+                completed_at=now - timedelta(days=365 * (config['attempts'] - start) / config['attempts'])
+            )
+
+    # Explicit ids don't advance PostgreSQL's sequences (a no-op elsewhere)
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), [Course, PDF, Quiz, Question, Choice, User, QuizAttempt, AttemptAnswer],
+        ):
+            cursor.execute(sql)
+
+    log('Rebuilding stats, leaderboards and the search index...')
+    stats.rebuild()
+    leaderboard.rebuild()
+    search.rebuild()
+
+
+def is_seeded():
+    return Course.objects.filter(slug='bench-1').exists()
+
+
+@dataclass
+class Scenario:
+    """One request to time; ``prepare(i)`` returns extra client kwargs for the i-th call"""
+    name: str
+    url_name: str
+    method: str
+    path: str
+    user: Optional[object] = None
+    prepare: Callable = field(default=lambda i: {})
+    max_requests: Optional[int] = None
+
+
+def scenarios(pdf_root):
+    """A scenario for every endpoint, against the seeded data
+
+    Writes the file behind the downloaded PDF into ``pdf_root``.
+    """
+    User = get_user_model()
+    staff = User.objects.get(email='bench-staff@example.com')
+    # The owner of the newest attempt has a per-question breakdown to show
+    attempt_id, student_id = QuizAttempt.objects.order_by('-pk').values_list('pk', 'user_id').first()
+    student = User.objects.get(pk=student_id)
+    course = Course.objects.order_by('pk').first()
+    quiz = Quiz.objects.annotate(size=Count('questions')).order_by('-size', 'pk').first()
+    answers = {
+        str(question_id): choice_id
+        for question_id, choice_id in Choice.objects.filter(question__quiz=quiz, is_correct=True)
+        .values_list('question_id', 'id')
+    }
+    pdf = PDF.objects.order_by('pk').first()
+    target = pdf_root / pdf.file_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(b'%PDF-1.4\n' + b'0' * 256 * 1024 + b'\n%%EOF\n')
+
+    def json_body(make_data):
+        return lambda i: {'data': make_data(i), 'content_type': 'application/json'}
+
+    return [
+        Scenario('api-root', 'api-root', 'GET', '/api/'),
+        Scenario('course-list', 'course-list', 'GET', '/api/courses/'),
+        Scenario('course-detail', 'course-detail', 'GET', f'/api/courses/{course.slug}/'),
+        Scenario('pdf-list', 'pdf-list', 'GET', '/api/pdfs/'),
+        Scenario('pdf-list?course', 'pdf-list', 'GET', f'/api/pdfs/?course={course.pk}'),
+        Scenario('pdf-file', 'pdf-file', 'GET', f'/api/pdfs/{pdf.pk}/file/'),
+        Scenario('quiz-list', 'quiz-list', 'GET', '/api/quizzes/'),
+        Scenario('quiz-list?course', 'quiz-list', 'GET', f'/api/quizzes/?course={course.pk}'),
+        Scenario('quiz-detail', 'quiz-detail', 'GET', f'/api/quizzes/{quiz.pk}/'),
+        Scenario('quiz-submit', 'quiz-submit', 'POST', f'/api/quizzes/{quiz.pk}/submit/', student,
+                 json_body(lambda i: {'quiz_id': quiz.pk, 'answers': answers})),
+        Scenario('quiz-stats', 'quiz-stats', 'GET', f'/api/quizzes/{quiz.pk}/stats/', staff),
+        Scenario('quiz-leaderboard', 'quiz-leaderboard', 'GET', f'/api/quizzes/{quiz.pk}/leaderboard/', student),
+        Scenario('leaderboard', 'leaderboard', 'GET', '/api/leaderboard/', student),
+        Scenario('quiz-attempts', 'quiz-attempts', 'GET', '/api/quiz-attempts/', student),
+        Scenario('quiz-attempt-detail', 'quiz-attempt-detail', 'GET', f'/api/quiz-attempts/{attempt_id}/', student),
+        Scenario('quiz-attempts-export', 'quiz-attempts-export', 'GET',
+                 f'/api/quiz-attempts/export/?format=ndjson&quiz={quiz.pk}', staff, max_requests=5),
+        Scenario('search', 'search', 'GET', '/api/search/?q=python+snippet'),
+        Scenario('metrics', 'metrics', 'GET', '/api/metrics/', staff),
+        Scenario('register', 'register', 'POST', '/api/register/', None, json_body(lambda i: {
+            'email': f'new-{uuid.uuid4().hex[:12]}@example.com', 'username': f'new-{uuid.uuid4().hex[:12]}',
+            'password': PASSWORD, 'password2': PASSWORD,
+        }), max_requests=10),
+        Scenario('login', 'login', 'POST', '/api/login/', None,
+                 json_body(lambda i: {'email': student.email, 'password': PASSWORD}), max_requests=10),
+        Scenario('user', 'user', 'GET', '/api/user/', student),
+        Scenario('token-refresh', 'token_refresh', 'POST', '/api/token/refresh/', None,
+                 json_body(lambda i: {'refresh': str(RevocableRefreshToken.for_user(student))})),
+    ]
+
+
+def url_names(patterns):
+    """Every URL name in ``patterns``, including the router's"""
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def _client(user):
+    if user is None:
+        return Client()
+    return Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+
+def _send(client, scenario, i):
+    response = getattr(client, scenario.method.lower())(scenario.path, **scenario.prepare(i))
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 3)
+
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+def measure(scenario, requests, warmup=3):
+    """Latency percentiles, throughput, status and query count of one scenario"""
+    client = _client(scenario.user)
+    count = min(requests, scenario.max_requests or requests)
+    for i in range(min(warmup, count)):
+        _send(client, scenario, i)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        request_start = time.perf_counter()
+        response = _send(client, scenario, i)
+        latencies.append((time.perf_counter() - request_start) * 1000)
+    elapsed = time.perf_counter() - start
+    # Counted in a separate pass; capturing queries slows them down
+    with CaptureQueriesContext(connection) as queries:
+        _send(client, scenario, count)
+    return {
+        'method': scenario.method,
+        'path': scenario.path,
+        'status': response.status_code,
+        **_summary(latencies, elapsed),
+        'queries': len(queries),
+    }
+
+
+def measure_concurrent_submissions(threads, requests_per_thread):
+    """Submit quizzes from ``threads`` users at once"""
+    User = get_user_model()
+    users = list(User.objects.filter(is_staff=False).order_by('pk')[:threads])
+    quiz_ids = list(Quiz.objects.values_list('pk', flat=True))
+    answer_keys = {}
+    for quiz_id, question_id, choice_id in Choice.objects.filter(
+        is_correct=True, question__quiz_id__in=quiz_ids
+    ).values_list('question__quiz_id', 'question_id', 'id'):
+        answer_keys.setdefault(quiz_id, {})[str(question_id)] = choice_id
+    latencies, errors = [], {}
+    lock = threading.Lock()
+
+    def submit(user, seed):
+        rng = random.Random(seed)
+        client = _client(user)
+        try:
+            for _ in range(requests_per_thread):
+                quiz_id = rng.choice(quiz_ids)
+                start = time.perf_counter()
+                response = client.post(f'/api/quizzes/{quiz_id}/submit/', content_type='application/json',
+                                       data={'quiz_id': quiz_id, 'answers': answer_keys.get(quiz_id, {})})
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    if response.status_code != 200:
+                        errors[response.status_code] = errors.get(response.status_code, 0) + 1
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(submit, users, range(len(users))))
+    result = {'threads': len(users), **_summary(latencies, time.perf_counter() - start)}
+    result['errors'] = errors
+    return result
+
+
+def compare(results, baseline, tolerance, min_delta_ms=0.5):
+    """Regressions of ``results`` against ``baseline``, as messages"""
+    problems = []
+    for name, base in baseline.get('endpoints', {}).items():
+        current = results['endpoints'].get(name)
+        if current is None:
+            continue
+        if current['status'] != base['status']:
+            problems.append(f'{name}: status {base["status"]} -> {current["status"]}')
+        if current['queries'] > base['queries']:
+            problems.append(f'{name}: {base["queries"]} -> {current["queries"]} queries')
+        slower = current['p50_ms'] - base['p50_ms']
+        if current['p50_ms'] > base['p50_ms'] * (1 + tolerance) and slower > min_delta_ms:
+            problems.append(f'{name}: p50 {base["p50_ms"]:.1f} -> {current["p50_ms"]:.1f} ms')
+    base = baseline.get('concurrent_submissions')
+    current = results.get('concurrent_submissions')
+    if base and current and current['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+        problems.append(
+            f'concurrent submissions: {base["throughput_rps"]} -> {current["throughput_rps"]} req/s'
+        )
+    return problems
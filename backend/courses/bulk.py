@@ -0,0 +1,23 @@
+"""
+Bulk write helpers
+"""
+from django.db import connections, router
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """``bulk_create`` that updates the rows conflicting on ``unique_fields``
+
+    MySQL's ``ON DUPLICATE KEY UPDATE`` takes no conflict target and Django
+    rejects one there, so ``unique_fields`` is only passed to backends that
+    accept it (PostgreSQL, SQLite).
+    """
+    connection = connections[router.db_for_write(model)]
+    if not connection.features.supports_update_conflicts_with_target:
+        unique_fields = None
+    return model.objects.bulk_create(
+        objs,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=update_fields,
+    )
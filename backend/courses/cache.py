@@ -0,0 +1,283 @@
+"""
+Caching for the courses app
+
+Compiled quiz answer keys are kept in a bounded per-worker LRU in front of
+Django's cache framework. Every entry is stamped with the quiz's current
+version; model signals bump that version (see ``courses.signals``) so a
+stale key is never served once a quiz, question or choice changes.
+
+The same version stamps are kept per table for the catalogue endpoints'
+ETags.
+
+Stamps live in the cache when it is shared between workers. A per-process
+cache (the default local-memory one) can't carry a bump made by one worker
+to the others, so stamps then live in the ``VersionStamp`` table instead.
+Each worker trusts a stamp it read from there for ``STAMP_TTL`` seconds, so
+cache hits run no queries and a change reaches the other workers within
+that time. Keep it below ``READ_REPLICAS['PIN_SECONDS']``, so a worker picks
+up a catalogue change while everyone's reads are still on the primary.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+
+from .models import Quiz, VersionStamp
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'LOCAL_MAXSIZE': 256,
+    'TIMEOUT': 60 * 60,
+    'STAMP_TTL': 1,
+}
+# Backends that never block, so async code may call them directly
+IN_PROCESS_CACHES = (LocMemCache, DummyCache)
+
+
+def _get_setting(name):
+    return getattr(settings, 'QUIZ_ANSWER_KEY_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used mapping"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local = LRUCache(_get_setting('LOCAL_MAXSIZE'))
+# Stamp key -> (value, monotonic expiry) of stamps read from the database
+_db_stamps = LRUCache(4096)
+
+
+def clear_local():
+    """Forget this worker's answer keys and database stamps, as tests need"""
+    _local.clear()
+    _db_stamps.clear()
+
+
+def _shared_cache():
+    return caches[_get_setting('CACHE_ALIAS')]
+
+
+def _version_key(quiz_id):
+    return f'quiz_answer_key_version:{quiz_id}'
+
+
+def _data_key(quiz_id, version):
+    return f'quiz_answer_key:{quiz_id}:{version}'
+
+
+def _table_version_key(model):
+    return f'table_version:{model._meta.label_lower}'
+
+
+def stamps_in_database():
+    """Whether version stamps live in the database rather than the cache"""
+    return isinstance(_shared_cache(), IN_PROCESS_CACHES)
+
+
+def _stamp_rows():
+    # Always the primary, so a lagging replica can't roll a stamp back
+    return VersionStamp.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _local_db_stamps(keys):
+    """The database stamps among ``keys`` this worker read under STAMP_TTL ago"""
+    now = time.monotonic()
+    stamps = {}
+    for key in keys:
+        entry = _db_stamps.get(key)
+        if entry is not None and entry[1] > now:
+            stamps[key] = entry[0]
+    return stamps
+
+
+def _get_db_stamps(keys):
+    stamps = _local_db_stamps(keys)
+    unknown = [key for key in keys if key not in stamps]
+    if unknown:
+        read = dict(_stamp_rows().filter(key__in=unknown).values_list('key', 'value'))
+        missing = [key for key in unknown if key not in read]
+        if missing:
+            # Seeded with a timestamp, like cache stamps, so a new stamp
+            # never starts at a version that may still be cached
+            _stamp_rows().bulk_create(
+                [VersionStamp(key=key, value=time.time_ns()) for key in missing], ignore_conflicts=True,
+            )
+            read.update(_stamp_rows().filter(key__in=missing).values_list('key', 'value'))
+        expires = time.monotonic() + _get_setting('STAMP_TTL')
+        for key in unknown:
+            _db_stamps.set(key, (read[key], expires))
+        stamps.update(read)
+    return [stamps[key] for key in keys]
+
+
+def get_stamp(key, database=None):
+    """Current value of the version stamp stored under ``key``
+
+    ``database=False`` keeps the stamp in the cache even when the cache is
+    per process, for callers that bound staleness some other way.
+    """
+    if stamps_in_database() if database is None else database:
+        return _get_db_stamps([key])[0]
+    cache = _shared_cache()
+    version = cache.get(key)
+    if version is None:
+        # Seed with a timestamp so an evicted stamp never rolls back to a
+        # version that may still be cached.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def acall(cache, method, *args, **kwargs):
+    """Call ``method`` of a cache from async code
+
+    In-process backends answer without blocking, so they are called
+    directly; others go through their ``a``-prefixed method, which runs off
+    the event loop.
+    """
+    if isinstance(cache, IN_PROCESS_CACHES):
+        return getattr(cache, method)(*args, **kwargs)
+    return await getattr(cache, f'a{method}')(*args, **kwargs)
+
+
+async def aget_stamp(key):
+    """``get_stamp`` for async code"""
+    if stamps_in_database():
+        stamps = _local_db_stamps([key])
+        return stamps[key] if stamps else await sync_to_async(get_stamp)(key)
+    cache = _shared_cache()
+    version = await acall(cache, 'get', key)
+    if version is None:
+        await acall(cache, 'add', key, time.time_ns(), None)
+        version = await acall(cache, 'get', key)
+    return version
+
+
+def bump_stamp(key, database=None):
+    """Move the version stamp stored under ``key`` forward"""
+    if stamps_in_database() if database is None else database:
+        # This worker sees its own bump right away
+        _db_stamps.pop(key)
+        if not _stamp_rows().filter(key=key).update(value=F('value') + 1):
+            _get_db_stamps([key])
+        return
+    cache = _shared_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_version(quiz_id):
+    """Current version stamp of a quiz's answer key"""
+    return get_stamp(_version_key(quiz_id))
+
+
+def bump_version(quiz_id):
+    """Invalidate every cached answer key of a quiz"""
+    bump_stamp(_version_key(quiz_id))
+    _local.pop(quiz_id)
+
+
+# Most queries reading version stamps takes when they live in the database:
+# a read, plus an INSERT and a re-read for stamps that don't exist yet. A
+# stamp read under STAMP_TTL ago takes none.
+STAMP_QUERIES = 3
+# A catalogue response's ETag stamps and its response cache group's stamp
+CATALOGUE_STAMP_QUERIES = 2 * STAMP_QUERIES
+
+
+def get_table_versions(*models):
+    """Version stamps of whole tables, in the order given
+
+    One query when the stamps live in the database.
+    """
+    keys = [_table_version_key(model) for model in models]
+    if stamps_in_database():
+        return _get_db_stamps(keys)
+    versions = _shared_cache().get_many(keys)
+    return [versions[key] if key in versions else get_stamp(key) for key in keys]
+
+
+async def aget_table_versions(*models):
+    """``get_table_versions`` for async code"""
+    keys = [_table_version_key(model) for model in models]
+    if stamps_in_database():
+        stamps = _local_db_stamps(keys)
+        if len(stamps) == len(keys):
+            return [stamps[key] for key in keys]
+        return await sync_to_async(get_table_versions)(*models)
+    versions = await acall(_shared_cache(), 'get_many', keys)
+    return [versions[key] if key in versions else await aget_stamp(key) for key in keys]
+
+
+def bump_table_version(model):
+    """Mark every row of ``model``'s table as possibly changed"""
+    bump_stamp(_table_version_key(model))
+
+
+def get_answer_key(quiz_id):
+    """Return the compiled AnswerKey for a quiz, or None if it doesn't exist
+
+    Lookup order is the worker-local LRU, then the shared cache, and only
+    then the database.
+    """
+    quiz_id = int(quiz_id)
+    version = get_version(quiz_id)
+
+    entry = _local.get(quiz_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    cache = _shared_cache()
+    answer_key = cache.get(_data_key(quiz_id, version))
+    if answer_key is None:
+        quiz = Quiz.objects.filter(pk=quiz_id).only('id', 'passing_score', 'is_active').first()
+        if quiz is None:
+            return None
+        # Imported here: grading records attempts through modules that use
+        # the version stamps above
+        from .grading import build_answer_key
+        answer_key = build_answer_key(quiz)
+        cache.set(_data_key(quiz_id, version), answer_key, _get_setting('TIMEOUT'))
+
+    _local.set(quiz_id, (version, answer_key))
+    return answer_key
@@ -0,0 +1,93 @@
+"""
+HTTP conditional GET for the catalogue endpoints
+
+ETags are derived from the per-table version stamps in ``courses.cache``
+rather than from the response body, so an unchanged resource is answered
+with ``304 Not Modified`` before the view's queries or serialization run.
+Reading the stamps costs one query when they live in the database, which
+keeps every worker's ETags in step with writes made by the others.
+"""
+import asyncio
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpRequest
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.request import Request
+
+from .cache import aget_table_versions, get_table_versions
+
+
+def request_from_args(args):
+    """The request passed to a function view or a viewset method"""
+    return args[0] if isinstance(args[0], (HttpRequest, Request)) else args[1]
+
+
+def _etag(request, versions):
+    parts = [
+        request.path,
+        # Cursor, page size and course filter select different bodies
+        '&'.join(sorted(f'{key}={value}' for key, value in request.GET.items())),
+        request.META.get('HTTP_ACCEPT', ''),
+    ]
+    parts += [str(version) for version in versions]
+    digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def catalogue_etag(request, models):
+    """Strong ETag for ``request`` given the tables its response reads"""
+    return _etag(request, get_table_versions(*models))
+
+
+async def acatalogue_etag(request, models):
+    return _etag(request, await aget_table_versions(*models))
+
+
+def _finish(response, etag):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.CATALOGUE_MAX_AGE,
+            must_revalidate=True,
+        )
+    return response
+
+
+def conditional_get(*models):
+    """Answer GET/HEAD with 304 while none of ``models``' tables changed
+
+    Wraps a view (function view, viewset method or async view) and sets
+    ``ETag`` and ``Cache-Control`` on the response it returns.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                request = request_from_args(args)
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(*args, **kwargs)
+
+                etag = await acatalogue_etag(request, models)
+                response = get_conditional_response(request, etag=etag)
+                if response is None:
+                    response = await view(*args, **kwargs)
+                return _finish(response, etag)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request = request_from_args(args)
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            etag = catalogue_etag(request, models)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(*args, **kwargs)
+            return _finish(response, etag)
+        return wrapper
+    return decorator
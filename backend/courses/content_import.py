@@ -0,0 +1,332 @@
+"""
+Bulk import of courses, PDFs, quizzes, questions and choices
+
+Content files (YAML, JSON or CSV, see ``load_content``) are diffed against
+the database by natural key:
+
+* courses by ``slug`` and PDFs by ``filename``, upserted with
+  ``bulk_create(update_conflicts=True)`` on those unique columns;
+* quizzes by ``title``, questions by ``(quiz, question_text)`` and
+  choices by ``(question, choice_text)``, inserted with ``bulk_create`` and
+  changed with ``bulk_update``. ``order`` is imported like any other
+  value; it isn't a key, as questions and choices made in the admin all
+  default to 0.
+
+Existing rows are read with one query per model, unchanged rows are not
+written and every write is batched inside one transaction, so importing
+the same file twice changes nothing. Rows that are missing from the file
+are left alone. With ``update=False`` so are the ones in it, along with
+the questions and choices of quizzes that already exist. Bulk writes bypass model signals, so search entries,
+caches and ETags are refreshed explicitly.
+"""
+import csv
+import json
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import BooleanField
+
+from .bulk import bulk_upsert
+from .models import Course, PDF, Quiz, Question, Choice
+from .search import index_objects
+from .signals import invalidate_content
+
+COURSE_FIELDS = ('title', 'description', 'level', 'duration', 'icon', 'image', 'is_active')
+PDF_FIELDS = ('title', 'description', 'file_path', 'course', 'is_active')
+QUIZ_FIELDS = ('description', 'course', 'time_limit', 'passing_score', 'is_active')
+QUESTION_FIELDS = ('order',)
+CHOICE_FIELDS = ('order', 'is_correct')
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'x')
+
+
+class ContentImportError(Exception):
+    """The content file is malformed or refers to unknown courses"""
+
+
+class ImportReport:
+    """Inserted/updated/unchanged counts per model from one import"""
+
+    MODELS = ('courses', 'pdfs', 'quizzes', 'questions', 'choices')
+
+    def __init__(self):
+        self.counts = {name: {'inserted': 0, 'updated': 0, 'unchanged': 0} for name in self.MODELS}
+
+    def __str__(self):
+        return '\n'.join(
+            f"{name}: {counts['inserted']} inserted, {counts['updated']} updated, "
+            f"{counts['unchanged']} unchanged"
+            for name, counts in self.counts.items()
+        )
+
+
+# -------------------------------
+# Reading content files
+# -------------------------------
+
+def _content_from_csv(csv_file):
+    """Quizzes from a question bank with one row per choice
+
+    Columns: ``quiz``, ``question``, ``choice`` and optionally ``course``
+    (slug) and ``is_correct``. Rows are grouped by quiz, then question text.
+    """
+    quizzes = {}
+    for line, row in enumerate(csv.DictReader(csv_file), start=2):
+        try:
+            quiz_title, question_text, choice_text = row['quiz'], row['question'], row['choice']
+        except KeyError as e:
+            raise ContentImportError(f'Missing CSV column: {e.args[0]}')
+        if not (quiz_title and question_text and choice_text):
+            raise ContentImportError(f'Line {line}: quiz, question and choice are required')
+        quiz = quizzes.setdefault(quiz_title, {'title': quiz_title, 'questions': {}})
+        if row.get('course'):
+            quiz['course'] = row['course']
+        question = quiz['questions'].setdefault(
+            question_text, {'question_text': question_text, 'choices': []}
+        )
+        question['choices'].append({
+            'choice_text': choice_text,
+            'is_correct': row.get('is_correct') or '',
+        })
+    for quiz in quizzes.values():
+        quiz['questions'] = list(quiz['questions'].values())
+    return {'quizzes': list(quizzes.values())}
+
+
+def load_content(path, file_format=None):
+    """Read a YAML, JSON or CSV content file into ``import_content``'s input
+
+    YAML and JSON hold ``courses``, ``pdfs`` and ``quizzes`` lists (a bare
+    list is taken as quizzes); CSV holds quizzes only.
+    """
+    path = Path(path)
+    file_format = (file_format or path.suffix.lstrip('.')).lower()
+    with open(path, newline='', encoding='utf-8') as content_file:
+        if file_format == 'csv':
+            return _content_from_csv(content_file)
+        if file_format == 'json':
+            try:
+                data = json.load(content_file)
+            except ValueError as e:
+                raise ContentImportError(f'Invalid JSON: {e}')
+        elif file_format in ('yaml', 'yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ContentImportError('YAML files need PyYAML: pip install pyyaml')
+            try:
+                data = yaml.safe_load(content_file)
+            except yaml.YAMLError as e:
+                raise ContentImportError(f'Invalid YAML: {e}')
+        else:
+            raise ContentImportError(f'Unsupported file format: {file_format}')
+    if isinstance(data, list):
+        data = {'quizzes': data}
+    if not isinstance(data, dict):
+        raise ContentImportError('Expected a mapping of courses, pdfs and quizzes')
+    return data
+
+
+# -------------------------------
+# Diffing and writing
+# -------------------------------
+
+def _values(model, record, fields, course_ids):
+    """Model values for the ``fields`` present in ``record``"""
+    values = {}
+    for name in fields:
+        if name not in record:
+            continue
+        if name == 'course':
+            slug = record['course']
+            if slug and slug not in course_ids:
+                raise ContentImportError(f'Unknown course: {slug}')
+            values['course_id'] = course_ids.get(slug) if slug else None
+        elif isinstance(record[name], str) and isinstance(model._meta.get_field(name), BooleanField):
+            values[name] = record[name].strip().lower() in TRUE_VALUES
+        else:
+            try:
+                values[name] = model._meta.get_field(name).to_python(record[name])
+            except ValidationError as e:
+                raise ContentImportError(f'Invalid {name} {record[name]!r}: {" ".join(e.messages)}')
+    return values
+
+
+def _existing(queryset, key_fields, fields=()):
+    """Natural key -> ``(pk, {field: value})`` of rows, the oldest winning ties
+
+    Rows are read as tuples; building model instances for every existing
+    row would dominate the run time of large imports.
+    """
+    existing = {}
+    width = len(key_fields)
+    for pk, *row in queryset.order_by('pk').values_list('pk', *key_fields, *fields).iterator(chunk_size=5000):
+        key = row[0] if width == 1 else tuple(row[:width])
+        if key not in existing:
+            existing[key] = (pk, dict(zip(fields, row[width:])))
+    return existing
+
+
+def _diff(model, rows, existing, counts, update=True):
+    """Split ``(key, key values, values)`` rows into new and changed instances
+
+    Changed instances carry the row's pk and current values, overlaid with
+    the imported ones. With ``update=False`` existing rows count as
+    unchanged.
+    """
+    created, changed = [], []
+    for key, key_values, values in rows:
+        current = existing.get(key)
+        if current is None:
+            created.append(model(**key_values, **values))
+            counts['inserted'] += 1
+            continue
+        pk, current_values = current
+        if update and any(current_values[name] != value for name, value in values.items()):
+            changed.append(model(pk=pk, **key_values, **{**current_values, **values}))
+            counts['updated'] += 1
+        else:
+            counts['unchanged'] += 1
+    return created, changed
+
+
+def _update_fields(rows):
+    return sorted({name for _key, _key_values, values in rows for name in values})
+
+
+def _required(record, name, kind):
+    value = record.get(name)
+    if value in (None, ''):
+        raise ContentImportError(f'{kind} without {name}: {record!r}'[:200])
+    return value
+
+
+def _order(record, position):
+    try:
+        return int(record.get('order', position))
+    except (TypeError, ValueError):
+        raise ContentImportError(f'Invalid order: {record.get("order")!r}')
+
+
+def _write(model, created, changed, fields, batch_size):
+    model.objects.bulk_create(created, batch_size=batch_size)
+    if changed:
+        model.objects.bulk_update(changed, fields, batch_size=batch_size)
+
+
+def _upsert(model, key_field, rows, report_counts, batch_size, update):
+    """Upsert rows of a model with a unique natural key; returns written keys"""
+    fields = _update_fields(rows)
+    existing = _existing(model.objects.filter(**{f'{key_field}__in': [row[0] for row in rows]}), [key_field], fields)
+    created, changed = _diff(model, rows, existing, report_counts, update)
+    for instance in changed:
+        # Upserted through the natural key; an explicit pk would conflict first
+        instance.pk = None
+    if model is Course:
+        fields.append('updated_at')
+    if created or changed:
+        bulk_upsert(model, created + changed, unique_fields=[key_field], update_fields=fields, batch_size=batch_size)
+    return [getattr(instance, key_field) for instance in created + changed]
+
+
+def import_content(content, batch_size=1000, update=True):
+    """Upsert ``content`` (see ``load_content``) in a single transaction
+
+    ``update=False`` only inserts missing rows, and questions only for new
+    quizzes, leaving existing ones (and any edits made to them in the
+    admin) as they are.
+    """
+    report = ImportReport()
+    courses = content.get('courses') or []
+    pdfs = content.get('pdfs') or []
+    quizzes = content.get('quizzes') or []
+
+    with transaction.atomic():
+        # Courses, by slug
+        rows = {}
+        for record in courses:
+            slug = _required(record, 'slug', 'Course')
+            rows[slug] = (slug, {'slug': slug}, _values(Course, record, COURSE_FIELDS, {}))
+        written_slugs = _upsert(Course, 'slug', list(rows.values()), report.counts['courses'], batch_size, update)
+        referenced = {record['course'] for record in pdfs + quizzes if record.get('course')}
+        course_ids = dict(Course.objects.filter(slug__in=referenced | set(written_slugs)).values_list('slug', 'pk'))
+
+        # PDFs, by filename
+        rows = {}
+        for record in pdfs:
+            filename = _required(record, 'filename', 'PDF')
+            values = _values(PDF, record, PDF_FIELDS, course_ids)
+            values.setdefault('file_path', filename)
+            rows[filename] = (filename, {'filename': filename}, values)
+        written_filenames = _upsert(PDF, 'filename', list(rows.values()), report.counts['pdfs'], batch_size, update)
+
+        # Quizzes, by title
+        rows = {}
+        for record in quizzes:
+            title = _required(record, 'title', 'Quiz')
+            rows[title] = (title, {'title': title}, _values(Quiz, record, QUIZ_FIELDS, course_ids))
+        rows = list(rows.values())
+        titles = [row[0] for row in rows]
+        fields = _update_fields(rows)
+        existing = _existing(Quiz.objects.filter(title__in=titles), ['title'], fields)
+        created, changed = _diff(Quiz, rows, existing, report.counts['quizzes'], update)
+        _write(Quiz, created, changed, fields, batch_size)
+        quiz_ids = {title: pk for title, (pk, _current) in _existing(Quiz.objects.filter(title__in=titles), ['title']).items()}
+        written_quizzes = {quiz_ids[quiz.title] for quiz in created + changed}
+        new_titles = {quiz.title for quiz in created}
+
+        # Questions, by (quiz, question text)
+        rows = {}
+        choice_records = {}
+        for quiz in quizzes:
+            if not update and quiz['title'] not in new_titles:
+                # Existing quizzes keep their questions as they are
+                continue
+            quiz_id = quiz_ids[quiz['title']]
+            for position, record in enumerate(quiz.get('questions') or []):
+                key = (quiz_id, str(_required(record, 'question_text', 'Question')))
+                rows[key] = (key, {'quiz_id': key[0], 'question_text': key[1]}, {'order': _order(record, position)})
+                choice_records[key] = record.get('choices') or []
+        rows = list(rows.values())
+        questions = Question.objects.filter(quiz_id__in=quiz_ids.values())
+        existing = _existing(questions, ['quiz_id', 'question_text'], QUESTION_FIELDS)
+        created, changed = _diff(Question, rows, existing, report.counts['questions'], update)
+        _write(Question, created, changed, list(QUESTION_FIELDS), batch_size)
+        written_question_keys = {(question.quiz_id, question.question_text) for question in created + changed}
+        # Not every backend returns ids from bulk_create, so look them up
+        question_ids = {key: pk for key, (pk, _current) in _existing(questions, ['quiz_id', 'question_text']).items()}
+
+        # Choices, by (question, choice text)
+        rows = {}
+        for question_key, records in choice_records.items():
+            question_id = question_ids[question_key]
+            for position, record in enumerate(records):
+                key = (question_id, str(_required(record, 'choice_text', 'Choice')))
+                values = {'order': _order(record, position), **_values(Choice, record, ('is_correct',), {})}
+                rows[key] = (key, {'question_id': key[0], 'choice_text': key[1]}, values)
+        rows = list(rows.values())
+        fields = _update_fields(rows)
+        existing = _existing(
+            Choice.objects.filter(question__quiz_id__in=quiz_ids.values()), ['question_id', 'choice_text'], fields,
+        )
+        created, changed = _diff(Choice, rows, existing, report.counts['choices'], update)
+        _write(Choice, created, changed, fields, batch_size)
+        quiz_of_question = {pk: key[0] for key, pk in question_ids.items()}
+        written_choice_quizzes = {quiz_of_question[choice.question_id] for choice in created + changed}
+
+        # Search entries for what was written; questions carry their quiz
+        index_objects(Course, [course_ids[slug] for slug in written_slugs], batch_size=batch_size)
+        index_objects(PDF, PDF.objects.filter(filename__in=written_filenames).values_list('pk', flat=True), batch_size=batch_size)
+        index_objects(Quiz, written_quizzes, batch_size=batch_size)
+        index_objects(
+            Question,
+            {question_ids[key] for key in written_question_keys}
+            | set(questions.filter(quiz_id__in=written_quizzes).values_list('pk', flat=True)),
+            batch_size=batch_size,
+        )
+
+        changed_quizzes = written_quizzes | {key[0] for key in written_question_keys} | written_choice_quizzes
+        if written_slugs or written_filenames or changed_quizzes:
+            transaction.on_commit(lambda: invalidate_content(changed_quizzes))
+
+    return report
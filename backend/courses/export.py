@@ -0,0 +1,104 @@
+"""
+Streaming export of quiz attempts
+
+Attempts are read as plain tuples in primary-key order, ``chunk_size``
+rows per query with keyset pagination (``id > last id``), and written out
+one line at a time. Memory stays flat however many rows match, on MySQL
+too, where a single ``.iterator()`` query is buffered whole by the client
+library.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import QuizAttempt
+
+EXPORT_FIELDS = (
+    ('id', 'id'),
+    ('user_email', 'user__email'),
+    ('quiz_id', 'quiz_id'),
+    ('quiz_title', 'quiz__title'),
+    ('score', 'score'),
+    ('total_questions', 'total_questions'),
+    ('completed_at', 'completed_at'),
+)
+EXPORT_FORMATS = ('csv', 'ndjson')
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def parse_boundary(value, end=False):
+    """Datetime for a ``YYYY-MM-DD`` or ISO 8601 filter value
+
+    A bare ``end`` date includes that whole day. Raises ValueError for
+    anything else.
+    """
+    moment = parse_datetime(value)
+    if moment is not None:
+        return moment
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f'Invalid date: {value}')
+    moment = parse_datetime(f'{day.isoformat()}T00:00:00')
+    if end:
+        moment = moment.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return moment
+
+
+def attempt_export_queryset(quiz_id=None, since=None, until=None):
+    attempts = QuizAttempt.objects.all()
+    if quiz_id is not None:
+        attempts = attempts.filter(quiz_id=quiz_id)
+    if since is not None:
+        attempts = attempts.filter(completed_at__gte=since)
+    if until is not None:
+        attempts = attempts.filter(completed_at__lte=until)
+    return attempts
+
+
+def iter_attempt_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Tuples of EXPORT_FIELDS for ``queryset``, fetched in keyset chunks"""
+    columns = [lookup for _name, lookup in EXPORT_FIELDS]
+    last_id = 0
+    while True:
+        chunk = (
+            queryset
+            .filter(pk__gt=last_id)
+            .order_by('pk')
+            .values_list(*columns)[:chunk_size]
+        )
+        count = 0
+        for row in chunk.iterator(chunk_size=chunk_size):
+            count += 1
+            last_id = row[0]
+            yield row
+        if count < chunk_size:
+            return
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _lookup in EXPORT_FIELDS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    names = [name for name, _lookup in EXPORT_FIELDS]
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def export_lines(export_format, rows):
+    """Lines of ``rows`` encoded as ``export_format`` (csv or ndjson)"""
+    if export_format == 'csv':
+        return csv_lines(rows)
+    return ndjson_lines(rows)
@@ -0,0 +1,118 @@
+"""
+Read-only serializers for the detail endpoints, built from ``values()`` rows
+
+``CourseDetailSerializer`` and ``QuizDetailSerializer`` make a model
+instance for every PDF, quiz, question and choice and then convert it
+field by field, which dominates CPU time for quizzes with hundreds of
+questions. These functions read the same columns as plain dicts (see
+``courses.queries``) and assemble the response directly, in as many
+queries. Their output is identical to the DRF serializers', which stay
+the reference; ``benchmark_serializers`` checks and compares the two.
+"""
+from django.conf import settings
+from rest_framework.fields import DateTimeField
+
+from .queries import (
+    course_detail_values_queryset, course_pdf_values_queryset, course_quiz_values_queryset,
+    quiz_detail_values_queryset, question_values_queryset, choice_values_queryset
+)
+
+# Formats like the serializers' DateTimeFields (DATETIME_FORMAT, time zone)
+_datetime = DateTimeField()
+
+
+def _first(queryset):
+    """The row of a unique lookup, or None; unordered, like QuerySet.get()"""
+    rows = list(queryset.order_by()[:1])
+    return rows[0] if rows else None
+
+
+def course_detail_data(slug):
+    """``CourseDetailSerializer`` output for an active course, or None"""
+    course = _first(course_detail_values_queryset().filter(slug=slug))
+    if course is None:
+        return None
+    course_title = course['title']
+    pdfs = [
+        {
+            'id': pdf['id'],
+            'title': pdf['title'],
+            'description': pdf['description'],
+            'filename': pdf['filename'],
+            'file_path': pdf['file_path'],
+            'course': pdf['course'],
+            'course_title': course_title,
+            'file_size': pdf['file_size'],
+            'page_count': pdf['page_count'],
+            'thumbnail_url': settings.PDF_THUMBNAIL_URL + pdf['thumbnail'] if pdf['thumbnail'] else None,
+            'created_at': _datetime.to_representation(pdf['created_at']),
+        }
+        for pdf in course_pdf_values_queryset(course['id'])
+    ]
+    quizzes = [
+        {
+            'id': quiz['id'],
+            'title': quiz['title'],
+            'description': quiz['description'],
+            'course': quiz['course'],
+            'course_title': course_title,
+            'time_limit': quiz['time_limit'],
+            'passing_score': quiz['passing_score'],
+            'question_count': quiz['question_count'],
+            'created_at': _datetime.to_representation(quiz['created_at']),
+        }
+        for quiz in course_quiz_values_queryset(course['id'])
+    ]
+    return {
+        'id': course['id'],
+        'title': course_title,
+        'description': course['description'],
+        'slug': course['slug'],
+        'level': course['level'],
+        'duration': course['duration'],
+        'icon': course['icon'],
+        'image': course['image'],
+        'pdfs': pdfs,
+        'quizzes': quizzes,
+        'created_at': _datetime.to_representation(course['created_at']),
+    }
+
+
+def quiz_detail_data(pk):
+    """``QuizDetailSerializer`` output for an active quiz, or None"""
+    quiz = _first(quiz_detail_values_queryset().filter(pk=pk))
+    if quiz is None:
+        return None
+    questions = [
+        {
+            'id': question['id'],
+            'question_text': question['question_text'],
+            'order': question['order'],
+            'choices': [],
+        }
+        for question in question_values_queryset(pk)
+    ]
+    by_id = {question['id']: question['choices'] for question in questions}
+    if by_id:
+        for choice in choice_values_queryset(list(by_id)):
+            by_id[choice['question']].append(
+                {'id': choice['id'], 'choice_text': choice['choice_text'], 'order': choice['order']}
+            )
+        for choices in by_id.values():
+            # Choice.Meta.ordering
+            choices.sort(key=lambda choice: (choice['order'], choice['id']))
+    data = {
+        'id': quiz['id'],
+        'title': quiz['title'],
+        'description': quiz['description'],
+        'course': quiz['course'],
+        'course_title': quiz['course_title'],
+        'time_limit': quiz['time_limit'],
+        'passing_score': quiz['passing_score'],
+        'questions': questions,
+        'created_at': _datetime.to_representation(quiz['created_at']),
+    }
+    if quiz['course'] is None:
+        # The DRF serializer skips a source it can't follow
+        del data['course_title']
+    return data
@@ -0,0 +1,92 @@
+"""
+PDF file delivery helpers
+
+Resolves ``PDF.file_path`` inside ``settings.PDF_ROOT`` and implements the
+single-range subset of HTTP ``Range`` requests that PDF viewers use for
+progressive loading.
+"""
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class UnsatisfiableRange(Exception):
+    """The requested range lies outside the file"""
+
+
+def resolve_pdf_path(file_path):
+    """Absolute path of a stored PDF, or None if it escapes PDF_ROOT"""
+    root = Path(settings.PDF_ROOT).resolve()
+    path = (root / file_path).resolve()
+    if root not in path.parents:
+        return None
+    return path
+
+
+def accel_redirect_location(file_path):
+    """Internal URI handed to nginx through ``X-Accel-Redirect``"""
+    return settings.PDF_ACCEL_REDIRECT_PREFIX + quote(file_path)
+
+
+def parse_range(header, size):
+    """Parse a ``Range`` header into an inclusive ``(start, end)`` pair
+
+    Returns None when the whole file should be sent: no header, a syntax we
+    don't handle or several ranges (which RFC 9110 allows a server to
+    ignore). Raises UnsatisfiableRange when no byte of the file is selected.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise UnsatisfiableRange
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise UnsatisfiableRange
+    return start, min(end, size - 1)
+
+
+class RangeFile:
+    """Read-only view of ``length`` bytes of an open file from its position
+
+    ``fileno()`` is passed through so servers with a ``wsgi.file_wrapper``
+    (e.g. gunicorn) can ``sendfile()`` straight from the current offset,
+    bounded by Content-Length. Without one, ``read()`` stops at the range
+    end. ``tell``/``seek`` are deliberately absent so FileResponse leaves
+    Content-Length to the caller.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
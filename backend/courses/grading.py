@@ -0,0 +1,163 @@
+"""
+Quiz grading engine
+
+Loads a quiz's question -> choice answer key in a single query and scores
+submissions against that in-memory lookup, so grading costs the same number
+of queries however many questions a quiz has.
+"""
+from django.db import transaction
+from .models import AttemptAnswer, Question, QuizAttempt
+from .leaderboard import record_score
+from .stats import record_submission
+
+
+def answer_key_queryset(quiz):
+    """Questions of ``quiz`` joined to their choices
+
+    Only the questions are ordered, which the (quiz, order, id) index
+    serves directly; choice order is resolved in Python.
+    """
+    return (
+        Question.objects
+        .filter(quiz=quiz)
+        .order_by('order', 'id')
+        .values_list(
+            'id', 'question_text',
+            'choices__id', 'choices__choice_text', 'choices__is_correct', 'choices__order',
+        )
+    )
+
+
+class AnswerKey:
+    """Compiled answer key for one quiz
+
+    ``questions`` is an ordered list of
+    ``(question_id, question_text, choices, correct_choice_id)`` tuples where
+    ``choices`` maps each valid choice id to ``(choice_text, is_correct)``.
+    Only plain Python types are stored so the key can be pickled and cached.
+    """
+
+    def __init__(self, quiz_id, questions, passing_score=70, is_active=True):
+        self.quiz_id = quiz_id
+        self.questions = questions
+        self.passing_score = passing_score
+        self.is_active = is_active
+
+    def __len__(self):
+        return len(self.questions)
+
+
+class GradeResult:
+    """Outcome of grading one submission against an AnswerKey
+
+    ``answers`` holds ``(question_id, choice_id, is_correct)`` per question,
+    with ``choice_id`` None when the question was skipped or the submitted
+    id isn't one of its choices.
+    """
+
+    def __init__(self, correct_count, total_questions, results, answers=(), passing_score=70):
+        self.correct_count = correct_count
+        self.total_questions = total_questions
+        self.results = results
+        self.answers = list(answers)
+        self.passing_score = passing_score
+
+    @property
+    def score(self):
+        if not self.total_questions:
+            return 0
+        return int(self.correct_count / self.total_questions * 100)
+
+    @property
+    def passed(self):
+        return self.score >= self.passing_score
+
+
+def build_answer_key(quiz):
+    """Load every question and choice of ``quiz`` in one LEFT JOIN query"""
+    questions = []
+    current_id = None
+    rows = answer_key_queryset(quiz)
+    for question_id, question_text, choice_id, choice_text, is_correct, choice_order in rows:
+        if question_id != current_id:
+            current_id = question_id
+            choices = {}
+            # The correct answer is the first correct choice by (order, id)
+            first_correct = None
+            questions.append([question_id, question_text, choices, None])
+        if choice_id is None:
+            # Question without any choices
+            continue
+        choices[choice_id] = (choice_text, is_correct)
+        if is_correct and (first_correct is None or (choice_order, choice_id) < first_correct):
+            first_correct = (choice_order, choice_id)
+            questions[-1][3] = choice_id
+
+    return AnswerKey(
+        quiz.pk,
+        [tuple(question) for question in questions],
+        passing_score=quiz.passing_score,
+        is_active=quiz.is_active,
+    )
+
+
+def grade(answer_key, answers):
+    """Score ``answers`` (question_id -> choice_id) against ``answer_key``"""
+    correct_count = 0
+    results = []
+    graded_answers = []
+
+    for question_id, question_text, choices, correct_choice_id in answer_key.questions:
+        # Try both string and integer keys
+        user_choice_id = answers.get(str(question_id)) or answers.get(question_id)
+        user_choice = None
+        if user_choice_id:
+            user_choice_id = int(user_choice_id)
+            user_choice = choices.get(user_choice_id)
+
+        is_correct = bool(user_choice and user_choice[1])
+        if is_correct:
+            correct_count += 1
+
+        correct_choice = choices.get(correct_choice_id)
+        results.append({
+            'question_id': question_id,
+            'question_text': question_text,
+            'user_answer': user_choice[0] if user_choice else None,
+            'correct_answer': correct_choice[0] if correct_choice else None,
+            'is_correct': is_correct,
+        })
+        graded_answers.append((question_id, user_choice_id if user_choice else None, is_correct))
+
+    return GradeResult(
+        correct_count, len(answer_key), results, graded_answers,
+        passing_score=answer_key.passing_score,
+    )
+
+
+def record_attempt(user, quiz_id, result):
+    """Persist a graded submission, its answers and stats atomically
+
+    Two INSERTs whatever the number of questions: the attempt, then every
+    answer in a single ``bulk_create``. The quiz and question statistics
+    and the user's best score are updated in the same transaction.
+    """
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(
+            user=user,
+            quiz_id=quiz_id,
+            score=result.score,
+            total_questions=result.total_questions,
+        )
+        AttemptAnswer.objects.bulk_create([
+            AttemptAnswer(
+                attempt=attempt,
+                question_id=question_id,
+                choice_id=choice_id,
+                is_correct=is_correct,
+            )
+            for question_id, choice_id, is_correct in result.answers
+        ])
+        record_submission(quiz_id, result)
+        record_score(attempt)
+    return attempt
@@ -0,0 +1,156 @@
+"""
+PDF ingestion pipeline
+
+Scans ``settings.PDF_ROOT`` (or a directory inside it), hashes every PDF and skips files whose hash
+matches the stored ``PDF.content_hash``. Changed and new files are handed
+to a process pool that extracts the page count, size and full text and
+renders a first-page thumbnail. Results are written back in one
+transaction, so listings can report size and page count without touching
+disk and the text is available for search.
+
+The extraction itself lives in ``courses.pdf_extraction``.
+"""
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PDF, PDFText
+from .pdf_extraction import extract_pdf_safely
+from .search import index_objects
+from .signals import invalidate_pdf_responses
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class IngestionReport:
+    """Counts and per-file errors from one ingestion run"""
+
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.unchanged = []
+        self.errors = {}
+
+    def __str__(self):
+        return (
+            f'{len(self.created)} created, {len(self.updated)} updated, '
+            f'{len(self.unchanged)} unchanged, {len(self.errors)} failed'
+        )
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as pdf_file:
+        for chunk in iter(lambda: pdf_file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_pdfs(root):
+    """Paths of every PDF below ``root``, relative to it, as posix strings"""
+    root = Path(root)
+    thumbnail_root = Path(settings.PDF_THUMBNAIL_ROOT).resolve()
+    for path in sorted(root.rglob('*')):
+        if path.suffix.lower() != '.pdf' or not path.is_file():
+            continue
+        if thumbnail_root in path.resolve().parents:
+            continue
+        yield path.relative_to(root).as_posix()
+
+
+def ingest_pdfs(root=None, file_paths=None, force=False, workers=None):
+    """Ingest new and changed PDFs under ``root`` (PDF_ROOT by default)
+
+    ``root`` must be PDF_ROOT or a directory inside it, as PDFs are stored
+    and served relative to PDF_ROOT; anything else raises ValueError.
+    ``file_paths`` limits the run to those paths (relative to PDF_ROOT);
+    ``force`` re-extracts files whose hash is unchanged.
+    """
+    pdf_root = Path(settings.PDF_ROOT).resolve()
+    scan_root = Path(root).resolve() if root else pdf_root
+    if scan_root != pdf_root and pdf_root not in scan_root.parents:
+        raise ValueError(f'{root} is outside PDF_ROOT ({pdf_root}), so its PDFs could not be served')
+    root = pdf_root
+    thumbnail_root = Path(settings.PDF_THUMBNAIL_ROOT)
+    thumbnail_root.mkdir(parents=True, exist_ok=True)
+    report = IngestionReport()
+
+    if file_paths is not None:
+        paths = list(file_paths)
+    else:
+        prefix = scan_root.relative_to(pdf_root)
+        paths = [(prefix / file_path).as_posix() for file_path in scan_pdfs(scan_root)]
+    existing = {pdf.file_path: pdf for pdf in PDF.objects.filter(file_path__in=paths)}
+
+    pending = {}
+    for file_path in paths:
+        if not (root / file_path).is_file():
+            report.errors[file_path] = 'File not found'
+            continue
+        content_hash = file_sha256(root / file_path)
+        pdf = existing.get(file_path)
+        if pdf is not None and pdf.content_hash == content_hash and not force:
+            report.unchanged.append(file_path)
+            continue
+        pending[file_path] = content_hash
+
+    if not pending:
+        return report
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            file_path: executor.submit(
+                extract_pdf_safely,
+                str(root / file_path),
+                str(thumbnail_root / f'{content_hash[:32]}.png'),
+                settings.PDF_THUMBNAIL_WIDTH,
+            )
+            for file_path, content_hash in pending.items()
+        }
+        results = {file_path: future.result() for file_path, future in futures.items()}
+
+    now = timezone.now()
+    to_update = []
+    texts = {}
+    with transaction.atomic():
+        for file_path, result in results.items():
+            if 'error' in result:
+                report.errors[file_path] = result['error']
+                continue
+            pdf = existing.get(file_path)
+            if pdf is None:
+                name = Path(file_path).name
+                pdf = PDF.objects.create(
+                    title=Path(file_path).stem.strip(),
+                    filename=file_path if PDF.objects.filter(filename=name).exists() else name,
+                    file_path=file_path,
+                )
+                report.created.append(file_path)
+            else:
+                report.updated.append(file_path)
+            pdf.file_size = result['file_size']
+            pdf.page_count = result['page_count']
+            pdf.content_hash = pending[file_path]
+            pdf.thumbnail = result['thumbnail']
+            pdf.ingested_at = now
+            to_update.append(pdf)
+            texts[pdf.pk] = result['text']
+
+        PDF.objects.bulk_update(
+            to_update,
+            ['file_size', 'page_count', 'content_hash', 'thumbnail', 'ingested_at'],
+        )
+        PDFText.objects.filter(pdf_id__in=texts).delete()
+        PDFText.objects.bulk_create([PDFText(pdf_id=pk, text=text) for pk, text in texts.items()])
+
+        # bulk_update skips model signals, so refresh search and the caches
+        # explicitly
+        index_objects(PDF, texts)
+        course_ids = {pdf.course_id for pdf in to_update}
+        transaction.on_commit(lambda: invalidate_pdf_responses(course_ids))
+
+    return report
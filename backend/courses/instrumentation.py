@@ -0,0 +1,334 @@
+"""
+Per-request performance instrumentation
+
+``InstrumentationMiddleware`` times every request and counts the database
+queries it runs, how long they took and how long DRF serializers spent
+building response data. With ``SERVER_TIMING`` on, it adds a
+``Server-Timing`` header so the numbers show up in the browser's network
+panel. It always feeds per-endpoint histograms kept in memory by each
+worker, which ``metrics_view`` serves in the Prometheus text format along
+with the database connection pool's counters.
+
+Views declare how many queries they may run with ``@query_budget(n)``;
+going over logs a warning, or raises QueryBudgetExceeded when
+``QUERY_BUDGET_ACTION`` is ``"raise"``, so a reintroduced N+1 fails tests.
+"""
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.serializers import BaseSerializer
+
+from pycoder_backend.db_pool.pool import pool_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SERVER_TIMING': False,
+    'QUERY_BUDGET_ACTION': 'log',
+}
+
+# name -> (help text, bucket upper bounds)
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Request wall time',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'db_queries': (
+        'Database queries per request',
+        (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+    ),
+    'db_duration_seconds': (
+        'Time spent in database queries per request',
+        (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    ),
+    'serializer_duration_seconds': (
+        'Time spent building serializer data per request',
+        (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    ),
+    'response_size_bytes': (
+        'Response body size',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+}
+PREFIX = 'pycoder_'
+
+
+def _get_setting(name):
+    return getattr(settings, 'INSTRUMENTATION', {}).get(name, DEFAULTS[name])
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more queries than its ``query_budget``"""
+
+
+def query_budget(queries):
+    """Declare the most queries a view may run per request
+
+    Apply it outermost (above ``@api_view``); on a viewset, set the
+    ``query_budget`` class attribute instead.
+    """
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def _watch(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _watch_new_connection(sender, connection, **kwargs):
+    _watch(connection)
+
+
+# Connections are per thread; this covers those async views' ORM calls open
+connection_created.connect(_watch_new_connection)
+
+
+def _instrument_serializers():
+    """Time ``serializer.data``, which every serializer's ``data`` goes through"""
+    original = BaseSerializer.data.fget
+    if getattr(original, 'instrumented', False):
+        return
+
+    def data(self):
+        stats = _current.get()
+        # Only the outermost serializer is timed; nested ones run inside it
+        if stats is None or stats.serializing:
+            return original(self)
+        stats.serializing = True
+        start = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            stats.serializing = False
+            stats.serializer_time += time.perf_counter() - start
+
+    data.instrumented = True
+    BaseSerializer.data = property(data)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus exposes them"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# (histogram name, endpoint) -> Histogram; (counter name, labels) -> count
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+
+
+def _observe(endpoint, values):
+    with _lock:
+        for name, value in values.items():
+            histogram = _histograms.get((name, endpoint))
+            if histogram is None:
+                histogram = _histograms[(name, endpoint)] = Histogram(HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+
+def _increment(name, labels):
+    with _lock:
+        _counters[(name, labels)] = _counters.get((name, labels), 0) + 1
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+# Clients can send any method token; anything else is counted as "other" so
+# they can't add counters without bound
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'))
+
+
+def _method(request):
+    return request.method if request.method in METHODS else 'other'
+
+
+def _budget(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    budget = getattr(match.func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(match.func, 'cls', None), 'query_budget', None)
+    return budget
+
+
+def _response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+class InstrumentationMiddleware:
+    """Measure each request; see the module docstring"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _instrument_serializers()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            _watch(connection)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    def finish(self, request, response, stats, duration):
+        endpoint = _endpoint(request)
+        values = {
+            'request_duration_seconds': duration,
+            'db_queries': stats.queries,
+            'db_duration_seconds': stats.db_time,
+            'serializer_duration_seconds': stats.serializer_time,
+        }
+        size = _response_size(response)
+        if size is not None:
+            values['response_size_bytes'] = size
+        _observe(endpoint, values)
+        _increment('requests_total', (endpoint, _method(request), str(response.status_code)))
+
+        if _get_setting('SERVER_TIMING'):
+            queries = f'{stats.queries} quer{"y" if stats.queries == 1 else "ies"}'
+            response['Server-Timing'] = (
+                f'db;dur={stats.db_time * 1000:.1f};desc="{queries}", '
+                f'serializer;dur={stats.serializer_time * 1000:.1f}, '
+                f'total;dur={duration * 1000:.1f}'
+            )
+
+        budget = _budget(request)
+        if budget is not None and stats.queries > budget:
+            _increment('query_budget_exceeded_total', (endpoint,))
+            message = (
+                f'{request.method} {request.path} ({endpoint}) ran {stats.queries} queries, '
+                f'over its budget of {budget}'
+            )
+            if _get_setting('QUERY_BUDGET_ACTION') == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+COUNTERS = {
+    'requests_total': ('Requests by endpoint, method and status', ('endpoint', 'method', 'status')),
+    'query_budget_exceeded_total': ('Requests that ran over their query budget', ('endpoint',)),
+}
+
+# pool_stats() key -> (metric name, type, help text), labelled by database alias
+POOL_METRICS = {
+    'checkouts': ('db_pool_checkouts_total', 'counter', 'Connections borrowed from the pool'),
+    'opened': ('db_pool_connections_opened_total', 'counter', 'Connections the pool opened'),
+    'waits': ('db_pool_waits_total', 'counter', 'Checkouts that waited for a free connection'),
+    'wait_seconds': ('db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a free connection'),
+    'timeouts': ('db_pool_timeouts_total', 'counter', 'Checkouts that gave up waiting'),
+    'errors': ('db_pool_errors_total', 'counter', 'Failed connection attempts and health checks'),
+    'in_use': ('db_pool_connections_in_use', 'gauge', 'Connections lent out'),
+    'idle': ('db_pool_connections_idle', 'gauge', 'Open connections waiting in the pool'),
+    'max_size': ('db_pool_max_size', 'gauge', 'Most connections the pool opens'),
+}
+
+
+def prometheus_text():
+    """This worker's metrics in the Prometheus text exposition format"""
+    with _lock:
+        histograms = {key: (h.counts[:], h.sum, h.count) for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        metric = PREFIX + name
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+        for (key, endpoint), (counts, total, count) in sorted(histograms.items()):
+            if key != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip((*buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{{_labels(endpoint=endpoint, le=bound)}}} {cumulative}')
+            lines.append(f'{metric}_sum{{{_labels(endpoint=endpoint)}}} {total}')
+            lines.append(f'{metric}_count{{{_labels(endpoint=endpoint)}}} {count}')
+    for name, (help_text, label_names) in COUNTERS.items():
+        metric = PREFIX + name
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        for (key, labels), value in sorted(counters.items()):
+            if key == name:
+                lines.append(f'{metric}{{{_labels(**dict(zip(label_names, labels)))}}} {value}')
+    pools = pool_stats()
+    for key, (name, metric_type, help_text) in POOL_METRICS.items():
+        metric = PREFIX + name
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {metric_type}']
+        for alias, stats in sorted(pools.items()):
+            lines.append(f'{metric}{{{_labels(database=alias)}}} {stats[key]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,286 @@
+"""
+Quiz and global leaderboards
+
+Every submission keeps two tables current: ``BestScore`` (a user's best
+score per quiz) and ``TotalScore`` (the sum of those bests). They are the
+persistent source of every board:
+
+* ``memory``: per-process ``SortedList``s (``pip install sortedcontainers``)
+  keyed by ``(-score, achieved_at, user_id)``, loaded lazily per board and
+  brought up to date on every lookup with the rows whose ``updated_at``
+  is past the newest one already applied. Top-N and rank lookups are
+  O(log n).
+* ``database``: the same lookups as indexed queries on the tables, used
+  when sortedcontainers isn't installed.
+
+Ties go to whoever reached the score first.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .cache import STAMP_QUERIES, bump_stamp, get_stamp
+from .models import BestScore, Quiz, QuizAttempt, TotalScore
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # pragma: no cover - optional dependency
+    SortedList = None
+
+LEADERBOARD_GENERATION_KEY = 'leaderboard_generation'
+GLOBAL = 'global'
+# How far back before the newest applied row a sync re-reads, for
+# submissions committed after it that carry an earlier updated_at
+SYNC_OVERLAP = timedelta(seconds=30)
+# Most queries leaderboard() runs: the database backend's top, two for the
+# rank and the usernames, or the memory backend's generation stamp, sync
+# and usernames
+LEADERBOARD_QUERIES = max(4, STAMP_QUERIES + 2)
+
+
+# -------------------------------
+# Writes
+# -------------------------------
+
+def _add_to_total(user_id, delta, achieved_at):
+    updated = TotalScore.objects.filter(pk=user_id).update(
+        score=F('score') + delta, achieved_at=achieved_at,
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                TotalScore.objects.create(user_id=user_id, score=delta, achieved_at=achieved_at)
+        except IntegrityError:
+            # Created by a concurrent submission
+            _add_to_total(user_id, delta, achieved_at)
+
+
+def record_score(attempt):
+    """Raise the attempt's user's best score on its quiz if it improved
+
+    Call inside the attempt's transaction. A submission that doesn't beat
+    the user's best costs one locking SELECT.
+    """
+    best = (
+        BestScore.objects
+        .select_for_update()
+        .filter(quiz_id=attempt.quiz_id, user_id=attempt.user_id)
+        .first()
+    )
+    if best is None:
+        try:
+            with transaction.atomic():
+                BestScore.objects.create(
+                    quiz_id=attempt.quiz_id, user_id=attempt.user_id,
+                    score=attempt.score, achieved_at=attempt.completed_at,
+                )
+        except IntegrityError:
+            # A concurrent first submission won; compare against it instead
+            return record_score(attempt)
+        delta = attempt.score
+    elif attempt.score > best.score:
+        delta = attempt.score - best.score
+        best.score = attempt.score
+        best.achieved_at = attempt.completed_at
+        best.save(update_fields=['score', 'achieved_at', 'updated_at'])
+    else:
+        return
+
+    _add_to_total(attempt.user_id, delta, attempt.completed_at)
+
+
+def remove_quiz(quiz_id):
+    """Take a quiz's best scores out of the totals before it is deleted"""
+    bests = BestScore.objects.filter(quiz_id=quiz_id)
+    best = bests.filter(user_id=OuterRef('pk')).values('score')[:1]
+    TotalScore.objects.filter(pk__in=bests.values('user_id')).update(score=F('score') - Subquery(best))
+    reload_boards()
+
+
+def reload_boards():
+    """Make every process reload its boards, e.g. after rows were deleted"""
+    transaction.on_commit(lambda: bump_stamp(LEADERBOARD_GENERATION_KEY))
+
+
+def rebuild(batch_size=1000):
+    """Recompute every best and total score from QuizAttempt history
+
+    Attempts are read one quiz at a time, best score first per user, so
+    memory stays bounded by a single quiz's attempts.
+    """
+    bests = []
+    totals = {}
+    for quiz_id in Quiz.objects.order_by('pk').values_list('pk', flat=True):
+        rows = (
+            QuizAttempt.objects
+            .filter(quiz_id=quiz_id)
+            .order_by('user_id', '-score', 'completed_at')
+            .values_list('user_id', 'score', 'completed_at')
+        )
+        previous_user = None
+        for user_id, score, completed_at in rows.iterator(chunk_size=batch_size):
+            if user_id == previous_user:
+                continue
+            previous_user = user_id
+            bests.append(BestScore(quiz_id=quiz_id, user_id=user_id, score=score, achieved_at=completed_at))
+            total, achieved_at = totals.get(user_id, (0, completed_at))
+            totals[user_id] = (total + score, max(achieved_at, completed_at))
+
+    with transaction.atomic():
+        BestScore.objects.all().delete()
+        TotalScore.objects.all().delete()
+        BestScore.objects.bulk_create(bests, batch_size=batch_size)
+        TotalScore.objects.bulk_create(
+            [
+                TotalScore(user_id=user_id, score=score, achieved_at=achieved_at)
+                for user_id, (score, achieved_at) in totals.items()
+            ],
+            batch_size=batch_size,
+        )
+        # Rows were replaced, not updated, so every process reloads its boards
+        reload_boards()
+    return len(bests), len(totals)
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+
+def _source(board):
+    if board == GLOBAL:
+        return TotalScore.objects.all()
+    return BestScore.objects.filter(quiz_id=board)
+
+
+class SortedBoard:
+    """Ranked scores of one board, kept sorted by (-score, achieved_at, user)"""
+
+    def __init__(self, board):
+        self.board = board
+        self.entries = SortedList()
+        self.keys = {}
+        self.synced_until = None
+        self.lock = threading.Lock()
+
+    def set(self, user_id, score, achieved_at):
+        previous = self.keys.get(user_id)
+        if previous is not None:
+            self.entries.remove(previous)
+        key = (-score, achieved_at, user_id)
+        self.entries.add(key)
+        self.keys[user_id] = key
+
+    def sync(self):
+        """Apply rows changed since the last sync"""
+        with self.lock:
+            rows = _source(self.board).order_by('updated_at')
+            if self.synced_until is not None:
+                # Re-applying a row is idempotent, so overlap generously
+                rows = rows.filter(updated_at__gte=self.synced_until - SYNC_OVERLAP)
+            rows = rows.values_list('user_id', 'score', 'achieved_at', 'updated_at')
+            for user_id, score, achieved_at, updated_at in rows.iterator(chunk_size=2000):
+                self.set(user_id, score, achieved_at)
+                self.synced_until = max(self.synced_until or updated_at, updated_at)
+
+    def top(self, limit):
+        with self.lock:
+            entries = self.entries[:limit]
+        return [(user_id, -negative_score) for negative_score, _achieved_at, user_id in entries]
+
+    def rank(self, user_id):
+        with self.lock:
+            key = self.keys.get(user_id)
+            if key is None:
+                return None
+            return self.entries.bisect_left(key) + 1, -key[0]
+
+
+class MemoryBackend:
+    name = 'memory'
+    boards = {}
+    generation = None
+    lock = threading.Lock()
+
+    @classmethod
+    def get_board(cls, board):
+        generation = get_stamp(LEADERBOARD_GENERATION_KEY)
+        with cls.lock:
+            if generation != cls.generation:
+                cls.boards = {}
+                cls.generation = generation
+            if board not in cls.boards:
+                cls.boards[board] = SortedBoard(board)
+            sorted_board = cls.boards[board]
+        sorted_board.sync()
+        return sorted_board
+
+    @classmethod
+    def top(cls, board, limit):
+        return cls.get_board(board).top(limit)
+
+    @classmethod
+    def rank(cls, board, user_id):
+        return cls.get_board(board).rank(user_id)
+
+    @classmethod
+    def standings(cls, board, user_id, limit):
+        """``top`` and ``rank`` from a single sync of the board"""
+        sorted_board = cls.get_board(board)
+        return sorted_board.top(limit), None if user_id is None else sorted_board.rank(user_id)
+
+
+class DatabaseBackend:
+    name = 'database'
+
+    @staticmethod
+    def top(board, limit):
+        rows = _source(board).order_by('-score', 'achieved_at', 'user_id')[:limit]
+        return list(rows.values_list('user_id', 'score'))
+
+    @staticmethod
+    def rank(board, user_id):
+        entry = _source(board).filter(user_id=user_id).values_list('score', 'achieved_at').first()
+        if entry is None:
+            return None
+        score, achieved_at = entry
+        ahead = _source(board).filter(
+            Q(score__gt=score)
+            | Q(score=score, achieved_at__lt=achieved_at)
+            | Q(score=score, achieved_at=achieved_at, user_id__lt=user_id)
+        ).count()
+        return ahead + 1, score
+
+    @classmethod
+    def standings(cls, board, user_id, limit):
+        return cls.top(board, limit), None if user_id is None else cls.rank(board, user_id)
+
+
+def get_backend():
+    choice = getattr(settings, 'LEADERBOARD_BACKEND', 'auto')
+    if choice == 'database' or SortedList is None:
+        return DatabaseBackend
+    return MemoryBackend
+
+
+def leaderboard(board, user=None, limit=10):
+    """Top ``limit`` entries of ``board`` (a quiz id or GLOBAL) and ``user``'s rank"""
+    top, position = get_backend().standings(board, None if user is None else user.pk, limit)
+    usernames = dict(
+        get_user_model().objects
+        .filter(pk__in=[user_id for user_id, _score in top])
+        .values_list('pk', 'username')
+    )
+    me = None
+    if position is not None:
+        me = {'rank': position[0], 'score': position[1]}
+    return {
+        'top': [
+            {'rank': rank, 'user_id': user_id, 'username': usernames.get(user_id), 'score': score}
+            for rank, (user_id, score) in enumerate(top, start=1)
+        ],
+        'me': me,
+    }
@@ -0,0 +1,139 @@
+"""
+Management command to benchmark every REST endpoint on synthetic data
+Run: python manage.py benchmark_api --scale small --output bench.json
+
+Creates a separate benchmark database the way the test runner does (a
+SQLite file next to manage.py, or test_<DB_NAME>_<scale> on MySQL), seeds
+it at --scale (see courses.benchmark.SCALES) and times --requests calls to
+each endpoint in courses.urls and accounts.urls, then submissions from
+--concurrency users at once. Results are printed and written as JSON;
+with --baseline, the command fails on slower p50s (beyond --tolerance),
+extra queries or changed statuses. --keepdb keeps the seeded database for
+the next run, which saves re-seeding the larger scales.
+"""
+import json
+import platform
+import tempfile
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts import urls as accounts_urls
+from courses import benchmark, urls as courses_urls
+
+
+class Command(BaseCommand):
+    help = 'Seed a benchmark database and measure latency, throughput and queries of every API endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(benchmark.SCALES), default='small')
+        parser.add_argument('--requests', type=int, default=100, help='Timed requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=8, help='Users submitting quizzes at once')
+        parser.add_argument('--concurrent-requests', type=int, default=25, help='Submissions per user')
+        parser.add_argument('--only', nargs='*', help='Scenario names to run (default: all)')
+        parser.add_argument('--response-cache', action='store_true',
+                            help='Keep the catalogue response cache on (default: measure uncached)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='JSON results to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed p50 slowdown against the baseline, as a fraction')
+        parser.add_argument('--keepdb', action='store_true', help='Keep (and reuse) the seeded database')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        scale = options['scale']
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if not test_settings.get('NAME'):
+            if connection.vendor == 'sqlite':
+                test_settings['NAME'] = str(settings.BASE_DIR / f'benchmark-{scale}.sqlite3')
+            else:
+                test_settings['NAME'] = f'test_{connection.settings_dict["NAME"]}_{scale}'
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'],
+        )
+        try:
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+        if baseline is not None:
+            problems = benchmark.compare(results, baseline, options['tolerance'])
+            for problem in problems:
+                self.stdout.write(self.style.ERROR(f'REGRESSION {problem}'))
+            if problems:
+                raise CommandError(f'{len(problems)} regression(s) against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Done'))
+
+    def run(self, options):
+        scale = options['scale']
+        if benchmark.is_seeded():
+            self.stdout.write('Reusing the seeded benchmark database')
+        else:
+            benchmark.seed(scale, log=self.stdout.write)
+
+        overrides = {
+            # The test client's host
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            # A cache of its own, so nothing leaks to or from a shared one
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                   'LOCATION': 'benchmark'}},
+            'THROTTLE': {'ENABLED': False},
+            # Only the benchmark database has the seeded rows
+            'READ_REPLICAS': {**settings.READ_REPLICAS, 'REPLICAS': {}},
+        }
+        if not options['response_cache']:
+            overrides['RESPONSE_CACHE'] = {**settings.RESPONSE_CACHE, 'TIMEOUT': -1, 'STALE_TIMEOUT': 0}
+        results = {
+            'meta': {
+                'scale': scale,
+                'database': connection.vendor,
+                'requests': options['requests'],
+                'response_cache': options['response_cache'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'created': timezone.now().isoformat(),
+            },
+            'endpoints': {},
+        }
+        with tempfile.TemporaryDirectory() as pdf_root, override_settings(PDF_ROOT=pdf_root, **overrides):
+            scenarios = benchmark.scenarios(Path(pdf_root))
+            covered = {scenario.url_name for scenario in scenarios}
+            missing = benchmark.url_names(courses_urls.urlpatterns + accounts_urls.urlpatterns) - covered
+            if missing:
+                self.stdout.write(self.style.WARNING(f'No scenario for: {", ".join(sorted(missing))}'))
+
+            self.stdout.write(f'{"endpoint":<24} {"status":>6} {"p50 ms":>8} {"p95 ms":>8} {"req/s":>8} {"queries":>7}')
+            for scenario in scenarios:
+                if options['only'] and scenario.name not in options['only']:
+                    continue
+                result = results['endpoints'][scenario.name] = benchmark.measure(scenario, options['requests'])
+                self.stdout.write(
+                    f'{scenario.name:<24} {result["status"]:>6} {result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f} '
+                    f'{result["throughput_rps"]:>8.0f} {result["queries"]:>7}'
+                )
+
+            if options['concurrency'] and not options['only']:
+                result = results['concurrent_submissions'] = benchmark.measure_concurrent_submissions(
+                    options['concurrency'], options['concurrent_requests'],
+                )
+                self.stdout.write(
+                    f'{result["requests"]} submissions from {result["threads"]} users at once: '
+                    f'{result["throughput_rps"]:.0f} req/s, p50 {result["p50_ms"]:.1f} ms, '
+                    f'p95 {result["p95_ms"]:.1f} ms, errors {result["errors"] or "none"}'
+                )
+        return results
@@ -0,0 +1,132 @@
+"""
+Management command to load a running server with many concurrent clients
+Run: python manage.py benchmark_concurrency --url http://localhost:8000 --connections 500
+
+Opens --connections keep-alive connections that GET --path back to back
+for --duration seconds, optionally alongside --slow-clients connections
+that trickle request headers and never finish them, then prints throughput,
+latency percentiles and errors. Run it against the sync WSGI deployment
+and the ASGI one (see the README) to compare them.
+"""
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    keep_alive = True
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'connection' and value.strip().lower() == b'close':
+            # Sync WSGI workers close after every response
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def _client(host, port, request, deadline, latencies, errors):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            start = time.perf_counter()
+            writer.write(request)
+            status, keep_alive = await _read_response(reader)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def _slow_client(host, port, path, deadline, held):
+    """Send a request one header line at a time, never finishing it"""
+    try:
+        _reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n'.encode())
+        held.append(1)
+        line = 0
+        while time.monotonic() < deadline:
+            await asyncio.sleep(1)
+            writer.write(f'X-Slow-{line}: 1\r\n'.encode())
+            await writer.drain()
+            line += 1
+        writer.close()
+    except OSError:
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and latency of a running server under many concurrent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--path', default='/api/courses/')
+        parser.add_argument('--connections', type=int, default=200)
+        parser.add_argument('--slow-clients', type=int, default=0)
+        parser.add_argument('--duration', type=float, default=10)
+
+    async def run(self, options):
+        parts = urlsplit(options['url'])
+        host, port = parts.hostname, parts.port or 80
+        path = options['path']
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n'
+            'Connection: keep-alive\r\n\r\n'
+        ).encode()
+        latencies, errors, held = [], {}, []
+        deadline = time.monotonic() + options['duration']
+        slow = [
+            asyncio.create_task(_slow_client(host, port, path, deadline, held))
+            for _ in range(options['slow_clients'])
+        ]
+        # Let the slow clients take their connections first
+        await asyncio.sleep(0.5 if slow else 0)
+        start = time.monotonic()
+        await asyncio.gather(*[
+            _client(host, port, request, deadline, latencies, errors)
+            for _ in range(options['connections'])
+        ])
+        elapsed = time.monotonic() - start
+        await asyncio.gather(*slow)
+        return latencies, errors, len(held), elapsed
+
+    def handle(self, *args, **options):
+        latencies, errors, held, elapsed = asyncio.run(self.run(options))
+        if not latencies:
+            raise CommandError(f'No request completed; errors: {errors}')
+        latencies.sort()
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+        self.stdout.write(
+            f'{len(latencies)} requests in {elapsed:.1f} s: {len(latencies) / elapsed:.0f} req/s over '
+            f'{options["connections"]} connections ({held} slow clients connected)'
+        )
+        self.stdout.write(
+            f'latency p50 {statistics.median(latencies):.1f} ms  p95 {percentile(0.95):.1f} ms  '
+            f'p99 {percentile(0.99):.1f} ms  max {latencies[-1]:.1f} ms'
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(f'errors: {errors}'))
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,104 @@
+"""
+Management command to compare CPU time per detail response at several sizes
+Run: python manage.py benchmark_serializers --sizes 10 100 500 1000
+
+For each size N, creates a quiz with N questions of four choices and a
+course with N PDFs and N quizzes, inside a transaction that is rolled back
+afterwards. It then builds and renders the quiz and course detail
+responses both ways: model instances through the DRF serializers and
+JSONRenderer, and values() rows through courses.fast_serializers and
+FastJSONRenderer. Both must give the same bytes. Reports CPU time (not
+wall time) per response, which includes the ORM's share of fetching rows.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from courses.fast_serializers import course_detail_data, quiz_detail_data
+from courses.models import Course, PDF, Quiz, Question, Choice
+from courses.queries import course_detail_queryset, quiz_detail_queryset
+from courses.renderers import FastJSONRenderer, orjson_enabled
+from courses.serializers import CourseDetailSerializer, QuizDetailSerializer
+
+CHOICES_PER_QUESTION = 4
+
+
+class Command(BaseCommand):
+    help = 'Measure CPU per course/quiz detail response, DRF serializers vs values() rows and orjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500, 1000],
+                            help='Questions per quiz, and PDFs and quizzes per course')
+        parser.add_argument('--repeat', type=int, default=20, help='Responses timed per size and path')
+
+    def seed(self, size):
+        # Signal handlers only act on commit, which never comes
+        course = Course.objects.create(
+            title=f'Benchmark course {size}', slug=f'benchmark-serializers-{size}',
+            description='Serializer benchmark', duration='1 week',
+        )
+        PDF.objects.bulk_create(
+            PDF(title=f'PDF {i}', description='Benchmark PDF', filename=f'benchmark-serializers-{size}-{i}.pdf',
+                file_path=f'benchmark/{size}-{i}.pdf', course=course, file_size=1024 * i, page_count=i)
+            for i in range(size)
+        )
+        Quiz.objects.bulk_create(
+            Quiz(title=f'Quiz {i}', description='Benchmark quiz', course=course) for i in range(size)
+        )
+        quiz = Quiz.objects.create(title=f'Benchmark quiz {size}', description='Serializer benchmark', course=course)
+        Question.objects.bulk_create(
+            Question(quiz=quiz, question_text=f'Question {i}: which of these is right?', order=i)
+            for i in range(size)
+        )
+        # MySQL's bulk_create doesn't set primary keys
+        questions = Question.objects.filter(quiz=quiz)
+        Choice.objects.bulk_create(
+            Choice(question=question, choice_text=f'Answer {j} to question {question.order}',
+                   is_correct=j == 0, order=j)
+            for question in questions for j in range(CHOICES_PER_QUESTION)
+        )
+        return course, quiz
+
+    def cpu_ms(self, func, repeat):
+        """Mean CPU milliseconds per call, and the last result"""
+        result = func()  # warm up
+        start = time.process_time()
+        for _ in range(repeat):
+            result = func()
+        return (time.process_time() - start) * 1000 / repeat, result
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        self.stdout.write(f'Fast path JSON: {"orjson" if orjson_enabled() else "stdlib json (orjson not installed or disabled)"}')
+        self.stdout.write(
+            f'{"endpoint":<8} {"size":>6} {"bytes":>10} {"path":<9} '
+            f'{"build ms":>9} {"render ms":>9} {"total ms":>9}'
+        )
+        with transaction.atomic():
+            for size in options['sizes']:
+                course, quiz = self.seed(size)
+                paths = (
+                    ('course',
+                     lambda: CourseDetailSerializer(course_detail_queryset().get(slug=course.slug)).data,
+                     lambda: course_detail_data(course.slug)),
+                    ('quiz',
+                     lambda: QuizDetailSerializer(quiz_detail_queryset().get(pk=quiz.pk)).data,
+                     lambda: quiz_detail_data(quiz.pk)),
+                )
+                for endpoint, build_drf, build_fast in paths:
+                    results = {}
+                    for path, build, renderer in (('drf', build_drf, JSONRenderer()),
+                                                  ('fast', build_fast, FastJSONRenderer())):
+                        build_ms, data = self.cpu_ms(build, repeat)
+                        render_ms, content = self.cpu_ms(lambda: renderer.render(data), repeat)
+                        results[path] = content
+                        self.stdout.write(
+                            f'{endpoint:<8} {size:>6} {len(content):>10} {path:<9} '
+                            f'{build_ms:>9.2f} {render_ms:>9.2f} {build_ms + render_ms:>9.2f}'
+                        )
+                    if results['drf'] != results['fast']:
+                        raise CommandError(f'{endpoint} detail differs between the two paths at size {size}')
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Both paths produced identical responses'))
@@ -0,0 +1,127 @@
+"""
+Management command to EXPLAIN the queries of every courses endpoint
+Run: python manage.py check_query_plans
+
+Fails if any plan falls back to a full table scan or a filesort. Run it
+against a database with realistic data: on near-empty tables some planners
+prefer a scan regardless of the indexes available.
+"""
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from courses.grading import answer_key_queryset
+from courses.models import Course, Quiz
+from courses.pagination import CreatedAtCursorPagination, CompletedAtCursorPagination
+from courses.queries import (
+    course_list_queryset, pdf_list_queryset, quiz_list_queryset, attempt_history_queryset,
+    attempt_breakdown_queryset, course_detail_values_queryset, course_pdf_values_queryset,
+    course_quiz_values_queryset, quiz_detail_values_queryset, question_values_queryset,
+    choice_values_queryset
+)
+
+# Patterns that mark a bad plan, per database vendor
+BAD_PLAN_PATTERNS = {
+    'sqlite': [
+        (re.compile(r'\bSCAN \w+$'), 'full table scan'),
+        (re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)'), 'filesort'),
+    ],
+    'postgresql': [
+        (re.compile(r'\bSeq Scan\b'), 'full table scan'),
+        (re.compile(r'^\s*(->\s*)?Sort\b'), 'filesort'),
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the main query of each courses endpoint and fail on full scans or filesorts'
+
+    def page(self, queryset, pagination_class, cursor=False):
+        page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 20
+        queryset = queryset.order_by(*pagination_class.ordering)
+        if cursor:
+            # A following page: rows past the first row's position
+            pagination = pagination_class()
+            first = queryset.first()
+            position = pagination._get_position_from_instance(first, pagination.ordering) if first else None
+            if position is not None:
+                queryset = queryset.filter(pagination.after(queryset.model, position, reverse=False))
+        return queryset[:page_size + 1]
+
+    def endpoint_queries(self):
+        """(endpoint, queryset) pairs mirroring what each view executes"""
+        course_id, slug = Course.objects.values_list('id', 'slug').first() or (1, 'python-basics')
+        quiz_id = Quiz.objects.values_list('id', flat=True).first() or 1
+        question_ids = list(question_values_queryset(quiz_id).values_list('id', flat=True)) or [1]
+        # Any user id works; attempts are only looked up by the column
+        user_id = 1
+        created = CreatedAtCursorPagination
+        # Detail lookups are unordered, like QuerySet.get()
+        return [
+            ('GET /api/courses/', self.page(course_list_queryset(), created)),
+            ('GET /api/courses/<slug>/', course_detail_values_queryset().filter(slug=slug).order_by()),
+            ('GET /api/courses/<slug>/ (PDFs)', course_pdf_values_queryset(course_id)),
+            ('GET /api/courses/<slug>/ (quizzes)', course_quiz_values_queryset(course_id)),
+            ('GET /api/courses/?cursor=', self.page(course_list_queryset(), created, cursor=True)),
+            ('GET /api/pdfs/', self.page(pdf_list_queryset(), created)),
+            ('GET /api/pdfs/?course=', self.page(pdf_list_queryset(course_id), created)),
+            ('GET /api/pdfs/?course=&cursor=', self.page(pdf_list_queryset(course_id), created, cursor=True)),
+            ('GET /api/quizzes/', self.page(quiz_list_queryset(), created)),
+            ('GET /api/quizzes/?course=', self.page(quiz_list_queryset(course_id), created)),
+            ('GET /api/quizzes/<pk>/', quiz_detail_values_queryset().filter(pk=quiz_id).order_by()),
+            ('GET /api/quizzes/<pk>/ (questions)', question_values_queryset(quiz_id)),
+            ('GET /api/quizzes/<pk>/ (choices)', choice_values_queryset(question_ids)),
+            ('POST /api/quizzes/<pk>/submit/', answer_key_queryset(quiz_id)),
+            ('GET /api/quiz-attempts/', self.page(
+                attempt_history_queryset(user_id), CompletedAtCursorPagination
+            )),
+            ('GET /api/quiz-attempts/?cursor=', self.page(
+                attempt_history_queryset(user_id), CompletedAtCursorPagination, cursor=True
+            )),
+            ('GET /api/quiz-attempts/<pk>/', attempt_breakdown_queryset(user_id, 1)),
+        ]
+
+    def explain(self, queryset):
+        if connection.vendor == 'mysql':
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN {sql}', params)
+                columns = [column[0].lower() for column in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return queryset.explain().splitlines()
+
+    def problems(self, plan):
+        if connection.vendor == 'mysql':
+            found = []
+            for row in plan:
+                if row.get('type') == 'ALL':
+                    found.append(f"full table scan on {row.get('table')}")
+                if 'filesort' in (row.get('extra') or ''):
+                    found.append(f"filesort on {row.get('table')}")
+            return found
+        found = []
+        for line in plan:
+            for pattern, label in BAD_PLAN_PATTERNS.get(connection.vendor, []):
+                if pattern.search(line):
+                    found.append(f'{label}: {line.strip()}')
+        return found
+
+    def handle(self, *args, **options):
+        failures = 0
+        for endpoint, queryset in self.endpoint_queries():
+            plan = self.explain(queryset)
+            problems = self.problems(plan)
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'FAIL {endpoint}'))
+                for problem in problems:
+                    self.stdout.write(f'    {problem}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'OK   {endpoint}'))
+            if options['verbosity'] > 1:
+                for line in plan:
+                    self.stdout.write(f'    {line}')
+
+        if failures:
+            raise CommandError(f'{failures} endpoint query plan(s) use a full scan or filesort')
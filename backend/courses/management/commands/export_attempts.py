@@ -0,0 +1,43 @@
+"""
+Management command to export quiz attempts as CSV or NDJSON
+Run: python manage.py export_attempts --format csv -o attempts.csv
+"""
+from django.core.management.base import BaseCommand, CommandError
+from courses.export import (
+    DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, attempt_export_queryset, export_lines,
+    iter_attempt_rows, parse_boundary,
+)
+
+
+class Command(BaseCommand):
+    help = 'Stream quiz attempts with user email and quiz title to a file or stdout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--quiz', type=int, help='Only attempts at this quiz id')
+        parser.add_argument('--since', help='Completed on or after (YYYY-MM-DD or ISO 8601)')
+        parser.add_argument('--until', help='Completed on or before (YYYY-MM-DD or ISO 8601)')
+        parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_boundary(options['since']) if options['since'] else None
+            until = parse_boundary(options['until'], end=True) if options['until'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        attempts = attempt_export_queryset(options['quiz'], since, until)
+        rows = iter_attempt_rows(attempts, chunk_size=options['chunk_size'])
+        lines = export_lines(options['format'], rows)
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = -1 if options['format'] == 'csv' else 0
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} attempts to {options["output"]}'))
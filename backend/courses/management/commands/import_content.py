@@ -0,0 +1,25 @@
+"""
+Management command to bulk import courses, PDFs and question banks
+Run: python manage.py import_content question_bank.yaml
+"""
+from django.core.management.base import BaseCommand, CommandError
+from courses.content_import import ContentImportError, import_content, load_content
+
+
+class Command(BaseCommand):
+    help = 'Insert or update courses, PDFs, quizzes, questions and choices from YAML, JSON or CSV files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Content files (.yaml, .yml, .json or .csv)')
+        parser.add_argument('--format', choices=['yaml', 'json', 'csv'],
+                            help='File format when it differs from the extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            self.stdout.write(f'Importing {path}...')
+            try:
+                report = import_content(load_content(path, options['format']), batch_size=options['batch_size'])
+            except (ContentImportError, OSError) as e:
+                raise CommandError(f'{path}: {e}')
+            self.stdout.write(self.style.SUCCESS(str(report)))
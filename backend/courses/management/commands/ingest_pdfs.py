@@ -0,0 +1,31 @@
+"""
+Management command to ingest the PDF directory
+Run: python manage.py ingest_pdfs [--force] [--workers N] [--path DIR]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from courses.ingestion import ingest_pdfs
+
+
+class Command(BaseCommand):
+    help = 'Hash, extract and thumbnail new or changed PDFs in PDF_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Directory inside PDF_ROOT to scan (defaults to PDF_ROOT)')
+        parser.add_argument('--force', action='store_true', help='Re-extract unchanged files too')
+        parser.add_argument('--workers', type=int, help='Extraction processes (defaults to CPU count)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Ingesting PDFs...')
+        try:
+            report = ingest_pdfs(root=options['path'], force=options['force'], workers=options['workers'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for file_path in report.created:
+            self.stdout.write(self.style.SUCCESS(f'Created PDF: {file_path}'))
+        for file_path in report.updated:
+            self.stdout.write(self.style.SUCCESS(f'Updated PDF: {file_path}'))
+        for file_path, error in report.errors.items():
+            self.stdout.write(self.style.ERROR(f'Failed: {file_path} ({error})'))
+
+        self.stdout.write(f'Done: {report}')
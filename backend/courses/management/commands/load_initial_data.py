@@ -3,7 +3,7 @@ Management command to load initial courses, PDFs, and quiz data
 Run: python manage.py load_initial_data
 """
 from django.core.management.base import BaseCommand
-from courses.models import Course, PDF, Quiz, Question, Choice
+from courses.content_import import import_content
 
 
 class Command(BaseCommand):
@@ -61,16 +61,6 @@ class Command(BaseCommand):
             },
         ]
 
-        for course_data in courses_data:
-            course, created = Course.objects.get_or_create(
-                slug=course_data['slug'],
-                defaults=course_data
-            )
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created course: {course.title}'))
-            else:
-                self.stdout.write(f'Course already exists: {course.title}')
-
         # Create PDFs
         pdfs_data = [
             {
@@ -78,87 +68,68 @@ class Command(BaseCommand):
                 'description': 'Quick reference guide for Python syntax and common operations',
                 'filename': '🐍 Python Cheat Codes.pdf',
                 'file_path': '🐍 Python Cheat Codes.pdf',
-                'course': Course.objects.filter(slug='python-basics').first(),
+                'course': 'python-basics',
             },
             {
                 'title': 'Python Notes',
                 'description': 'Comprehensive notes covering Python fundamentals',
                 'filename': '🐍 Python Notes.pdf',
                 'file_path': '🐍 Python Notes.pdf',
-                'course': Course.objects.filter(slug='python-basics').first(),
+                'course': 'python-basics',
             },
             {
                 'title': 'DSA with Python CheatSheet',
                 'description': 'Data Structures and Algorithms quick reference',
                 'filename': 'DSA_with_Python_CheatSheet.pdf',
                 'file_path': 'DSA_with_Python_CheatSheet.pdf',
-                'course': Course.objects.filter(slug='dsa-with-python').first(),
+                'course': 'dsa-with-python',
             },
             {
                 'title': 'Python DSA',
                 'description': 'Complete guide to Data Structures in Python',
                 'filename': 'Python Dsa.pdf',
                 'file_path': 'Python Dsa.pdf',
-                'course': Course.objects.filter(slug='dsa-with-python').first(),
+                'course': 'dsa-with-python',
             },
             {
                 'title': 'Python Array Questions',
                 'description': 'Practice questions on Python arrays',
                 'filename': 'python_Array_Questions.pdf',
                 'file_path': 'python_Array_Questions.pdf',
-                'course': Course.objects.filter(slug='python-basics').first(),
+                'course': 'python-basics',
             },
             {
                 'title': 'Python Conditional Questions',
                 'description': 'Practice questions on conditionals and control flow',
                 'filename': 'python_conditional_questions.pdf',
                 'file_path': 'python_conditional_questions.pdf',
-                'course': Course.objects.filter(slug='python-basics').first(),
+                'course': 'python-basics',
             },
             {
                 'title': 'Python Function Questions',
                 'description': 'Practice questions on Python functions',
                 'filename': 'python_function_question.pdf',
                 'file_path': 'python_function_question.pdf',
-                'course': Course.objects.filter(slug='python-basics').first(),
+                'course': 'python-basics',
             },
             {
                 'title': 'Python Loop Questions',
                 'description': 'Practice questions on loops in Python',
                 'filename': 'python_Loop_Questions.pdf',
                 'file_path': 'python_Loop_Questions.pdf',
-                'course': Course.objects.filter(slug='python-basics').first(),
+                'course': 'python-basics',
             },
         ]
 
-        for pdf_data in pdfs_data:
-            pdf, created = PDF.objects.get_or_create(
-                filename=pdf_data['filename'],
-                defaults=pdf_data
-            )
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created PDF: {pdf.title}'))
-            else:
-                self.stdout.write(f'PDF already exists: {pdf.title}')
-
-        # Create Quiz for Python Basics
-        python_basics_course = Course.objects.filter(slug='python-basics').first()
-        if python_basics_course:
-            quiz, created = Quiz.objects.get_or_create(
-                title='Python Basics Quiz',
-                defaults={
-                    'description': 'Test your knowledge in Python Basics, Conditionals, Control Flow, Functions & Arrays',
-                    'course': python_basics_course,
-                    'time_limit': 30,
-                    'passing_score': 70,
-                }
-            )
-
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created quiz: {quiz.title}'))
-
-                # Add questions
-                questions_data = [
+        # Quiz for Python Basics
+        quizzes_data = [
+            {
+                'title': 'Python Basics Quiz',
+                'description': 'Test your knowledge in Python Basics, Conditionals, Control Flow, Functions & Arrays',
+                'course': 'python-basics',
+                'time_limit': 30,
+                'passing_score': 70,
+                'questions': [
                     {
                         'question_text': 'What is the output of: print(2 * 3 + 1)?',
                         'order': 0,
@@ -204,14 +175,18 @@ class Command(BaseCommand):
                             {'choice_text': 'arr = {1, 2, 3}', 'is_correct': False, 'order': 2},
                         ]
                     },
-                ]
+                ],
+            },
+        ]
 
-                for q_data in questions_data:
-                    choices = q_data.pop('choices')
-                    question = Question.objects.create(quiz=quiz, **q_data)
-                    for c_data in choices:
-                        Choice.objects.create(question=question, **c_data)
-                    self.stdout.write(f'  Added question: {question.question_text[:50]}...')
+        # Rows are matched by slug, filename, quiz title and question/choice
+        # text. Only missing rows are created, so running this again leaves
+        # edits made in the admin alone.
+        report = import_content({
+            'courses': courses_data,
+            'pdfs': pdfs_data,
+            'quizzes': quizzes_data,
+        }, update=False)
+        self.stdout.write(str(report))
 
         self.stdout.write(self.style.SUCCESS('\nInitial data loaded successfully!'))
-
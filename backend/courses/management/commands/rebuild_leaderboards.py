@@ -0,0 +1,18 @@
+"""
+Management command to recompute leaderboard scores
+Run: python manage.py rebuild_leaderboards
+"""
+from django.core.management.base import BaseCommand
+from courses.leaderboard import get_backend, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute every best and total leaderboard score from quiz attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Rebuilding leaderboards ({get_backend().name} backend)...')
+        best_scores, users = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {best_scores} best scores for {users} users'))
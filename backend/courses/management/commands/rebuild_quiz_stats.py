@@ -0,0 +1,19 @@
+"""
+Management command to recompute quiz and question statistics
+Run: python manage.py rebuild_quiz_stats
+"""
+from django.core.management.base import BaseCommand
+from courses.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute quiz pass rates, average scores and question difficulty from attempt history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Attempts aggregated per query')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding quiz statistics...')
+        quizzes, questions = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {quizzes} quizzes and {questions} questions'))
@@ -0,0 +1,19 @@
+"""
+Management command to rebuild the search index
+Run: python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+from courses.search import get_backend, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Re-create every search entry for courses, PDFs, quizzes and questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Rebuilding search index ({get_backend().name} backend)...')
+        counts = rebuild(batch_size=options['batch_size'])
+        for kind, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} {kind} entries'))
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:21
+
+from django.db import migrations, models
+
+
+# Kept in the migration, rather than imported from app code, so later app
+# changes can't alter what it does.
+def index_for_connection(index, connection):
+    """Return ``index`` itself, or its composite fallback for ``connection``"""
+    if index.condition is None or connection.features.supports_partial_indexes:
+        return index
+    condition_fields = [lookup.split('__')[0] for lookup, _ in index.condition.children]
+    fields = condition_fields + [field for field in index.fields if field not in condition_fields]
+    return models.Index(fields=fields, name=index.name)
+
+
+class AddPartialIndex(migrations.AddIndex):
+    """AddIndex with a composite fallback for backends lacking partial indexes
+
+    Django ignores ``Index.condition`` on backends without partial indexes
+    (MySQL/MariaDB) and would build a plain index on the remaining columns.
+    This builds a composite index that leads with the condition's columns
+    instead, so ``WHERE is_active ... ORDER BY ...`` is still index-only.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, index_for_connection(self.index, schema_editor.connection))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, index_for_connection(self.index, schema_editor.connection))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_cursor_pagination_indexes'),
+    ]
+
+    # Partial indexes fall back to composite (is_active, ...) indexes on
+    # backends without partial index support, see AddPartialIndex above.
+    operations = [
+        migrations.AddIndex(
+            model_name='choice',
+            index=models.Index(fields=['question', 'order', 'id'], name='choice_question_order_idx'),
+        ),
+        AddPartialIndex(
+            model_name='course',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='course_active_created_idx'),
+        ),
+        AddPartialIndex(
+            model_name='pdf',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='pdf_active_created_idx'),
+        ),
+        AddPartialIndex(
+            model_name='pdf',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['course', '-created_at', '-id'], name='pdf_active_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['quiz', 'order', 'id'], name='question_quiz_order_idx'),
+        ),
+        AddPartialIndex(
+            model_name='quiz',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='quiz_active_created_idx'),
+        ),
+        AddPartialIndex(
+            model_name='quiz',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['course', '-created_at', '-id'], name='quiz_active_course_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PDFText',
+            fields=[
+                ('pdf', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='extracted_text', serialize=False, to='courses.pdf')),
+                ('text', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='pdf',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of the file', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='pdf',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, help_text='Size in bytes', null=True),
+        ),
+        migrations.AddField(
+            model_name='pdf',
+            name='ingested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdf',
+            name='page_count',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdf',
+            name='thumbnail',
+            field=models.CharField(blank=True, help_text='Filename in PDF_THUMBNAIL_ROOT', max_length=255),
+        ),
+    ]
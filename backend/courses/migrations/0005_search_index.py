@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:28
+
+from django.db import migrations, models, transaction
+
+# Frozen here rather than imported, so later changes to courses.search
+# can't change what this migration does
+SQLITE_INDEX_SQL = [
+    """CREATE VIRTUAL TABLE courses_searchdocument_fts USING fts5(
+        title, body,
+        content='courses_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER courses_searchdocument_ai AFTER INSERT ON courses_searchdocument BEGIN
+        INSERT INTO courses_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER courses_searchdocument_ad AFTER DELETE ON courses_searchdocument BEGIN
+        INSERT INTO courses_searchdocument_fts(courses_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER courses_searchdocument_au AFTER UPDATE ON courses_searchdocument BEGIN
+        INSERT INTO courses_searchdocument_fts(courses_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO courses_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+
+def create_native_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                for sql in SQLITE_INDEX_SQL:
+                    schema_editor.execute(sql)
+        except Exception:
+            # SQLite built without FTS5: the python backend takes over
+            pass
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE courses_searchdocument ADD FULLTEXT INDEX searchdocument_fulltext (title, body)'
+        )
+
+
+def drop_native_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS courses_searchdocument_{trigger}')
+        schema_editor.execute('DROP TABLE IF EXISTS courses_searchdocument_fts')
+    elif vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE courses_searchdocument DROP INDEX searchdocument_fulltext')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_pdf_ingestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('course', 'Course'), ('pdf', 'PDF'), ('quiz', 'Quiz'), ('question', 'Question')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('course_id', models.BigIntegerField(blank=True, null=True)),
+                ('quiz_id', models.BigIntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='searchdocument_kind_object_uniq'),
+        ),
+        # SQLite FTS5 table + sync triggers, or a MySQL FULLTEXT index
+        migrations.RunPython(create_native_index, drop_native_index),
+    ]
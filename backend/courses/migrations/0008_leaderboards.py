@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0007_quiz_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TotalScore',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='total_score', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('score', models.IntegerField(default=0)),
+                ('achieved_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score', 'achieved_at', 'user'], name='totalscore_rank_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BestScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0)),
+                ('achieved_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_scores', to='courses.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_scores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['quiz', '-score', 'achieved_at', 'user'], name='bestscore_quiz_rank_idx'), models.Index(fields=['quiz', 'updated_at'], name='bestscore_quiz_updated_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bestscore',
+            constraint=models.UniqueConstraint(fields=('quiz', 'user'), name='bestscore_quiz_user_uniq'),
+        ),
+    ]
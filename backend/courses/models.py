@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -24,7 +25,11 @@ class Course(models.Model):
     is_active = models.BooleanField(default=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='course_created_id_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=Q(is_active=True), name='course_active_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -37,16 +42,36 @@ class PDF(models.Model):
     filename = models.CharField(max_length=255, unique=True)
     file_path = models.CharField(max_length=500, help_text="Path relative to static/pdfs/")
     course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, related_name='pdfs')
+    # Filled in by the ingestion pipeline (python manage.py ingest_pdfs)
+    file_size = models.BigIntegerField(null=True, blank=True, help_text="Size in bytes")
+    page_count = models.IntegerField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the file")
+    thumbnail = models.CharField(max_length=255, blank=True, help_text="Filename in PDF_THUMBNAIL_ROOT")
+    ingested_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='pdf_created_id_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=Q(is_active=True), name='pdf_active_created_idx'),
+            models.Index(fields=['course', '-created_at', '-id'], condition=Q(is_active=True), name='pdf_active_course_idx'),
+        ]
     
     def __str__(self):
         return self.title
 
 
+class PDFText(models.Model):
+    """Text extracted from a PDF, kept apart so listings never load it"""
+    pdf = models.OneToOneField(PDF, on_delete=models.CASCADE, primary_key=True, related_name='extracted_text')
+    text = models.TextField(blank=True)
+    
+    def __str__(self):
+        return f"Text of {self.pdf}"
+
+
 class Quiz(models.Model):
     """Quiz Model"""
     title = models.CharField(max_length=200)
@@ -58,7 +83,12 @@ class Quiz(models.Model):
     is_active = models.BooleanField(default=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='quiz_created_id_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=Q(is_active=True), name='quiz_active_created_idx'),
+            models.Index(fields=['course', '-created_at', '-id'], condition=Q(is_active=True), name='quiz_active_course_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -73,6 +103,9 @@ class Question(models.Model):
     
     class Meta:
         ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['quiz', 'order', 'id'], name='question_quiz_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.quiz.title} - Q{self.order + 1}"
@@ -87,6 +120,9 @@ class Choice(models.Model):
     
     class Meta:
         ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['question', 'order', 'id'], name='choice_question_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.question} - {self.choice_text}"
@@ -101,8 +137,141 @@ class QuizAttempt(models.Model):
     completed_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        ordering = ['-completed_at']
+        ordering = ['-completed_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-completed_at', '-id'], name='attempt_user_completed_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.quiz.title} - {self.score}%"
 
+
+class AttemptAnswer(models.Model):
+    """One graded answer of a QuizAttempt"""
+    attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='attempt_answers')
+    choice = models.ForeignKey(Choice, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    is_correct = models.BooleanField(default=False)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'question'], name='attemptanswer_attempt_question_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"Attempt {self.attempt_id} - Question {self.question_id}"
+
+
+class QuizStats(models.Model):
+    """Running attempt totals for a quiz, updated on every submission"""
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attempt_count = models.PositiveIntegerField(default=0)
+    pass_count = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @property
+    def pass_rate(self):
+        return self.pass_count / self.attempt_count * 100 if self.attempt_count else None
+    
+    @property
+    def average_score(self):
+        return self.score_total / self.attempt_count if self.attempt_count else None
+    
+    def __str__(self):
+        return f"{self.quiz.title} - {self.attempt_count} attempts"
+
+
+class QuestionStats(models.Model):
+    """Running answer totals for a question, updated on every submission"""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='question_stats')
+    answer_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    
+    @property
+    def percent_correct(self):
+        return self.correct_count / self.answer_count * 100 if self.answer_count else None
+    
+    def __str__(self):
+        return f"Question {self.question_id} - {self.correct_count}/{self.answer_count}"
+
+
+class BestScore(models.Model):
+    """A user's best score on a quiz, the row behind quiz leaderboards"""
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='best_scores')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='best_scores')
+    score = models.IntegerField(default=0)
+    achieved_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'user'], name='bestscore_quiz_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['quiz', '-score', 'achieved_at', 'user'], name='bestscore_quiz_rank_idx'),
+            models.Index(fields=['quiz', 'updated_at'], name='bestscore_quiz_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.quiz.title} - {self.score}%"
+
+
+class TotalScore(models.Model):
+    """Sum of a user's best quiz scores, the row behind the global leaderboard"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='total_score')
+    score = models.IntegerField(default=0)
+    achieved_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', 'achieved_at', 'user'], name='totalscore_rank_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.score}"
+
+
+
+class SearchDocument(models.Model):
+    """Denormalized search entry for a course, PDF, quiz or question
+
+    Kept current by ``courses.signals`` and indexed by the configured search
+    backend (SQLite FTS5, MySQL FULLTEXT or the in-process index, see
+    ``courses.search``). Rows are deactivated rather than deleted so the
+    in-process index can pick up removals incrementally.
+    """
+    KIND_CHOICES = [
+        ('course', 'Course'),
+        ('pdf', 'PDF'),
+        ('quiz', 'Quiz'),
+        ('question', 'Question'),
+    ]
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    course_id = models.BigIntegerField(null=True, blank=True)
+    quiz_id = models.BigIntegerField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdocument_kind_object_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+
+class VersionStamp(models.Model):
+    """A cache version stamp, kept here when the cache is per process (see ``courses.cache``)"""
+    key = models.CharField(max_length=200, unique=True)
+    value = models.BigIntegerField()
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
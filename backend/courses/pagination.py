@@ -0,0 +1,152 @@
+"""
+Keyset (cursor) pagination for the courses API
+
+Pages are located by an opaque cursor on the ordering columns instead of
+an OFFSET, so fetching a deep page costs the same as fetching the first.
+Every ordering ends in ``-id`` and is backed by a composite index; the
+cursor holds the whole (e.g. ``(created_at, id)``) position, so rows that
+share a timestamp are paged by id rather than skipped over with an OFFSET.
+"""
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+POSITION_SEPARATOR = '|'
+
+
+def _reverse_ordering(ordering):
+    """``('-created_at', '-id')`` -> ``('created_at', 'id')``"""
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+class KeysetCursorPagination(CursorPagination):
+    """CursorPagination whose page query can also be run with the async ORM
+
+    DRF's ``paginate_queryset`` is split in two around the query, so
+    ``apaginate_queryset`` shares everything but the fetch.
+    """
+
+    def page_queryset(self, queryset, request, view=None):
+        """The sliced queryset of the requested page plus one row, or None"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+        self._position = (reverse, current_position, offset)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self.after(queryset.model, current_position, reverse))
+
+        # One extra row tells whether a following page exists
+        return queryset[offset:offset + self.page_size + 1]
+
+    def after(self, model, position, reverse):
+        """Rows past ``position`` in the (possibly reversed) ordering
+
+        Compares the ordering columns as a tuple, e.g.
+        ``created_at < c OR (created_at = c AND id < i)``, plus a bound on the
+        first column alone (``created_at <= c``) that planners can seek to.
+        """
+        values = position.split(POSITION_SEPARATOR)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = Q()
+        bound = None
+        for order, value in zip(self.ordering, values):
+            name = order.lstrip('-')
+            try:
+                value = model._meta.get_field(name).to_python(value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            # (cursor reversed) XOR (column descending)
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+            if bound is None:
+                bound = Q(**{f'{name}__{"lte" if lookup == "lt" else "gte"}': value})
+        return bound & condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip('-')
+            values.append(instance[name] if isinstance(instance, dict) else getattr(instance, name))
+        return POSITION_SEPARATOR.join(str(value) for value in values)
+
+    def finish_page(self, results):
+        """Set the cursor positions from the fetched rows; returns the page"""
+        reverse, current_position, offset = self._position
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # The query ran in reverse; put the page back in order
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.finish_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        if page_queryset._prefetch_related_lookups:
+            results = [row async for row in page_queryset]
+        else:
+            results = [row async for row in page_queryset.aiterator()]
+        return self.finish_page(results)
+
+
+class CreatedAtCursorPagination(KeysetCursorPagination):
+    """Newest first, for courses, PDFs and quizzes"""
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CompletedAtCursorPagination(KeysetCursorPagination):
+    """Most recent first, for quiz attempt history"""
+    ordering = ('-completed_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,26 @@
+"""
+Request body parsers
+
+``FastJSONParser`` is the default JSON parser, decoding with orjson when
+it is enabled (see ``courses.renderers.orjson_enabled``).
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson, orjson_enabled
+
+
+class FastJSONParser(JSONParser):
+    """DRF's JSONParser, decoding with orjson when it is enabled"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        # orjson only reads UTF-8
+        if not orjson_enabled() or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,48 @@
+"""
+PDF metadata, text and thumbnail extraction
+
+Runs inside the ingestion process pool, so this module must stay free of
+Django settings and model imports: worker processes started with the spawn
+or forkserver method import it without a configured Django.
+
+Text extraction uses pypdf. Thumbnails need PyMuPDF (``pip install
+pymupdf``), which is also preferred for text when it is installed.
+"""
+import os
+from pathlib import Path
+
+from pypdf import PdfReader
+
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+
+def extract_pdf(path, thumbnail_path, thumbnail_width):
+    """Return size, page count, text and thumbnail filename of a PDF"""
+    result = {'file_size': os.path.getsize(path), 'thumbnail': ''}
+    if pymupdf is not None:
+        with pymupdf.open(path) as document:
+            result['page_count'] = document.page_count
+            result['text'] = '\n'.join(page.get_text() for page in document)
+            if document.page_count:
+                zoom = thumbnail_width / document[0].rect.width
+                pixmap = document[0].get_pixmap(matrix=pymupdf.Matrix(zoom, zoom))
+                pixmap.save(thumbnail_path)
+                result['thumbnail'] = Path(thumbnail_path).name
+    else:
+        reader = PdfReader(path)
+        result['page_count'] = len(reader.pages)
+        result['text'] = '\n'.join(page.extract_text() or '' for page in reader.pages)
+    # NUL bytes from broken text layers can't be stored in every database
+    result['text'] = result['text'].replace('\x00', '')
+    return result
+
+
+def extract_pdf_safely(path, thumbnail_path, thumbnail_width):
+    """extract_pdf, reporting failures as ``{'error': ...}`` instead of raising"""
+    try:
+        return extract_pdf(path, thumbnail_path, thumbnail_width)
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
@@ -0,0 +1,155 @@
+"""
+Querysets behind the courses API endpoints
+
+Each endpoint's main query is built here so views, management commands
+and checks such as ``check_query_plans`` all run exactly the same SQL.
+"""
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from .models import Course, PDF, Quiz, Question, Choice, QuizAttempt
+
+
+def count_of(model, fk_field, **filters):
+    """Correlated COUNT of ``model`` rows pointing at the outer row
+
+    A per-row subquery keeps the outer query free of GROUP BY, so it can
+    still be read in index order without a sort.
+    """
+    counts = (
+        model.objects
+        .filter(**{fk_field: OuterRef('pk')}, **filters)
+        .order_by()
+        .values(fk_field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def with_question_count(queryset):
+    """Annotate a Quiz queryset with ``question_count``"""
+    return queryset.annotate(question_count=count_of(Question, 'quiz'))
+
+
+def course_list_queryset():
+    return Course.objects.filter(is_active=True).annotate(
+        pdf_count=count_of(PDF, 'course', is_active=True),
+        quiz_count=count_of(Quiz, 'course', is_active=True),
+    )
+
+
+def course_detail_queryset():
+    # Active PDFs and quizzes in one query each; prefetching also caches
+    # ``course`` on every child for ``course_title``.
+    return Course.objects.filter(is_active=True).prefetch_related(
+        Prefetch('pdfs', queryset=PDF.objects.filter(is_active=True)),
+        Prefetch('quizzes', queryset=with_question_count(Quiz.objects.filter(is_active=True))),
+    )
+
+
+def pdf_list_queryset(course_id=None):
+    queryset = PDF.objects.filter(is_active=True).select_related('course')
+    if course_id:
+        queryset = queryset.filter(course_id=course_id)
+    return queryset
+
+
+def quiz_list_queryset(course_id=None):
+    queryset = with_question_count(
+        Quiz.objects.filter(is_active=True).select_related('course')
+    )
+    if course_id:
+        queryset = queryset.filter(course_id=course_id)
+    return queryset
+
+
+def quiz_detail_queryset():
+    return (
+        Quiz.objects
+        .filter(is_active=True)
+        .select_related('course')
+        .prefetch_related('questions__choices')
+    )
+
+
+# values() rows for courses.fast_serializers, which builds the course and
+# quiz detail responses without model instances
+
+def course_detail_values_queryset():
+    return Course.objects.filter(is_active=True).values(
+        'id', 'title', 'description', 'slug', 'level', 'duration', 'icon', 'image', 'created_at',
+    )
+
+
+def course_pdf_values_queryset(course_id):
+    return PDF.objects.filter(is_active=True, course_id=course_id).values(
+        'id', 'title', 'description', 'filename', 'file_path', 'course',
+        'file_size', 'page_count', 'thumbnail', 'created_at',
+    )
+
+
+def course_quiz_values_queryset(course_id):
+    return with_question_count(Quiz.objects.filter(is_active=True, course_id=course_id)).values(
+        'id', 'title', 'description', 'course', 'time_limit', 'passing_score',
+        'question_count', 'created_at',
+    )
+
+
+def quiz_detail_values_queryset():
+    return Quiz.objects.filter(is_active=True).values(
+        'id', 'title', 'description', 'course', 'time_limit', 'passing_score', 'created_at',
+        course_title=F('course__title'),
+    )
+
+
+def question_values_queryset(quiz_id):
+    return Question.objects.filter(quiz_id=quiz_id).values('id', 'question_text', 'order')
+
+
+def choice_values_queryset(question_ids):
+    # Unordered: sorting rows from several index ranges needs a filesort,
+    # so the caller orders each question's choices itself
+    return (
+        Choice.objects
+        .filter(question_id__in=question_ids)
+        .order_by()
+        .values('id', 'question', 'choice_text', 'order')
+    )
+
+
+def attempt_history_queryset(user):
+    return (
+        QuizAttempt.objects
+        .filter(user=user)
+        .select_related('user', 'quiz')
+    )
+
+
+def attempt_breakdown_queryset(user, attempt_id):
+    """One row per answer of a user's attempt, attempt fields included
+
+    The attempt is LEFT JOINed to its answers, so an attempt recorded
+    before answers were stored still yields a single row with empty answer
+    columns. The correct answer is the question's first correct choice by
+    (order, id), read by a correlated subquery. Rows are left unordered to
+    avoid a sort; callers order them by the trailing question order.
+    """
+    correct_answer = (
+        Choice.objects
+        .filter(question_id=OuterRef('answers__question_id'), is_correct=True)
+        .order_by('order', 'id')
+        .values('choice_text')[:1]
+    )
+    return (
+        QuizAttempt.objects
+        .filter(pk=attempt_id, user=user)
+        .annotate(correct_answer=Subquery(correct_answer))
+        .order_by()
+        .values_list(
+            'id', 'quiz_id', 'quiz__title', 'quiz__passing_score',
+            'score', 'total_questions', 'completed_at',
+            'answers__question_id', 'answers__question__question_text',
+            'answers__choice__choice_text', 'answers__is_correct', 'correct_answer',
+            'answers__question__order',
+        )
+    )
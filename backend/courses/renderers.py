@@ -0,0 +1,104 @@
+"""
+Renderers for the API's JSON, the attempt export formats and the metrics endpoint
+
+``FastJSONRenderer`` is the default JSON renderer; it encodes with orjson
+when that is installed. Exports stream their rows themselves (see
+``courses.export``); their renderers let DRF negotiate
+``?format=csv``/``ndjson`` or the matching ``Accept`` header and render
+the odd error body in that format.
+"""
+import csv
+import io
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Dict keys may be ints (as json allows); datetimes go through DRF's
+# encoder, which formats them differently from orjson
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+
+def orjson_enabled():
+    """Whether API JSON is encoded and decoded with orjson (``JSON_BACKEND``)"""
+    return orjson is not None and getattr(settings, 'JSON_BACKEND', 'auto') != 'stdlib'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """DRF's JSONRenderer, encoding with orjson when it is enabled
+
+    The output is equivalent JSON to the stdlib encoder's, but not always
+    the same bytes. orjson writes floats in their shortest form (``2e-6``
+    where the stdlib writes ``2e-06``), and writes NaN and infinities as
+    ``null``, where the stdlib writes ``NaN`` or, with DRF's strict JSON,
+    refuses them. Indented output, which the browsable API asks for, still
+    uses the stdlib.
+    """
+    _default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            not orjson_enabled()
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(data, default=self._default, option=ORJSON_OPTIONS)
+        # Escaped like DRF does, as JavaScript string literals can't hold them
+        return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        output = io.StringIO()
+        if rows and isinstance(rows[0], dict):
+            writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            csv.writer(output).writerows(rows)
+        return output.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        encoder = DjangoJSONEncoder()
+        return ''.join(encoder.encode(row) + '\n' for row in rows).encode(self.charset)
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Prometheus text exposition format; views return the text itself"""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            # Error bodies, as comments
+            data = ''.join(f'# {key}: {value}\n' for key, value in data.items())
+        return data.encode(self.charset)
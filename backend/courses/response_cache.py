@@ -0,0 +1,220 @@
+"""
+Full-response cache for the public catalogue endpoints
+
+Rendered JSON bytes are stored in Django's cache under a key built from the
+request path, the normalized ``course``/pagination query parameters and the
+version stamp of the response's invalidation group. Signals in
+``courses.signals`` bump exactly the groups a model change affects.
+
+Entries carry a soft expiry. Once it passes, a single worker takes a lock
+and regenerates the entry while the others keep serving the old bytes,
+and on a cold key the others wait briefly for that worker instead of all
+hitting the database at once.
+"""
+import asyncio
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .cache import acall, aget_stamp, bump_stamp, get_stamp
+from .conditional import request_from_args
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 5 * 60,
+    'STALE_TIMEOUT': 60,
+    'LOCK_TIMEOUT': 10,
+    'WAIT_INTERVAL': 0.05,
+}
+JSON_MEDIA_TYPE = 'application/json'
+
+
+def _get_setting(name):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def _cache():
+    return caches[_get_setting('CACHE_ALIAS')]
+
+
+def _group_key(group):
+    return f'response_group:{group}'
+
+
+def invalidate_groups(*groups):
+    """Drop every cached response belonging to ``groups``"""
+    for group in set(groups):
+        bump_stamp(_group_key(group))
+
+
+def normalized_query(request):
+    """Query parameters that select the body, or None if they are invalid"""
+    params = request.GET
+    course = params.get('course')
+    page_size = params.get('page_size')
+    if course and not course.isdigit():
+        return None
+    if page_size and not page_size.isdigit():
+        return None
+    return (
+        f"course={int(course) if course else ''}"
+        f"&cursor={params.get('cursor', '')}"
+        f"&page_size={int(page_size) if page_size else ''}"
+    )
+
+
+def course_group(request):
+    """Group for lists filterable by ``?course=``: ``all`` or the course id"""
+    course = request.GET.get('course')
+    return int(course) if course and course.isdigit() else 'all'
+
+
+def _key(request, query, media_type, version):
+    raw = '|'.join([request.path, query, media_type, str(version)])
+    return 'response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _response_key(request, group):
+    query = normalized_query(request)
+    if query is None:
+        return None
+    return _key(request, query, request.accepted_media_type, get_stamp(_group_key(group)))
+
+
+async def _aresponse_key(request, group):
+    query = normalized_query(request)
+    if query is None:
+        return None
+    # Async views only render JSON, the same bytes as the DRF views, so the
+    # two share entries
+    return _key(request, query, JSON_MEDIA_TYPE, await aget_stamp(_group_key(group)))
+
+
+def _from_entry(entry):
+    _soft_expiry, content, content_type = entry
+    return HttpResponse(content, content_type=content_type)
+
+
+def _render(request, response):
+    response.accepted_renderer = request.accepted_renderer
+    response.accepted_media_type = request.accepted_media_type
+    response.renderer_context = {'request': request, 'response': response}
+    return response.rendered_content, response['Content-Type']
+
+
+def _wait_for(key):
+    """Poll for an entry another worker is building"""
+    cache = _cache()
+    deadline = time.monotonic() + _get_setting('LOCK_TIMEOUT')
+    while time.monotonic() < deadline:
+        time.sleep(_get_setting('WAIT_INTERVAL'))
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+async def _await_for(key):
+    cache = _cache()
+    deadline = time.monotonic() + _get_setting('LOCK_TIMEOUT')
+    while time.monotonic() < deadline:
+        await asyncio.sleep(_get_setting('WAIT_INTERVAL'))
+        entry = await acall(cache, 'get', key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _acached_response(group_for, view):
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        request = request_from_args(args)
+        if request.method not in ('GET', 'HEAD'):
+            return await view(*args, **kwargs)
+
+        key = await _aresponse_key(request, group_for(request, **kwargs))
+        if key is None:
+            return await view(*args, **kwargs)
+
+        cache = _cache()
+        entry = await acall(cache, 'get', key)
+        if entry is not None and entry[0] > time.time():
+            return _from_entry(entry)
+
+        lock_key = f'{key}:lock'
+        locked = await acall(cache, 'add', lock_key, 1, _get_setting('LOCK_TIMEOUT'))
+        if not locked:
+            if entry is None:
+                entry = await _await_for(key)
+            if entry is not None:
+                return _from_entry(entry)
+
+        try:
+            response = await view(*args, **kwargs)
+            if response.status_code != 200:
+                return response
+            timeout = _get_setting('TIMEOUT')
+            entry = (time.time() + timeout, response.content, response['Content-Type'])
+            await acall(cache, 'set', key, entry, timeout + _get_setting('STALE_TIMEOUT'))
+            return _from_entry(entry)
+        finally:
+            if locked:
+                await acall(cache, 'delete', lock_key)
+    return wrapper
+
+
+def cached_response(group_for):
+    """Serve a JSON GET view from the response cache
+
+    ``group_for(request, **kwargs)`` names the invalidation group of the
+    response. Only 200 JSON responses are stored; anything else, and every
+    non-JSON format such as the browsable API, passes straight through.
+    Async views (which only render JSON) are wrapped the same way.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return _acached_response(group_for, view)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request = request_from_args(args)
+            renderer = getattr(request, 'accepted_renderer', None)
+            if request.method not in ('GET', 'HEAD') or renderer is None or renderer.format != 'json':
+                return view(*args, **kwargs)
+
+            key = _response_key(request, group_for(request, **kwargs))
+            if key is None:
+                return view(*args, **kwargs)
+
+            cache = _cache()
+            entry = cache.get(key)
+            if entry is not None and entry[0] > time.time():
+                return _from_entry(entry)
+
+            lock_key = f'{key}:lock'
+            locked = cache.add(lock_key, 1, _get_setting('LOCK_TIMEOUT'))
+            if not locked:
+                # Another worker is regenerating this entry
+                if entry is None:
+                    entry = _wait_for(key)
+                if entry is not None:
+                    return _from_entry(entry)
+
+            try:
+                response = view(*args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                content, content_type = _render(request, response)
+                timeout = _get_setting('TIMEOUT')
+                entry = (time.time() + timeout, content, content_type)
+                cache.set(key, entry, timeout + _get_setting('STALE_TIMEOUT'))
+                return _from_entry(entry)
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+        return wrapper
+    return decorator
@@ -0,0 +1,359 @@
+"""
+Full-text search over courses, PDFs, quizzes and questions
+
+``SearchDocument`` rows are the single source every backend indexes:
+
+* ``fts5``: an SQLite FTS5 external-content table kept in sync by
+  triggers, ranked with FTS5's built-in ``bm25()``;
+* ``mysql``: an InnoDB FULLTEXT index queried in boolean mode;
+* ``python``: an in-process inverted index with BM25 scoring, loaded from
+  the table and refreshed incrementally when the search stamp moves.
+
+``SEARCH_BACKEND = 'auto'`` picks the native index for the database in use
+and falls back to ``python`` when none is available. Every query term is
+prefix-matched and all terms must match.
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .bulk import bulk_upsert
+from .cache import bump_stamp, get_stamp
+from .models import Course, PDF, PDFText, Quiz, Question, SearchDocument
+
+# Created, with the MySQL FULLTEXT index, by migration 0005_search_index
+FTS_TABLE = 'courses_searchdocument_fts'
+SEARCH_STAMP_KEY = 'search_index_version'
+TITLE_WEIGHT = 3
+MAX_PREFIX_EXPANSIONS = 64
+# How far back the in-process index re-reads documents on every sync
+SYNC_OVERLAP = timedelta(minutes=5)
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+# -------------------------------
+# Documents
+# -------------------------------
+
+def _document(kind, object_id, title, body, course_id=None, quiz_id=None, is_active=True):
+    return SearchDocument(
+        kind=kind, object_id=object_id, title=title[:255], body=body,
+        course_id=course_id, quiz_id=quiz_id, is_active=is_active,
+    )
+
+
+def documents_for(model, ids):
+    """Fresh SearchDocuments for the given objects that still exist"""
+    if model is Course:
+        return [
+            _document('course', course.pk, course.title, course.description, course.pk, is_active=course.is_active)
+            for course in Course.objects.filter(pk__in=ids)
+        ]
+    if model is PDF:
+        texts = dict(PDFText.objects.filter(pdf_id__in=ids).values_list('pdf_id', 'text'))
+        return [
+            _document(
+                'pdf', pdf.pk, pdf.title, f"{pdf.description}\n{texts.get(pdf.pk, '')}",
+                pdf.course_id, is_active=pdf.is_active,
+            )
+            for pdf in PDF.objects.filter(pk__in=ids)
+        ]
+    if model is Quiz:
+        return [
+            _document('quiz', quiz.pk, quiz.title, quiz.description, quiz.course_id, quiz.pk, quiz.is_active)
+            for quiz in Quiz.objects.filter(pk__in=ids)
+        ]
+    if model is Question:
+        # Questions come in thousands per quiz, so skip building instances
+        rows = Question.objects.filter(pk__in=ids).values_list(
+            'pk', 'question_text', 'quiz_id', 'quiz__title', 'quiz__course_id', 'quiz__is_active',
+        )
+        return [
+            _document('question', pk, title, text, course_id, quiz_id, is_active)
+            for pk, text, quiz_id, title, course_id, is_active in rows
+        ]
+    raise ValueError(f'{model.__name__} is not searchable')
+
+
+KIND_BY_MODEL = {Course: 'course', PDF: 'pdf', Quiz: 'quiz', Question: 'question'}
+
+
+def index_objects(model, ids, batch_size=1000):
+    """Upsert the search entries of ``ids``; missing objects are deactivated"""
+    ids = list(ids)
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        documents = documents_for(model, batch)
+        bulk_upsert(
+            SearchDocument, documents,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['title', 'body', 'course_id', 'quiz_id', 'is_active', 'updated_at'],
+        )
+        found = {document.object_id for document in documents}
+        missing = [pk for pk in batch if pk not in found]
+        if missing:
+            unindex_objects(model, missing)
+    transaction.on_commit(lambda: bump_stamp(SEARCH_STAMP_KEY))
+
+
+def unindex_objects(model, ids):
+    """Hide deleted objects from search"""
+    # .save() per row so auto_now moves updated_at for the python index
+    for document in SearchDocument.objects.filter(kind=KIND_BY_MODEL[model], object_id__in=ids):
+        document.is_active = False
+        document.body = ''
+        document.save(update_fields=['is_active', 'body', 'updated_at'])
+    transaction.on_commit(lambda: bump_stamp(SEARCH_STAMP_KEY))
+
+
+def rebuild(batch_size=1000):
+    """Re-create every search entry from the source tables"""
+    counts = {}
+    for model in KIND_BY_MODEL:
+        ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+        index_objects(model, ids, batch_size=batch_size)
+        counts[KIND_BY_MODEL[model]] = len(ids)
+    stale = SearchDocument.objects.filter(is_active=True)
+    for model, kind in KIND_BY_MODEL.items():
+        stale = stale.exclude(kind=kind, object_id__in=model.objects.values('pk'))
+    for document in stale:
+        document.is_active = False
+        document.save(update_fields=['is_active', 'updated_at'])
+    if get_backend() is FTS5Backend:
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return counts
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+
+RESULT_FIELDS = ('kind', 'object_id', 'title', 'course_id', 'quiz_id')
+
+
+def _result(row, score):
+    kind, object_id, title, course_id, quiz_id = row
+    return {
+        'type': kind,
+        'id': object_id,
+        'title': title,
+        'course': course_id,
+        'quiz': quiz_id,
+        'score': round(score, 6),
+    }
+
+
+class FTS5Backend:
+    name = 'fts5'
+
+    @staticmethod
+    def search(terms, kinds, limit):
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        kind_sql = ''
+        params = [match]
+        if kinds:
+            kind_sql = f"AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += list(kinds)
+        params.append(limit)
+        sql = f"""
+            SELECT d.kind, d.object_id, d.title, d.course_id, d.quiz_id,
+                   bm25({FTS_TABLE}, {TITLE_WEIGHT}.0, 1.0) AS score
+            FROM {FTS_TABLE}
+            JOIN courses_searchdocument d ON d.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s AND d.is_active {kind_sql}
+            ORDER BY score
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            # FTS5's bm25() is negative, lower is better
+            return [_result(row[:5], -row[5]) for row in cursor.fetchall()]
+
+
+class MySQLBackend:
+    name = 'mysql'
+
+    @staticmethod
+    def search(terms, kinds, limit):
+        against = ' '.join(f'+{term}*' for term in terms)
+        kind_sql = ''
+        params = [against, against]
+        if kinds:
+            kind_sql = f"AND kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += list(kinds)
+        params.append(limit)
+        sql = f"""
+            SELECT kind, object_id, title, course_id, quiz_id,
+                   MATCH(title, body) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM courses_searchdocument
+            WHERE MATCH(title, body) AGAINST (%s IN BOOLEAN MODE) AND is_active {kind_sql}
+            ORDER BY score DESC
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [_result(row[:5], row[5]) for row in cursor.fetchall()]
+
+
+class InvertedIndex:
+    """In-memory BM25 index with prefix matching
+
+    ``postings`` maps term -> {doc id: weighted term frequency}; titles count
+    TITLE_WEIGHT times. ``terms`` is kept sorted so a prefix expands to a
+    contiguous slice found with bisect.
+    """
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.doc_terms = {}
+        self.doc_length = {}
+        self.doc_fields = {}
+        self.total_length = 0
+        self.terms = []
+        self.stamp = None
+        self.synced_until = None
+        self.lock = threading.Lock()
+
+    def remove(self, doc_id):
+        for term in self.doc_terms.pop(doc_id, ()):
+            postings = self.postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+                index = bisect.bisect_left(self.terms, term)
+                if index < len(self.terms) and self.terms[index] == term:
+                    del self.terms[index]
+        self.total_length -= self.doc_length.pop(doc_id, 0)
+        self.doc_fields.pop(doc_id, None)
+
+    def add(self, doc_id, fields, title, body):
+        self.remove(doc_id)
+        frequencies = defaultdict(int)
+        for token in tokenize(title):
+            frequencies[token] += TITLE_WEIGHT
+        for token in tokenize(body):
+            frequencies[token] += 1
+        for term, frequency in frequencies.items():
+            if term not in self.postings:
+                bisect.insort(self.terms, term)
+            self.postings[term][doc_id] = frequency
+        length = sum(frequencies.values())
+        self.doc_terms[doc_id] = list(frequencies)
+        self.doc_length[doc_id] = length
+        self.doc_fields[doc_id] = fields
+        self.total_length += length
+
+    def expand(self, prefix):
+        start = bisect.bisect_left(self.terms, prefix)
+        expansions = []
+        for term in self.terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            expansions.append(term)
+        return expansions
+
+    def search(self, terms, kinds, limit):
+        count = len(self.doc_length)
+        if not count:
+            return []
+        average_length = self.total_length / count
+        scores = None
+        for prefix in terms:
+            # Best-scoring expansion of each query term per document
+            term_scores = {}
+            for term in self.expand(prefix):
+                postings = self.postings[term]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_length[doc_id] / average_length)
+                    score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    if score > term_scores.get(doc_id, 0):
+                        term_scores[doc_id] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: scores[doc_id] + score for doc_id, score in term_scores.items() if doc_id in scores}
+            if not scores:
+                return []
+        if kinds:
+            scores = {doc_id: score for doc_id, score in scores.items() if self.doc_fields[doc_id][0] in kinds}
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [_result(self.doc_fields[doc_id], score) for doc_id, score in best]
+
+    def sync(self):
+        """Apply SearchDocument rows changed since the last sync"""
+        stamp = get_stamp(SEARCH_STAMP_KEY)
+        if stamp == self.stamp:
+            return
+        with self.lock:
+            if stamp == self.stamp:
+                return
+            rows = SearchDocument.objects.order_by('updated_at')
+            if self.synced_until is not None:
+                # A transaction that commits after this sync may carry an
+                # older updated_at; re-applying rows is idempotent, so look
+                # back further than any write transaction runs
+                rows = rows.filter(updated_at__gte=self.synced_until - SYNC_OVERLAP)
+            rows = rows.values_list('id', 'is_active', 'updated_at', 'title', 'body', *RESULT_FIELDS)
+            for doc_id, is_active, updated_at, title, body, *fields in rows.iterator(chunk_size=2000):
+                if is_active:
+                    self.add(doc_id, tuple(fields), title, body)
+                else:
+                    self.remove(doc_id)
+                self.synced_until = updated_at
+            self.stamp = stamp
+
+
+class PythonBackend:
+    name = 'python'
+    index = InvertedIndex()
+
+    @classmethod
+    def search(cls, terms, kinds, limit):
+        cls.index.sync()
+        return cls.index.search(terms, kinds, limit)
+
+
+_native_backend = {}
+
+
+def get_backend():
+    choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if choice == 'python':
+        return PythonBackend
+    if choice == 'fts5':
+        return FTS5Backend
+    if choice == 'mysql':
+        return MySQLBackend
+
+    alias = connection.alias
+    if alias not in _native_backend:
+        backend = PythonBackend
+        if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            backend = FTS5Backend
+        elif connection.vendor == 'mysql':
+            backend = MySQLBackend
+        _native_backend[alias] = backend
+    return _native_backend[alias]
+
+
+def search(query, kinds=None, limit=20):
+    """Ranked search results for ``query``, best first"""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    return get_backend().search(terms, kinds or (), limit)
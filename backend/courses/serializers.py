@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Course, PDF, Quiz, Question, Choice, QuizAttempt
 
@@ -26,6 +27,9 @@ class QuizListSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'description', 'course', 'course_title', 'time_limit', 'passing_score', 'question_count', 'created_at')
     
     def get_question_count(self, obj):
+        # Prefer the ``question_count`` annotation from the view's queryset
+        if hasattr(obj, 'question_count'):
+            return obj.question_count
         return obj.questions.count()
 
 
@@ -40,10 +44,17 @@ class QuizDetailSerializer(serializers.ModelSerializer):
 
 class PDFSerializer(serializers.ModelSerializer):
     course_title = serializers.CharField(source='course.title', read_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
     
     class Meta:
         model = PDF
-        fields = ('id', 'title', 'description', 'filename', 'file_path', 'course', 'course_title', 'created_at')
+        fields = ('id', 'title', 'description', 'filename', 'file_path', 'course', 'course_title',
+                  'file_size', 'page_count', 'thumbnail_url', 'created_at')
+    
+    def get_thumbnail_url(self, obj):
+        if not obj.thumbnail:
+            return None
+        return settings.PDF_THUMBNAIL_URL + obj.thumbnail
 
 
 class CourseListSerializer(serializers.ModelSerializer):
@@ -55,9 +66,15 @@ class CourseListSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'description', 'slug', 'level', 'duration', 'icon', 'image', 'pdf_count', 'quiz_count', 'created_at')
     
     def get_pdf_count(self, obj):
+        # Prefer the ``pdf_count`` annotation from CourseViewSet
+        if hasattr(obj, 'pdf_count'):
+            return obj.pdf_count
         return obj.pdfs.filter(is_active=True).count()
     
     def get_quiz_count(self, obj):
+        # Prefer the ``quiz_count`` annotation from CourseViewSet
+        if hasattr(obj, 'quiz_count'):
+            return obj.quiz_count
         return obj.quizzes.filter(is_active=True).count()
 
 
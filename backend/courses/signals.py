@@ -0,0 +1,179 @@
+"""
+Cache invalidation signals for the courses app
+"""
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_table_version, bump_version
+from .leaderboard import reload_boards, remove_quiz
+from .models import Course, PDF, Quiz, Question, Choice
+from .response_cache import invalidate_groups
+from .search import index_objects, unindex_objects
+
+
+def _bump_on_commit(quiz_id):
+    if quiz_id is not None:
+        # Bump after commit so a concurrent reader can't recache old rows
+        # under the new version.
+        transaction.on_commit(lambda: bump_version(quiz_id))
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    _bump_on_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    _bump_on_commit(instance.quiz_id)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    # Covers admin edits through ChoiceInline, which save each Choice
+    try:
+        quiz_id = instance.question.quiz_id
+    except Question.DoesNotExist:
+        # Parent question is being deleted; its own signal bumps the quiz
+        return
+    _bump_on_commit(quiz_id)
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=PDF)
+@receiver([post_save, post_delete], sender=Quiz)
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=Choice)
+def catalogue_table_changed(sender, instance, **kwargs):
+    # Changes the ETag of every catalogue response that reads this table
+    transaction.on_commit(lambda: bump_table_version(sender))
+
+
+# Response cache groups: 'courses' (course list), 'course:<slug>',
+# 'pdfs:<course id|all>', 'quizzes:<course id|all>' and 'quiz:<pk>'
+
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=PDF)
+@receiver(pre_save, sender=Quiz)
+def remember_previous_location(sender, instance, **kwargs):
+    # A renamed course or a PDF/quiz moved between courses also has to
+    # invalidate the responses it used to appear in.
+    if instance.pk is None:
+        return
+    field = 'slug' if sender is Course else 'course_id'
+    instance._previous_location = (
+        sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    )
+
+
+def course_detail_groups(course_ids):
+    """Response cache groups of the given courses' detail pages"""
+    course_ids = {course_id for course_id in course_ids if course_id is not None}
+    slugs = Course.objects.filter(pk__in=course_ids).values_list('slug', flat=True)
+    return [f'course:{slug}' for slug in slugs]
+
+
+def _invalidate_on_commit(groups):
+    transaction.on_commit(lambda: invalidate_groups(*groups))
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_responses_changed(sender, instance, **kwargs):
+    quiz_ids = Quiz.objects.filter(course_id=instance.pk).values_list('id', flat=True)
+    groups = [
+        'courses', f'course:{instance.slug}',
+        'pdfs:all', f'pdfs:{instance.pk}', 'quizzes:all', f'quizzes:{instance.pk}',
+    ]
+    groups += [f'quiz:{quiz_id}' for quiz_id in quiz_ids]
+    previous_slug = getattr(instance, '_previous_location', None)
+    if previous_slug:
+        groups.append(f'course:{previous_slug}')
+    _invalidate_on_commit(groups)
+
+
+def invalidate_pdf_responses(course_ids):
+    """Invalidate PDF listings after writes that bypass signals (bulk_update)"""
+    groups = ['courses', 'pdfs:all']
+    groups += [f'pdfs:{course_id}' for course_id in course_ids if course_id is not None]
+    groups += course_detail_groups(course_ids)
+    bump_table_version(PDF)
+    invalidate_groups(*groups)
+
+
+def invalidate_content(quiz_ids):
+    """Invalidate catalogue caches after bulk content writes (imports)"""
+    for quiz_id in quiz_ids:
+        bump_version(quiz_id)
+    for model in (Course, PDF, Quiz, Question, Choice):
+        bump_table_version(model)
+    course_ids = list(Course.objects.values_list('pk', flat=True))
+    groups = ['courses', 'pdfs:all', 'quizzes:all']
+    groups += [f'{listing}:{course_id}' for listing in ('pdfs', 'quizzes') for course_id in course_ids]
+    groups += course_detail_groups(course_ids)
+    groups += [f'quiz:{quiz_id}' for quiz_id in quiz_ids]
+    invalidate_groups(*groups)
+
+
+@receiver([post_save, post_delete], sender=PDF)
+@receiver([post_save, post_delete], sender=Quiz)
+def listing_responses_changed(sender, instance, **kwargs):
+    listing = 'pdfs' if sender is PDF else 'quizzes'
+    course_ids = [instance.course_id, getattr(instance, '_previous_location', None)]
+    groups = ['courses', f'{listing}:all']
+    groups += [f'{listing}:{course_id}' for course_id in course_ids if course_id is not None]
+    groups += course_detail_groups(course_ids)
+    if sender is Quiz:
+        groups.append(f'quiz:{instance.pk}')
+    _invalidate_on_commit(groups)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_responses_changed(sender, instance, **kwargs):
+    # Question counts appear in quiz listings and course detail
+    course_id = Quiz.objects.filter(pk=instance.quiz_id).values_list('course_id', flat=True).first()
+    groups = [f'quiz:{instance.quiz_id}', 'quizzes:all']
+    if course_id is not None:
+        groups.append(f'quizzes:{course_id}')
+        groups += course_detail_groups([course_id])
+    _invalidate_on_commit(groups)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def choice_responses_changed(sender, instance, **kwargs):
+    try:
+        quiz_id = instance.question.quiz_id
+    except Question.DoesNotExist:
+        return
+    _invalidate_on_commit([f'quiz:{quiz_id}'])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=PDF)
+@receiver(post_save, sender=Quiz)
+@receiver(post_save, sender=Question)
+def search_document_saved(sender, instance, **kwargs):
+    index_objects(sender, [instance.pk])
+    if sender is Quiz:
+        # Questions carry their quiz's title and active flag
+        index_objects(Question, instance.questions.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=PDF)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=Question)
+def search_document_deleted(sender, instance, **kwargs):
+    unindex_objects(sender, [instance.pk])
+
+
+@receiver(pre_delete, sender=Quiz)
+def leaderboard_quiz_deleted(sender, instance, **kwargs):
+    remove_quiz(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def leaderboard_user_deleted(sender, instance, **kwargs):
+    # Deleted users' scores cascade away without touching updated_at
+    reload_boards()
@@ -0,0 +1,180 @@
+"""
+Materialized quiz and question statistics
+
+``QuizStats`` and ``QuestionStats`` hold running totals that every
+submission bumps with ``F()`` increments inside the attempt's transaction,
+so reading a quiz's pass rate, average score or per-question difficulty is
+a primary-key lookup however many attempts exist. ``rebuild`` recomputes
+the totals from ``QuizAttempt``/``AttemptAnswer`` history.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Max, Q, Sum, Value, When
+
+from .models import AttemptAnswer, Question, QuestionStats, QuizAttempt, QuizStats
+
+
+def _increment_quiz(quiz_id, score, passed):
+    return QuizStats.objects.filter(pk=quiz_id).update(
+        attempt_count=F('attempt_count') + 1,
+        pass_count=F('pass_count') + int(passed),
+        score_total=F('score_total') + score,
+    )
+
+
+def _increment_questions(question_ids, correct_ids):
+    correct = Case(When(pk__in=correct_ids, then=Value(1)), default=Value(0)) if correct_ids else Value(0)
+    return QuestionStats.objects.filter(pk__in=question_ids).update(
+        answer_count=F('answer_count') + 1,
+        correct_count=F('correct_count') + correct,
+    )
+
+
+def record_submission(quiz_id, result):
+    """Add one graded submission to the quiz and question totals
+
+    Call inside the attempt's transaction. The warm path is two UPDATEs
+    however many questions the quiz has; rows missing on a quiz's first
+    submission are created with zero totals and then incremented.
+    """
+    if not _increment_quiz(quiz_id, result.score, result.passed):
+        try:
+            with transaction.atomic():
+                QuizStats.objects.create(quiz_id=quiz_id)
+        except IntegrityError:
+            # Created by a concurrent submission
+            pass
+        _increment_quiz(quiz_id, result.score, result.passed)
+
+    question_ids = [question_id for question_id, _choice_id, _is_correct in result.answers]
+    correct_ids = [question_id for question_id, _choice_id, is_correct in result.answers if is_correct]
+    if not question_ids:
+        return
+    if _increment_questions(question_ids, correct_ids) < len(question_ids):
+        existing = set(QuestionStats.objects.filter(pk__in=question_ids).values_list('pk', flat=True))
+        missing = [question_id for question_id in question_ids if question_id not in existing]
+        QuestionStats.objects.bulk_create(
+            [QuestionStats(question_id=question_id, quiz_id=quiz_id) for question_id in missing],
+            ignore_conflicts=True,
+        )
+        _increment_questions(missing, [question_id for question_id in correct_ids if question_id in missing])
+
+
+def _attempt_totals(attempts, quiz_totals):
+    rows = (
+        attempts
+        .order_by()
+        .values('quiz_id')
+        .annotate(
+            attempts=Count('pk'),
+            passes=Count('pk', filter=Q(score__gte=F('quiz__passing_score'))),
+            scores=Sum('score'),
+        )
+    )
+    for row in rows:
+        totals = quiz_totals.setdefault(row['quiz_id'], [0, 0, 0])
+        totals[0] += row['attempts']
+        totals[1] += row['passes']
+        totals[2] += row['scores'] or 0
+
+
+def _answer_totals(answers, question_totals):
+    rows = (
+        answers
+        .order_by()
+        .values('question_id')
+        .annotate(answers=Count('pk'), correct=Count('pk', filter=Q(is_correct=True)))
+    )
+    for row in rows:
+        totals = question_totals.setdefault(row['question_id'], [0, 0])
+        totals[0] += row['answers']
+        totals[1] += row['correct']
+
+
+def _aggregate(start_id, end_id, quiz_totals, question_totals):
+    attempts = QuizAttempt.objects.filter(pk__gt=start_id)
+    answers = AttemptAnswer.objects.filter(attempt_id__gt=start_id)
+    if end_id is not None:
+        attempts = attempts.filter(pk__lte=end_id)
+        answers = answers.filter(attempt_id__lte=end_id)
+    _attempt_totals(attempts, quiz_totals)
+    _answer_totals(answers, question_totals)
+
+
+def rebuild(batch_size=10000):
+    """Recompute every quiz and question total from attempt history
+
+    History is aggregated in ``batch_size`` attempt-id ranges so no single
+    query scans the whole table. The final catch-up range and the swap of
+    the stats rows run in one transaction that first locks every stats row
+    (and, on MySQL, the gaps between them). Submissions made from then on
+    wait to increment until the rebuilt rows are committed, so each attempt
+    is counted exactly once. Passes are judged against each quiz's current
+    passing score.
+    """
+    quiz_totals = {}
+    question_totals = {}
+    # The newest batch is left to the locked catch-up: an attempt whose
+    # transaction is still open may hold an id just below the current last
+    last_id = max((QuizAttempt.objects.aggregate(last=Max('pk'))['last'] or 0) - batch_size, 0)
+    for start_id in range(0, last_id, batch_size):
+        _aggregate(start_id, min(start_id + batch_size, last_id), quiz_totals, question_totals)
+
+    with transaction.atomic():
+        # Lock before aggregating, so the catch-up sees every attempt whose
+        # increments the swap is about to overwrite
+        list(QuizStats.objects.select_for_update().values_list('pk', flat=True))
+        list(QuestionStats.objects.select_for_update().values_list('pk', flat=True))
+        _aggregate(last_id, None, quiz_totals, question_totals)
+        quiz_ids = dict(
+            Question.objects.filter(pk__in=question_totals).values_list('pk', 'quiz_id')
+        )
+        QuizStats.objects.all().delete()
+        QuestionStats.objects.all().delete()
+        QuizStats.objects.bulk_create(
+            [
+                QuizStats(quiz_id=quiz_id, attempt_count=attempts, pass_count=passes, score_total=scores)
+                for quiz_id, (attempts, passes, scores) in quiz_totals.items()
+            ],
+            batch_size=batch_size,
+        )
+        QuestionStats.objects.bulk_create(
+            [
+                QuestionStats(
+                    question_id=question_id, quiz_id=quiz_ids[question_id],
+                    answer_count=answers, correct_count=correct,
+                )
+                for question_id, (answers, correct) in question_totals.items()
+                if question_id in quiz_ids
+            ],
+            batch_size=batch_size,
+        )
+    return len(quiz_totals), len(question_totals)
+
+
+def quiz_stats(quiz_id):
+    """Pass rate, average score and per-question difficulty of a quiz"""
+    stats = QuizStats.objects.filter(pk=quiz_id).first() or QuizStats(quiz_id=quiz_id)
+    questions = (
+        QuestionStats.objects
+        .filter(quiz_id=quiz_id)
+        .select_related('question')
+        .only('answer_count', 'correct_count', 'question__question_text', 'question__order')
+        .order_by('question__order', 'question_id')
+    )
+    return {
+        'quiz': quiz_id,
+        'attempt_count': stats.attempt_count,
+        'pass_count': stats.pass_count,
+        'pass_rate': stats.pass_rate,
+        'average_score': stats.average_score,
+        'questions': [
+            {
+                'question_id': question.question_id,
+                'question_text': question.question.question_text,
+                'answer_count': question.answer_count,
+                'correct_count': question.correct_count,
+                'percent_correct': question.percent_correct,
+            }
+            for question in questions
+        ],
+    }
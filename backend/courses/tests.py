@@ -0,0 +1,354 @@
+import io
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from pypdf import PdfWriter
+from rest_framework.test import APIClient
+
+from accounts.views import get_tokens_for_user
+from pycoder_backend import routers
+
+from . import instrumentation
+from .cache import clear_local
+from .content_import import import_content
+from .ingestion import ingest_pdfs
+from .models import Course, PDF, Quiz, Question, Choice
+from .renderers import FastJSONRenderer, orjson
+from .views import leaderboard_view, quiz_leaderboard_view
+
+User = get_user_model()
+
+
+def make_quiz(size):
+    """A quiz of ``size`` questions with two choices each, and right answers"""
+    quiz = Quiz.objects.create(title=f'Quiz of {size}')
+    answers = {}
+    for i in range(size):
+        question = Question.objects.create(quiz=quiz, question_text=f'Question {i}', order=i)
+        right = Choice.objects.create(question=question, choice_text='Right', is_correct=True, order=0)
+        Choice.objects.create(question=question, choice_text='Wrong', order=1)
+        answers[str(question.id)] = right.id
+    return quiz, answers
+
+
+class QuizQueryCountTests(TestCase):
+    """Quiz detail and submission run as many queries whatever the quiz's size"""
+    sizes = (1, 5, 50)
+
+    def setUp(self):
+        cache.clear()
+        clear_local()
+        self.user = User.objects.create_user(email='student@example.com', username='student', password='pw-12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, method, path, data=None):
+        # Start from a cold cache so the answer key is compiled every time
+        cache.clear()
+        clear_local()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries)
+
+    def test_quiz_detail(self):
+        counts = set()
+        for size in self.sizes:
+            quiz, _ = make_quiz(size)
+            path = f'/api/quizzes/{quiz.id}/'
+            # The first request also seeds the quiz's version stamps
+            self.count_queries('get', path)
+            counts.add(self.count_queries('get', path))
+        self.assertEqual(len(counts), 1, counts)
+
+    def test_quiz_submit(self):
+        counts = set()
+        for size in self.sizes:
+            quiz, answers = make_quiz(size)
+            path = f'/api/quizzes/{quiz.id}/submit/'
+            # The first attempt also creates the quiz's stats and score rows
+            self.count_queries('post', path, {'quiz_id': quiz.id, 'answers': answers})
+            counts.add(self.count_queries('post', path, {'quiz_id': quiz.id, 'answers': answers}))
+        self.assertEqual(len(counts), 1, counts)
+
+
+
+@override_settings(
+    INSTRUMENTATION={'SERVER_TIMING': False, 'QUERY_BUDGET_ACTION': 'raise'},
+    JWT_USER_CACHE={'TIMEOUT': 0},
+)
+class LeaderboardQueryBudgetTests(TestCase):
+    """The leaderboards stay within their query budgets on a cold cache"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local()
+        self.user = User.objects.create_user(email='student@example.com', username='student', password='pw-12345')
+        quiz, answers = make_quiz(3)
+        self.quiz = quiz
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(self.user)['access']}")
+        self.client.post(f'/api/quizzes/{quiz.id}/submit/', {'quiz_id': quiz.id, 'answers': answers}, format='json')
+
+    def assert_within_budget(self, path, view):
+        for backend in ('auto', 'database'):
+            with self.subTest(path, backend=backend), self.settings(LEADERBOARD_BACKEND=backend):
+                # First call after a deploy or cache flush
+                cache.clear()
+                clear_local()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(path)
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertLessEqual(len(queries), view.query_budget)
+
+    def test_quiz_leaderboard(self):
+        self.assert_within_budget(f'/api/quizzes/{self.quiz.id}/leaderboard/', quiz_leaderboard_view)
+
+    def test_global_leaderboard(self):
+        self.assert_within_budget('/api/leaderboard/', leaderboard_view)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages walk rows that share a timestamp by id, without OFFSET"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local()
+        PDF.objects.bulk_create(
+            PDF(title=f'PDF {i}', filename=f'tied-{i}.pdf', file_path=f'tied-{i}.pdf') for i in range(25)
+        )
+        # Like a bulk import, every row gets the same timestamp
+        PDF.objects.update(created_at=timezone.now())
+        self.client = APIClient()
+
+    def walk(self, url, link):
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+            data = response.json()
+            page = [pdf['id'] for pdf in data['results']]
+            ids = page + ids if link == 'previous' else ids + page
+            url = data[link]
+        return ids
+
+    def test_tied_timestamps(self):
+        expected = list(PDF.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/pdfs/?page_size=10', 'next'), expected)
+        # Back from the last page
+        second = self.client.get('/api/pdfs/?page_size=10').json()['next']
+        last = self.client.get(second).json()['next']
+        previous = self.client.get(last).json()['previous']
+        self.assertEqual(self.walk(previous, 'previous'), expected[:20])
+
+
+
+@override_settings(PDF_SENDFILE_MODE='')
+class PDFFileRangeTests(TestCase):
+    """/api/pdfs/<id>/file/ answers Range, If-Range and conditional requests"""
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        pdf_root = override_settings(PDF_ROOT=root.name)
+        pdf_root.enable()
+        self.addCleanup(pdf_root.disable)
+        self.root = Path(root.name)
+        self.pdf = self.make_pdf('file.pdf', self.content)
+
+    def make_pdf(self, filename, content):
+        (self.root / filename).write_bytes(content)
+        return PDF.objects.create(title=filename, filename=filename, file_path=filename)
+
+    def get(self, pdf=None, **headers):
+        return self.client.get(f'/api/pdfs/{(pdf or self.pdf).id}/file/', **headers)
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_ranges(self):
+        size = len(self.content)
+        cases = {
+            'bytes=0-99': (0, 99),
+            'bytes=1000-': (1000, size - 1),
+            'bytes=-24': (size - 24, size - 1),
+            'bytes=-5000': (0, size - 1),
+            'bytes=1000-9999': (1000, size - 1),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{size}')
+                self.assertEqual(b''.join(response.streaming_content), self.content[start:end + 1])
+
+    def test_unsatisfiable(self):
+        empty = self.make_pdf('empty.pdf', b'')
+        for pdf, header, size in ((None, 'bytes=5000-', len(self.content)), (None, 'bytes=-0', len(self.content)),
+                                  (empty, 'bytes=-5', 0), (empty, 'bytes=0-', 0)):
+            with self.subTest(header, size=size):
+                response = self.get(pdf, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], f'bytes */{size}')
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+        # The client's copy is stale: send the whole file
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"').status_code, 200)
+
+    def test_not_modified(self):
+        response = self.get()
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=http_date(timezone.now().timestamp() + 60)).status_code, 304)
+
+
+
+class IngestPathTests(TestCase):
+    """ingest_pdfs stores paths relative to PDF_ROOT, which the file view serves"""
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = Path(root.name)
+        paths = override_settings(PDF_ROOT=str(self.root / 'pdfs'), PDF_THUMBNAIL_ROOT=str(self.root / 'thumbs'))
+        paths.enable()
+        self.addCleanup(paths.disable)
+
+    def write_pdf(self, path):
+        path.parent.mkdir(parents=True)
+        writer = PdfWriter()
+        writer.add_blank_page(100, 100)
+        writer.write(path)
+
+    def test_subdirectory(self):
+        self.write_pdf(self.root / 'pdfs' / 'sub' / 'notes.pdf')
+        report = ingest_pdfs(root=self.root / 'pdfs' / 'sub', workers=1)
+        self.assertEqual(report.created, ['sub/notes.pdf'])
+        pdf = PDF.objects.get(file_path='sub/notes.pdf')
+        self.assertEqual(self.client.get(f'/api/pdfs/{pdf.id}/file/').status_code, 200)
+
+    def test_outside_pdf_root(self):
+        self.write_pdf(self.root / 'elsewhere' / 'notes.pdf')
+        with self.assertRaises(ValueError):
+            ingest_pdfs(root=self.root / 'elsewhere', workers=1)
+        self.assertFalse(PDF.objects.exists())
+
+
+
+class ContentImportTests(TestCase):
+    """Imports match questions by text; load_initial_data only creates rows"""
+
+    def test_load_initial_data_keeps_admin_edits(self):
+        call_command('load_initial_data', stdout=io.StringIO())
+        course = Course.objects.get(slug='python-basics')
+        course.description = 'Edited in the admin'
+        course.save()
+        quiz = Quiz.objects.get(title='Python Basics Quiz')
+        question = quiz.questions.first()
+        question.question_text = 'Edited question'
+        question.save()
+        Question.objects.create(quiz=quiz, question_text='Added in the admin')
+        counts = (Question.objects.count(), Choice.objects.count())
+
+        call_command('load_initial_data', stdout=io.StringIO())
+        self.assertEqual(Course.objects.get(slug='python-basics').description, 'Edited in the admin')
+        self.assertTrue(quiz.questions.filter(question_text='Edited question').exists())
+        self.assertEqual((Question.objects.count(), Choice.objects.count()), counts)
+
+    def test_questions_matched_by_text(self):
+        # Admin-created questions all have order 0
+        quiz = Quiz.objects.create(title='Bank')
+        for text in ('First?', 'Second?'):
+            Question.objects.create(quiz=quiz, question_text=text)
+        content = {'quizzes': [{'title': 'Bank', 'questions': [
+            {'question_text': 'Second?', 'choices': [{'choice_text': 'Yes', 'is_correct': True}]},
+            {'question_text': 'First?', 'choices': [{'choice_text': 'No'}]},
+        ]}]}
+        report = import_content(content)
+        self.assertEqual(report.counts['questions'], {'inserted': 0, 'updated': 1, 'unchanged': 1})
+        self.assertEqual(
+            list(quiz.questions.values_list('question_text', 'order')), [('Second?', 0), ('First?', 1)],
+        )
+        self.assertEqual(Choice.objects.filter(question__quiz=quiz).count(), 2)
+        report = import_content(content)
+        self.assertEqual(report.counts['questions'], {'inserted': 0, 'updated': 0, 'unchanged': 2})
+
+
+
+class MetricsLabelTests(TestCase):
+    """Request counters take their labels from a bounded set"""
+
+    def test_unknown_methods(self):
+        for method in ('BREW', 'PROPFIND', 'X-1'):
+            self.client.generic(method, '/no-such-page/')
+        counters = [labels for name, labels in instrumentation._counters if name == 'requests_total']
+        self.assertIn(('unmatched', 'other', '404'), counters)
+        self.assertFalse({'BREW', 'PROPFIND', 'X-1'} & {labels[1] for labels in counters})
+
+
+
+@override_settings(READ_REPLICAS={'REPLICAS': {}, 'PIN_SECONDS': 5, 'CACHE_ALIAS': 'default'})
+class ReplicaPinTests(TestCase):
+    """Read-your-writes pins reach every worker with a per-process cache"""
+
+    def pinned(self, user=None):
+        request = RequestFactory().get('/api/pdfs/')
+        if user is not None:
+            request.user = user
+        return routers._pinned(routers.RequestState(request))
+
+    def test_all_users_pin(self):
+        routers._pin_all_users(force=True)
+        # Another worker doesn't share this one's local-memory cache
+        cache.clear()
+        self.assertTrue(self.pinned())
+        with mock.patch.object(routers, 'time') as clock:
+            clock.time_ns.return_value = time.time_ns() + 6 * 10 ** 9
+            self.assertFalse(self.pinned())
+
+    def test_user_pin(self):
+        writer = User.objects.create_user(email='writer@example.com', username='writer', password='pw-12345')
+        reader = User.objects.create_user(email='reader@example.com', username='reader', password='pw-12345')
+        routers._pin(routers._user_pin(writer.pk))
+        cache.clear()
+        self.assertTrue(self.pinned(writer))
+        self.assertFalse(self.pinned(reader))
+
+
+@unittest.skipIf(orjson is None, 'orjson is not installed')
+class FastJSONRendererTests(TestCase):
+    """orjson renders the same JSON values as the stdlib, if not the same bytes"""
+
+    def render(self, data, backend):
+        with override_settings(JSON_BACKEND=backend):
+            return FastJSONRenderer().render(data)
+
+    def test_floats(self):
+        data = {'scores': [0.0, -0.0, 0.1, 2e-6, 1e16, 1e300, 5e-324, 123456789.125, 2 / 3]}
+        rendered = self.render(data, 'auto')
+        self.assertEqual(json.loads(rendered), json.loads(self.render(data, 'stdlib')))
+        self.assertEqual(json.loads(rendered), data)
+        # Shortest form, unlike the stdlib's 2e-06
+        self.assertIn(b'2e-6', rendered)
+
+    def test_non_finite_floats(self):
+        self.assertEqual(self.render({'x': float('nan'), 'y': float('inf')}, 'auto'), b'{"x":null,"y":null}')
@@ -1,8 +1,13 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
-    CourseViewSet, pdf_list_view, quiz_list_view,
-    quiz_detail_view, quiz_submit_view, quiz_attempts_view
+    CourseViewSet, pdf_list_view, pdf_file_view, quiz_list_view,
+    quiz_detail_view, quiz_submit_view, quiz_attempts_view,
+    quiz_stats_view, quiz_leaderboard_view, leaderboard_view,
+    quiz_attempts_export_view, quiz_attempt_detail_view, search_view,
+    metrics_view
 )
 
 router = DefaultRouter()
@@ -11,9 +16,27 @@ router.register(r'courses', CourseViewSet, basename='course')
 urlpatterns = [
     path('', include(router.urls)),
     path('pdfs/', pdf_list_view, name='pdf-list'),
+    path('pdfs/<int:pk>/file/', pdf_file_view, name='pdf-file'),
     path('quizzes/', quiz_list_view, name='quiz-list'),
     path('quizzes/<int:pk>/', quiz_detail_view, name='quiz-detail'),
     path('quizzes/<int:pk>/submit/', quiz_submit_view, name='quiz-submit'),
+    path('quizzes/<int:pk>/stats/', quiz_stats_view, name='quiz-stats'),
+    path('quizzes/<int:pk>/leaderboard/', quiz_leaderboard_view, name='quiz-leaderboard'),
+    path('leaderboard/', leaderboard_view, name='leaderboard'),
     path('quiz-attempts/', quiz_attempts_view, name='quiz-attempts'),
+    path('quiz-attempts/export/', quiz_attempts_export_view, name='quiz-attempts-export'),
+    path('quiz-attempts/<int:pk>/', quiz_attempt_detail_view, name='quiz-attempt-detail'),
+    path('search/', search_view, name='search'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
+if settings.ASYNC_READ_API:
+    # Matched first, so they shadow the sync catalogue endpoints
+    urlpatterns = [
+        path('courses/', async_views.course_list_view, name='course-list'),
+        # Same lookup pattern as the router, which keeps dots for format suffixes
+        re_path(r'^courses/(?P<slug>[^/.]+)/$', async_views.course_detail_view, name='course-detail'),
+        path('pdfs/', async_views.pdf_list_view, name='pdf-list'),
+        path('quizzes/', async_views.quiz_list_view, name='quiz-list'),
+        path('quizzes/<int:pk>/', async_views.quiz_detail_view, name='quiz-detail'),
+    ] + urlpatterns
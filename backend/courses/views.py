@@ -1,14 +1,36 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
 from django.db.models import Q
-from .models import Course, PDF, Quiz, Question, Choice, QuizAttempt
+from accounts.throttling import TokenBucketThrottle
+from pycoder_backend.routers import read_from_replica
+from .pagination import CreatedAtCursorPagination, CompletedAtCursorPagination
+from .renderers import CSVRenderer, NDJSONRenderer, PrometheusRenderer
+from .models import Course, PDF, Quiz, Question, Choice
+from .cache import CATALOGUE_STAMP_QUERIES, get_answer_key
+from .conditional import conditional_get
+from .instrumentation import prometheus_text, query_budget
+from .fast_serializers import course_detail_data, quiz_detail_data
+from .export import attempt_export_queryset, export_lines, iter_attempt_rows, parse_boundary
+from .files import RangeFile, UnsatisfiableRange, accel_redirect_location, parse_range, resolve_pdf_path
+from .response_cache import cached_response, course_group
+from .leaderboard import GLOBAL, LEADERBOARD_QUERIES, leaderboard
+from .search import search
+from .stats import quiz_stats
+from .grading import grade, record_attempt
+from .queries import (
+    course_list_queryset, pdf_list_queryset, quiz_list_queryset, attempt_history_queryset,
+    attempt_breakdown_queryset
+)
 from .serializers import (
-    CourseListSerializer, CourseDetailSerializer,
-    PDFSerializer, QuizListSerializer, QuizDetailSerializer,
+    CourseListSerializer, PDFSerializer, QuizListSerializer,
     QuizAttemptSerializer, QuizSubmissionSerializer
 )
 
@@ -17,58 +39,164 @@ class CourseViewSet(ReadOnlyModelViewSet):
     """Course ViewSet"""
     queryset = Course.objects.filter(is_active=True)
     permission_classes = [AllowAny]
+    pagination_class = CreatedAtCursorPagination
     lookup_field = 'slug'
+    # Course, PDFs and quizzes for retrieve
+    query_budget = 4 + CATALOGUE_STAMP_QUERIES
+    read_from_replica = True
+    
+    @conditional_get(Course, PDF, Quiz, Question)
+    @cached_response(lambda request: 'courses')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @conditional_get(Course, PDF, Quiz, Question)
+    @cached_response(lambda request, slug: f'course:{slug}')
+    def retrieve(self, request, *args, **kwargs):
+        # Built from values() rows; same output as CourseDetailSerializer
+        data = course_detail_data(kwargs[self.lookup_field])
+        if data is None:
+            raise Http404
+        return Response(data)
+    
+    def get_queryset(self):
+        return course_list_queryset()
     
     def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return CourseDetailSerializer
         return CourseListSerializer
 
 
+@query_budget(2 + CATALOGUE_STAMP_QUERIES)
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get(PDF, Course)
+@cached_response(lambda request: f'pdfs:{course_group(request)}')
 def pdf_list_view(request):
     """Get all PDFs"""
     course_id = request.query_params.get('course', None)
-    queryset = PDF.objects.filter(is_active=True)
+    queryset = pdf_list_queryset(course_id)
+    
+    paginator = CreatedAtCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = PDFSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+@require_safe
+def pdf_file_view(request, pk):
+    """Stream a PDF file with Range, ETag and Last-Modified support
+    
+    A plain Django view rather than an @api_view: PDF viewers send Accept
+    headers that DRF's JSON content negotiation would reject.
+    """
+    file_path = PDF.objects.filter(pk=pk, is_active=True).values_list('file_path', flat=True).first()
+    path = resolve_pdf_path(file_path) if file_path else None
+    if path is None or not path.is_file():
+        raise Http404('PDF not found')
+    
+    stat = path.stat()
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = http_date(stat.st_mtime)
     
-    if course_id:
-        queryset = queryset.filter(course_id=course_id)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = _pdf_file_response(request, path, file_path, stat.st_size, etag, last_modified)
     
-    serializer = PDFSerializer(queryset, many=True)
-    return Response(serializer.data)
+    response.headers.setdefault('ETag', etag)
+    response.headers.setdefault('Last-Modified', last_modified)
+    response.headers['Accept-Ranges'] = 'bytes'
+    patch_cache_control(response, public=True, max_age=settings.PDF_MAX_AGE)
+    return response
 
 
+def _pdf_file_response(request, path, file_path, size, etag, last_modified):
+    mode = settings.PDF_SENDFILE_MODE
+    if mode:
+        # The front proxy pushes the bytes and handles Range itself
+        response = HttpResponse(content_type='application/pdf')
+        if mode == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = accel_redirect_location(file_path)
+        else:
+            response['X-Sendfile'] = str(path)
+        return response
+    
+    # If-Range: only honour Range while the client's copy is still current
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (etag, last_modified):
+        range_header = None
+    
+    try:
+        byte_range = parse_range(range_header, size)
+    except UnsatisfiableRange:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    
+    pdf_file = open(path, 'rb')
+    if byte_range is None:
+        return FileResponse(pdf_file, content_type='application/pdf', filename=path.name)
+    
+    start, end = byte_range
+    pdf_file.seek(start)
+    response = FileResponse(
+        RangeFile(pdf_file, end - start + 1),
+        status=206,
+        content_type='application/pdf',
+        filename=path.name,
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+@query_budget(2 + CATALOGUE_STAMP_QUERIES)
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get(Quiz, Course, Question)
+@cached_response(lambda request: f'quizzes:{course_group(request)}')
 def quiz_list_view(request):
     """Get all quizzes"""
     course_id = request.query_params.get('course', None)
-    queryset = Quiz.objects.filter(is_active=True)
-    
-    if course_id:
-        queryset = queryset.filter(course_id=course_id)
+    queryset = quiz_list_queryset(course_id)
     
-    serializer = QuizListSerializer(queryset, many=True)
-    return Response(serializer.data)
+    paginator = CreatedAtCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = QuizListSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
+@query_budget(4 + CATALOGUE_STAMP_QUERIES)
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get(Quiz, Course, Question, Choice)
+@cached_response(lambda request, pk: f'quiz:{pk}')
 def quiz_detail_view(request, pk):
     """Get quiz details with questions (without correct answers)"""
-    quiz = get_object_or_404(Quiz, pk=pk, is_active=True)
-    serializer = QuizDetailSerializer(quiz)
-    return Response(serializer.data)
+    data = quiz_detail_data(pk)
+    if data is None:
+        raise Http404
+    return Response(data)
 
 
+# The first attempt at a quiz also creates its stats and score rows, and
+# bumps version stamps that may live in the database (courses.cache)
+@query_budget(30)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([TokenBucketThrottle.for_policy('quiz_submit')])
 def quiz_submit_view(request, pk):
     """Submit quiz and calculate score"""
     try:
-        # Get quiz from URL parameter
-        quiz = get_object_or_404(Quiz, pk=pk, is_active=True)
+        # Compiled answer key, served from cache whenever possible
+        answer_key = get_answer_key(pk)
+        if answer_key is None or not answer_key.is_active:
+            return Response({
+                'error': 'Quiz not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
         # Validate request data
         quiz_id = request.data.get('quiz_id')
@@ -85,62 +213,27 @@ def quiz_submit_view(request, pk):
                 'error': 'Answers must be a dictionary'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        questions = quiz.questions.all()
-        correct_count = 0
-        total_questions = questions.count()
+        total_questions = len(answer_key)
         
         if total_questions == 0:
             return Response({
                 'error': 'Quiz has no questions'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calculate score
-        for question in questions:
-            # Try both string and integer keys
-            user_choice_id = answers.get(str(question.id)) or answers.get(question.id)
-            if user_choice_id:
-                # Convert to integer if needed
-                user_choice_id = int(user_choice_id)
-                choice = Choice.objects.filter(id=user_choice_id, question=question).first()
-                if choice and choice.is_correct:
-                    correct_count += 1
-        
-        score = int((correct_count / total_questions * 100)) if total_questions > 0 else 0
+        # Calculate score and build results from the in-memory answer key
+        result = grade(answer_key, answers)
+        score = result.score
         
         # Save attempt
-        attempt = QuizAttempt.objects.create(
-            user=request.user,
-            quiz=quiz,
-            score=score,
-            total_questions=total_questions
-        )
-        
-        # Return results with correct answers
-        results = []
-        for question in questions:
-            correct_choice = question.choices.filter(is_correct=True).first()
-            # Try both string and integer keys
-            user_choice_id = answers.get(str(question.id)) or answers.get(question.id)
-            user_choice = None
-            if user_choice_id:
-                user_choice_id = int(user_choice_id)
-                user_choice = Choice.objects.filter(id=user_choice_id, question=question).first()
-            
-            results.append({
-                'question_id': question.id,
-                'question_text': question.question_text,
-                'user_answer': user_choice.choice_text if user_choice else None,
-                'correct_answer': correct_choice.choice_text if correct_choice else None,
-                'is_correct': user_choice.is_correct if (user_choice and hasattr(user_choice, 'is_correct')) else False
-            })
+        attempt = record_attempt(request.user, answer_key.quiz_id, result)
         
         return Response({
             'attempt_id': attempt.id,
             'score': score,
             'total_questions': total_questions,
-            'correct_count': correct_count,
-            'passed': score >= quiz.passing_score,
-            'results': results
+            'correct_count': result.correct_count,
+            'passed': result.passed,
+            'results': result.results
         }, status=status.HTTP_200_OK)
     
     except Exception as e:
@@ -150,11 +243,160 @@ def quiz_submit_view(request, pk):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(5)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def quiz_stats_view(request, pk):
+    """Get a quiz's pass rate, average score and per-question difficulty"""
+    if not Quiz.objects.filter(pk=pk).exists():
+        return Response({
+            'error': 'Quiz not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(quiz_stats(pk))
+
+
+def _leaderboard_limit(request):
+    try:
+        return max(min(int(request.query_params.get('limit', 10)), 100), 1)
+    except ValueError:
+        return 10
+
+
+# The user, the quiz check and the leaderboard
+@query_budget(2 + LEADERBOARD_QUERIES)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def quiz_leaderboard_view(request, pk):
+    """Get the top scores of a quiz and the user's rank"""
+    if not Quiz.objects.filter(pk=pk, is_active=True).exists():
+        return Response({
+            'error': 'Quiz not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(leaderboard(pk, request.user, _leaderboard_limit(request)))
+
+
+@query_budget(1 + LEADERBOARD_QUERIES)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def leaderboard_view(request):
+    """Get the top total scores across all quizzes and the user's rank"""
+    return Response(leaderboard(GLOBAL, request.user, _leaderboard_limit(request)))
+
+
+@query_budget(3)
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def quiz_attempts_view(request):
     """Get user's quiz attempts"""
-    attempts = QuizAttempt.objects.filter(user=request.user).order_by('-completed_at')
-    serializer = QuizAttemptSerializer(attempts, many=True)
-    return Response(serializer.data)
+    attempts = attempt_history_queryset(request.user)
+    paginator = CompletedAtCursorPagination()
+    page = paginator.paginate_queryset(attempts, request)
+    serializer = QuizAttemptSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@renderer_classes([CSVRenderer, NDJSONRenderer])
+def quiz_attempts_export_view(request):
+    """Stream quiz attempts as CSV or NDJSON (?format=csv|ndjson)"""
+    params = request.query_params
+    quiz_id = params.get('quiz')
+    try:
+        since = parse_boundary(params['since']) if params.get('since') else None
+        until = parse_boundary(params['until'], end=True) if params.get('until') else None
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if quiz_id and not quiz_id.isdigit():
+        return Response({
+            'error': 'Invalid quiz id'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    renderer = request.accepted_renderer
+    attempts = attempt_export_queryset(int(quiz_id) if quiz_id else None, since, until)
+    response = StreamingHttpResponse(
+        export_lines(renderer.format, iter_attempt_rows(attempts)),
+        content_type=f'{renderer.media_type}; charset={renderer.charset}',
+    )
+    response['Content-Disposition'] = f'attachment; filename="quiz-attempts.{renderer.format}"'
+    return response
+
+
+@query_budget(3)
+@read_from_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def quiz_attempt_detail_view(request, pk):
+    """Get one of the user's attempts with its per-question breakdown"""
+    rows = list(attempt_breakdown_queryset(request.user, pk))
+    if not rows:
+        return Response({
+            'error': 'Attempt not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    attempt_id, quiz_id, quiz_title, passing_score, score, total_questions, completed_at = rows[0][:7]
+    results = [
+        {
+            'question_id': question_id,
+            'question_text': question_text,
+            'user_answer': user_answer,
+            'correct_answer': correct_answer,
+            'is_correct': is_correct,
+        }
+        for question_id, question_text, user_answer, is_correct, correct_answer, _order in sorted(
+            (row[7:] for row in rows),
+            key=lambda answer: (answer[5], answer[0]),
+        )
+        # Attempts recorded before answers were stored have no breakdown
+        if question_id is not None
+    ]
+    
+    return Response({
+        'attempt_id': attempt_id,
+        'quiz': quiz_id,
+        'quiz_title': quiz_title,
+        'score': score,
+        'total_questions': total_questions,
+        'correct_count': sum(result['is_correct'] for result in results),
+        'passed': score >= passing_score,
+        'completed_at': completed_at,
+        'results': results
+    })
+
+
+
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_view(request):
+    """Search courses, PDFs, quizzes and questions"""
+    query = request.query_params.get('q', '').strip()
+    kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+    try:
+        limit = min(int(request.query_params.get('limit', 20)), 50)
+    except ValueError:
+        limit = 20
+    
+    if not query:
+        return Response({
+            'error': 'Query parameter "q" is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'query': query,
+        'results': search(query, kinds=kinds, limit=max(limit, 1))
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@renderer_classes([PrometheusRenderer])
+def metrics_view(request):
+    """Request metrics of the worker that answers, in the Prometheus text format"""
+    return Response(prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
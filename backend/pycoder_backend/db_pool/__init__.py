@@ -0,0 +1,6 @@
+"""
+MySQL database backend with a per-process connection pool
+
+Set ``ENGINE`` to ``pycoder_backend.db_pool`` and size the pool with the
+database's ``POOL`` dict (see ``pool.DEFAULTS``).
+"""
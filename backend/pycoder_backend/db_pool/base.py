@@ -0,0 +1,20 @@
+from django.db.backends.mysql import base as mysql
+
+from .pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, mysql.DatabaseWrapper):
+    def ping(self, connection):
+        try:
+            # No silent reconnect (PyMySQL's default), which would lose the
+            # session settings
+            connection.ping(False)
+        except mysql.Database.Error:
+            return False
+        return True
+
+    def _set_autocommit(self, autocommit):
+        # Pooled connections are almost always in the right mode already;
+        # skip the round trip
+        if self.connection.get_autocommit() != autocommit:
+            super()._set_autocommit(autocommit)
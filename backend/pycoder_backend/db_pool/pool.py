@@ -0,0 +1,240 @@
+"""
+Per-process database connection pool
+
+``ConnectionPool`` keeps up to ``MAX_SIZE`` DB-API connections open per
+database alias and worker process. ``PooledDatabaseWrapperMixin`` makes a
+Django backend borrow one in ``connect()`` and hand it back in ``close()``,
+which Django calls at the end of every request when ``CONN_MAX_AGE`` is 0.
+Connections belong to the process rather than to a thread, so they are
+reused under ASGI too, where every request runs on a thread of its own.
+
+Borrowed connections are pinged first when ``CONN_HEALTH_CHECKS`` is on,
+and replaced once they are ``MAX_AGE`` seconds old. When all of them are
+lent out, ``connect()`` waits up to ``TIMEOUT`` seconds for one and then
+raises OperationalError.
+
+Nothing here imports a database driver, so ``pool_stats()`` can be read
+without one.
+"""
+import functools
+import threading
+import time
+import weakref
+from collections import deque
+
+DEFAULTS = {
+    'MAX_SIZE': 10,
+    'MAX_AGE': 300,
+    'TIMEOUT': 10,
+}
+
+COUNTERS = ('checkouts', 'opened', 'waits', 'wait_seconds', 'timeouts', 'errors')
+
+
+class PoolTimeout(Exception):
+    """No connection came free within the pool's TIMEOUT"""
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """Bounded set of open connections, lent out one at a time"""
+
+    def __init__(self, key, max_size, max_age, timeout):
+        self.key = key
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.retired = False
+        self.stats = dict.fromkeys(COUNTERS, 0)
+        # Most recently returned last, so the warmest connection is reused
+        # and surplus ones sit idle until they age out
+        self._idle = deque()
+        self._opened_at = {}
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def checkout(self, connect, ping=None):
+        """Return ``(connection, reused)``
+
+        Reuses an idle connection that passes ``ping`` or, while fewer than
+        MAX_SIZE are open, opens one with ``connect()``.
+        """
+        with self._cond:
+            self.stats['checkouts'] += 1
+        while True:
+            connection = self._acquire()
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    with self._cond:
+                        self.stats['errors'] += 1
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self.stats['opened'] += 1
+                    self._opened_at[id(connection)] = time.monotonic()
+                return connection, False
+            if ping is None or ping(connection):
+                return connection, True
+            with self._cond:
+                self.stats['errors'] += 1
+            self.release(connection, reusable=False)
+
+    def _acquire(self):
+        """Take an idle connection, or reserve a slot (None) for a new one"""
+        start = time.monotonic()
+        expired = []
+        try:
+            with self._cond:
+                waited = False
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        connection = self._idle.pop()
+                        if now - self._opened_at[id(connection)] < self.max_age:
+                            return connection
+                        self._forget(connection)
+                        expired.append(connection)
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None
+                    if not waited:
+                        waited = True
+                        self.stats['waits'] += 1
+                    remaining = start + self.timeout - now
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'All {self.max_size} pooled connections stayed in use for {self.timeout}s'
+                        )
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self.stats['wait_seconds'] += time.monotonic() - now
+        finally:
+            for connection in expired:
+                _close(connection)
+
+    def release(self, connection, reusable=True):
+        """Give a connection back; it is closed unless ``reusable``"""
+        with self._cond:
+            if (
+                reusable
+                and not self.retired
+                and time.monotonic() - self._opened_at[id(connection)] < self.max_age
+            ):
+                self._idle.append(connection)
+                self._cond.notify()
+                return
+            self._forget(connection)
+        _close(connection)
+
+    def _forget(self, connection):
+        del self._opened_at[id(connection)]
+        self._size -= 1
+        self._cond.notify()
+
+    def retire(self):
+        """Close idle connections, and borrowed ones as they come back"""
+        with self._cond:
+            self.retired = True
+            idle = list(self._idle)
+            self._idle.clear()
+            for connection in idle:
+                self._forget(connection)
+        for connection in idle:
+            _close(connection)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                **self.stats,
+                'max_size': self.max_size,
+                'open': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+            }
+
+
+# alias -> ConnectionPool for the database that alias points at
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """The pool for ``alias``, replacing it if the alias was repointed
+
+    The test runner, for one, switches NAME to the test database.
+    """
+    options = {**DEFAULTS, **settings_dict.get('POOL', {})}
+    key = (
+        *(settings_dict.get(name) for name in ('HOST', 'PORT', 'NAME', 'USER')),
+        *sorted(options.items()),
+    )
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is not None and pool.key == key:
+            return pool
+        if pool is not None:
+            pool.retire()
+        pool = _pools[alias] = ConnectionPool(
+            key, options['MAX_SIZE'], options['MAX_AGE'], options['TIMEOUT'],
+        )
+        return pool
+
+
+def pool_stats():
+    """Counters and current sizes of this process's pools, by alias"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.snapshot() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """Make a DatabaseWrapper borrow connections from the alias's pool
+
+    Subclasses implement ``ping(connection)``.
+    """
+    _pool = None
+    _pool_reused = False
+    _pool_finalizer = None
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, self.settings_dict)
+        ping = self.ping if self.settings_dict['CONN_HEALTH_CHECKS'] else None
+        try:
+            connection, self._pool_reused = pool.checkout(
+                functools.partial(super().get_new_connection, conn_params), ping,
+            )
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+        self._pool = pool
+        # A wrapper dropped without close(), e.g. with the thread it belonged
+        # to, frees its slot when it is garbage collected
+        self._pool_finalizer = weakref.finalize(self, pool.release, connection, False)
+        return connection
+
+    def init_connection_state(self):
+        # Session settings made when the connection was opened still apply
+        if not self._pool_reused:
+            super().init_connection_state()
+
+    def _close(self):
+        self._pool_finalizer.detach()
+        # Anything that may have left a transaction open or the session
+        # broken closes the connection instead
+        reusable = (
+            self.autocommit
+            and not self.in_atomic_block
+            and not self.needs_rollback
+            and not self.errors_occurred
+        )
+        self._pool.release(self.connection, reusable)
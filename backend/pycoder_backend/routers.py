@@ -0,0 +1,233 @@
+"""
+Read-replica routing
+
+Views marked ``@read_from_replica`` (viewsets: a ``read_from_replica``
+class attribute) read the ``APPS``' tables from one of the ``REPLICAS``,
+picked by weight once per request. Every other read and every write goes
+to the primary. ``ReplicaRoutingMiddleware`` tracks the request so the
+router knows which view is running and whether it wrote.
+
+Replicas lag behind, so reads stay on the primary for ``PIN_SECONDS``:
+
+- for a user after any of their requests wrote, so they see their own
+  quiz attempts right away;
+- for everyone after a catalogue table (``SHARED_MODELS``) changed, so a
+  lagging replica's rows aren't cached under the new version stamp.
+
+Pins live in the ``CACHE_ALIAS`` cache when it is shared between workers.
+A per-process cache would pin only the worker that saw the write, so pins
+then live in the ``VersionStamp`` table, next to the version stamps
+(``courses.cache``), as a row holding the pin's expiry. Keep the stamps'
+``STAMP_TTL`` below ``PIN_SECONDS``, so every worker picks up a catalogue
+change while reads are still pinned.
+"""
+import contextvars
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+DEFAULTS = {
+    'REPLICAS': {},
+    'PIN_SECONDS': 5,
+    'CACHE_ALIAS': 'default',
+    'APPS': ('courses',),
+    'SHARED_MODELS': ('courses.Course', 'courses.PDF', 'courses.Quiz', 'courses.Question', 'courses.Choice'),
+}
+
+ALL_USERS_PIN = 'db_pin:all'
+
+
+def _get_setting(name):
+    return getattr(settings, 'READ_REPLICAS', {}).get(name, DEFAULTS[name])
+
+
+def read_from_replica(view):
+    """Let a view read from a replica; apply it above ``@api_view``"""
+    view.read_from_replica = True
+    return view
+
+
+class RequestState:
+    __slots__ = ('request', 'replica', 'wrote', 'wrote_shared', 'pinned')
+
+    def __init__(self, request):
+        self.request = request
+        self.replica = None
+        self.wrote = False
+        self.wrote_shared = False
+        # user id -> whether their reads are pinned to the primary
+        self.pinned = {}
+
+
+_current = contextvars.ContextVar('db_routing', default=None)
+
+
+def _user_pin(user_id):
+    return f'db_pin:user:{user_id}'
+
+
+def _known_user_id(request):
+    """The authenticated user's id, without authenticating the request
+
+    DRF replaces ``request.user`` once it has authenticated; until then
+    (and in the async views) it is the session's lazy user.
+    """
+    user = request.__dict__.get('user')
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        return None
+    return user.pk if user.is_authenticated else None
+
+
+def _replica_view(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return False
+    return getattr(match.func, 'read_from_replica', False) or getattr(
+        getattr(match.func, 'cls', None), 'read_from_replica', False,
+    )
+
+
+def _pins_in_database():
+    return isinstance(caches[_get_setting('CACHE_ALIAS')], (LocMemCache, DummyCache))
+
+
+def _pin_rows():
+    # Imported here: routers load before the apps. Always the primary, and
+    # through using(), so the router isn't asked about its own pins
+    from courses.models import VersionStamp
+    return VersionStamp.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _pinned(state):
+    if not _get_setting('PIN_SECONDS'):
+        return False
+    user_id = _known_user_id(state.request)
+    if user_id not in state.pinned:
+        keys = [ALL_USERS_PIN] if user_id is None else [ALL_USERS_PIN, _user_pin(user_id)]
+        if _pins_in_database():
+            pinned = _pin_rows().filter(key__in=keys, value__gt=time.time_ns()).exists()
+        else:
+            pinned = bool(caches[_get_setting('CACHE_ALIAS')].get_many(keys))
+        state.pinned[user_id] = pinned
+    return state.pinned[user_id]
+
+
+def _pin(key):
+    seconds = _get_setting('PIN_SECONDS')
+    if not seconds:
+        return
+    if not _pins_in_database():
+        caches[_get_setting('CACHE_ALIAS')].set(key, True, seconds)
+        return
+    from courses.models import VersionStamp
+    expires = time.time_ns() + int(seconds * 1e9)
+    if not _pin_rows().filter(key=key).update(value=expires):
+        _pin_rows().bulk_create([VersionStamp(key=key, value=expires)], ignore_conflicts=True)
+
+
+_last_shared_pin = 0.0
+
+
+def _pin_all_users(force=False):
+    # Bulk imports write thousands of rows; re-pin at most twice per window
+    global _last_shared_pin
+    now = time.monotonic()
+    if force or now - _last_shared_pin >= _get_setting('PIN_SECONDS') / 2:
+        _last_shared_pin = now
+        _pin(ALL_USERS_PIN)
+
+
+class ReplicaRouter:
+    """Send replica views' reads to a replica; see the module docstring"""
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or model._meta.app_label not in _get_setting('APPS'):
+            return None
+        replicas = _get_setting('REPLICAS')
+        if (
+            not replicas
+            or not _replica_view(state.request)
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or _pinned(state)
+        ):
+            return None
+        if state.replica is None:
+            state.replica = random.choices(list(replicas), weights=list(replicas.values()))[0]
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        if not _get_setting('REPLICAS'):
+            return None
+        shared = model._meta.label in _get_setting('SHARED_MODELS')
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+            state.wrote_shared = state.wrote_shared or shared
+        if shared:
+            _pin_all_users()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *_get_setting('REPLICAS')}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in _get_setting('REPLICAS'):
+            return False
+        return None
+
+
+def _finish(state):
+    """Pin the writer (and, after a catalogue change, everyone) to the primary"""
+    if state.wrote:
+        user_id = _known_user_id(state.request)
+        if user_id is not None:
+            _pin(_user_pin(user_id))
+    if state.wrote_shared:
+        # Again now the transaction has committed
+        _pin_all_users(force=True)
+
+
+class ReplicaRoutingMiddleware:
+    """Make the current request visible to ReplicaRouter"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RequestState(request)
+        token = _current.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
+            _finish(state)
+
+    async def __acall__(self, request):
+        state = RequestState(request)
+        token = _current.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current.reset(token)
+            if state.wrote or state.wrote_shared:
+                # Pins may be written to the database
+                await sync_to_async(_finish)(state)
@@ -45,6 +45,9 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # -------------------------------
 MIDDLEWARE = [
+    # Outermost, so it times everything below it
+    "courses.instrumentation.InstrumentationMiddleware",
+    "pycoder_backend.routers.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
 
@@ -59,21 +62,137 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "pycoder_backend.urls"
 
+INSTRUMENTATION = {
+    # Server-Timing headers with each response's db, serializer and total
+    # time. They tell any client how long queries take, so they are off
+    # unless SERVER_TIMING=1.
+    "SERVER_TIMING": os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes"),
+    # "log" or "raise" when a view runs more queries than its @query_budget
+    "QUERY_BUDGET_ACTION": os.getenv("QUERY_BUDGET_ACTION", "log"),
+}
+
+# MySQL has no partial indexes; courses migrations create composite
+# fallbacks instead (see courses migration 0003), so the warning is expected.
+SILENCED_SYSTEM_CHECKS = ["models.W037"]
+
 
 # -------------------------------
 # DATABASE
 # -------------------------------
+# Each worker process keeps up to DB_POOL_SIZE connections open
+# (pycoder_backend.db_pool) and lends one to each request, pinging it
+# first. Connections are replaced after DB_CONN_MAX_AGE seconds, and a
+# request waits up to DB_POOL_TIMEOUT seconds for a free one.
+# DB_POOL_SIZE=0 uses Django's persistent connections instead, one per
+# thread; set DB_CONN_MAX_AGE=0 with that under ASGI, where every request
+# gets a new thread.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "300"))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        "ENGINE": "pycoder_backend.db_pool" if DB_POOL_SIZE else "django.db.backends.mysql",
         "NAME": os.getenv("DB_NAME"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT", "3306"),
+        # Pooled connections go back to the pool at the end of each request
+        "CONN_MAX_AGE": 0 if DB_POOL_SIZE else DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "POOL": {
+            "MAX_SIZE": DB_POOL_SIZE,
+            "MAX_AGE": DB_CONN_MAX_AGE,
+            "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        },
+    }
+}
+
+# Read replicas: DB_REPLICAS="host[:port][=weight],..." adds replica_1,
+# replica_2, ... with the default database's name and credentials. Views
+# marked @read_from_replica (the catalogue and attempt history) read from
+# one, picked by weight; after a write, that user's reads stay on the
+# primary for DB_REPLICA_PIN_SECONDS, and everyone's do after a catalogue
+# change (see pycoder_backend.routers). With a per-process cache the pins
+# are kept in the database, like the version stamps.
+READ_REPLICAS = {
+    "REPLICAS": {},
+    "PIN_SECONDS": int(os.getenv("DB_REPLICA_PIN_SECONDS", "5")),
+    "CACHE_ALIAS": "default",
+}
+for number, replica in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(",")), 1):
+    address, _, weight = replica.strip().partition("=")
+    host, _, port = address.partition(":")
+    alias = f"replica_{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        # Tests read what they wrote to the test database
+        "TEST": {"MIRROR": "default"},
+    }
+    READ_REPLICAS["REPLICAS"][alias] = int(weight or 1)
+
+DATABASE_ROUTERS = ["pycoder_backend.routers.ReplicaRouter"]
+
+
+# -------------------------------
+# CACHE
+# -------------------------------
+# Local-memory by default; set CACHE_BACKEND to
+# django.core.cache.backends.filebased.FileBasedCache (and CACHE_LOCATION
+# to a directory) to share entries between worker processes. While the
+# cache is per process, the version stamps that invalidate cached answer
+# keys and responses are kept in the database instead (courses.cache).
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "pycoder-cache"),
     }
 }
 
+# Cache-Control max-age (seconds) for the ETag'd catalogue endpoints;
+# 0 makes browsers revalidate every time and get a 304 when unchanged.
+CATALOGUE_MAX_AGE = int(os.getenv("CATALOGUE_MAX_AGE", "0"))
+
+# Full-response cache for the public catalogue endpoints
+RESPONSE_CACHE = {
+    "CACHE_ALIAS": "default",
+    "TIMEOUT": int(os.getenv("RESPONSE_CACHE_TIMEOUT", "300")),
+    "STALE_TIMEOUT": 60,
+    "LOCK_TIMEOUT": 10,
+}
+
+# "auto" uses SQLite FTS5 or MySQL FULLTEXT when available, else the
+# in-process index; "fts5", "mysql" or "python" force one
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+# "auto" keeps sorted leaderboards in memory when sortedcontainers is
+# installed; "database" always ranks with indexed queries
+LEADERBOARD_BACKEND = os.getenv("LEADERBOARD_BACKEND", "auto")
+
+# "auto" renders and parses API JSON with orjson when it is installed;
+# "stdlib" always uses the json module
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+
+QUIZ_ANSWER_KEY_CACHE = {
+    "CACHE_ALIAS": "default",
+    "LOCAL_MAXSIZE": int(os.getenv("QUIZ_ANSWER_KEY_LOCAL_MAXSIZE", "256")),
+    "TIMEOUT": 60 * 60,
+    # Seconds a worker reuses a version stamp read from the database (with
+    # a per-process cache); other workers see a change up to this late.
+    # Keep it below READ_REPLICAS PIN_SECONDS.
+    "STAMP_TTL": float(os.getenv("STAMP_TTL", "1")),
+}
+
+
+# -------------------------------
+# ASYNC SERVING
+# -------------------------------
+# Serve the catalogue endpoints from async views; turn on when running
+# under ASGI (uvicorn workers), see README
+ASYNC_READ_API = os.getenv("ASYNC_READ_API", "").lower() in ("1", "true", "yes")
+
 
 # -------------------------------
 # AUTH SETTINGS
@@ -82,11 +201,26 @@ AUTH_USER_MODEL = "accounts.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    "DEFAULT_PAGINATION_CLASS": "courses.pagination.CreatedAtCursorPagination",
+    "PAGE_SIZE": int(os.getenv("API_PAGE_SIZE", "20")),
+    # JSON through orjson when installed (JSON_BACKEND), else like DRF's own
+    "DEFAULT_RENDERER_CLASSES": [
+        "courses.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "courses.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Proxies in front of the app (Render has one); throttling takes the
+    # client address from X-Forwarded-For accordingly
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "1" if os.getenv("RENDER") else "0")),
 }
 
 SIMPLE_JWT = {
@@ -94,6 +228,78 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    # Rotated tokens are revoked through accounts.revocation rather than
+    # simplejwt's token_blacklist app
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.TokenRefreshSerializer",
+}
+
+REFRESH_TOKEN_REVOCATION = {
+    # Expected unexpired revocations; the filter grows past it on rebuild
+    "CAPACITY": int(os.getenv("REVOCATION_FILTER_CAPACITY", "1000000")),
+    "ERROR_RATE": 0.001,
+    "SYNC_INTERVAL": int(os.getenv("REVOCATION_SYNC_INTERVAL", "5")),
+    "PURGE_INTERVAL": 60 * 60,
+}
+
+# Per-worker cache of the users behind access tokens; 0 disables it. With a
+# per-process cache, a user saved in one worker may stay cached in the others
+# for up to TIMEOUT seconds.
+JWT_USER_CACHE = {
+    "TIMEOUT": int(os.getenv("JWT_USER_CACHE_TIMEOUT", "10")),
+    "MAXSIZE": 10000,
+}
+
+# Password hashing: PASSWORD_HASHER (pbkdf2, scrypt or argon2, which needs
+# argon2-cffi) hashes new passwords; the others still verify old hashes,
+# which are rehashed on the next login, as are hashes made with different
+# parameters. `python manage.py tune_password_hasher` suggests parameters.
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = sorted(
+    [
+        "accounts.hashers.PBKDF2PasswordHasher",
+        "accounts.hashers.ScryptPasswordHasher",
+        "accounts.hashers.Argon2PasswordHasher",
+    ],
+    key=lambda path: PASSWORD_HASHER.lower() not in path.lower(),
+)
+PASSWORD_HASHER_PARAMS = {
+    "PBKDF2_ITERATIONS": int(os.getenv("PBKDF2_ITERATIONS", "600000")),
+    "SCRYPT_WORK_FACTOR": int(os.getenv("SCRYPT_WORK_FACTOR", str(2 ** 14))),
+    "ARGON2_TIME_COST": int(os.getenv("ARGON2_TIME_COST", "2")),
+    "ARGON2_MEMORY_COST": int(os.getenv("ARGON2_MEMORY_COST", "102400")),
+    "ARGON2_PARALLELISM": int(os.getenv("ARGON2_PARALLELISM", "8")),
+}
+
+# Login and registration hash passwords on this many threads per worker;
+# requests beyond QUEUE_SIZE waiting for one get a 503
+AUTH_POOL = {
+    "WORKERS": int(os.getenv("AUTH_POOL_WORKERS", "2")),
+    "QUEUE_SIZE": int(os.getenv("AUTH_POOL_QUEUE_SIZE", "64")),
+}
+
+# Token-bucket rate limits per endpoint, per client address ("ip") and
+# per account ("user", the email for login). "N/period" allows bursts of N
+# requests and refills N per period (sec, min, hour or day). Buckets are
+# shared between workers only when CACHE_ALIAS is a shared cache (Redis,
+# Memcached). With the default local-memory cache every worker has its own
+# buckets, so the effective limits are these rates times the number of
+# workers (gunicorn -w 4 allows 4x); `manage.py check --deploy` warns
+# about it (accounts.W001).
+THROTTLE = {
+    "ENABLED": os.getenv("THROTTLE_ENABLED", "true").lower() in ("1", "true", "yes"),
+    "CACHE_ALIAS": "default",
+    "LOCAL_MAXSIZE": 10000,
+    "POLICIES": {
+        "login": {
+            "ip": os.getenv("THROTTLE_LOGIN_IP_RATE", "30/min"),
+            "user": os.getenv("THROTTLE_LOGIN_USER_RATE", "10/min"),
+        },
+        "register": {"ip": os.getenv("THROTTLE_REGISTER_IP_RATE", "10/hour")},
+        "quiz_submit": {
+            "user": os.getenv("THROTTLE_SUBMIT_USER_RATE", "20/min"),
+            "ip": os.getenv("THROTTLE_SUBMIT_IP_RATE", "120/min"),
+        },
+    },
 }
 
 
@@ -117,3 +323,22 @@ CORS_ALLOW_CREDENTIALS = True
 # STATIC FILES
 # -------------------------------
 STATIC_URL = "static/"
+
+
+# -------------------------------
+# PDF FILES
+# -------------------------------
+# Directory that PDF.file_path is relative to
+PDF_ROOT = os.getenv("PDF_ROOT", str(BASE_DIR.parent / "pdfs"))
+
+# "" streams from Django; "x-accel-redirect" (nginx) or "x-sendfile"
+# (Apache/lighttpd) hands the transfer to the front proxy
+PDF_SENDFILE_MODE = os.getenv("PDF_SENDFILE_MODE", "").lower()
+PDF_ACCEL_REDIRECT_PREFIX = os.getenv("PDF_ACCEL_REDIRECT_PREFIX", "/protected-pdfs/")
+
+PDF_MAX_AGE = int(os.getenv("PDF_MAX_AGE", "3600"))
+
+# First-page thumbnails written by `python manage.py ingest_pdfs`
+PDF_THUMBNAIL_ROOT = os.getenv("PDF_THUMBNAIL_ROOT", str(BASE_DIR / "media" / "pdf-thumbnails"))
+PDF_THUMBNAIL_URL = os.getenv("PDF_THUMBNAIL_URL", "/media/pdf-thumbnails/")
+PDF_THUMBNAIL_WIDTH = 240
@@ -1,11 +1,14 @@
 import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import axiosClient from '../utils/axiosClient'
+import { pagePath } from '../utils/pagination'
 
 const Courses = () => {
   const [courses, setCourses] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
+  const [nextPage, setNextPage] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     fetchCourses()
@@ -21,6 +24,7 @@ const Courses = () => {
       console.log('Courses Data:', coursesData) // Debug log
       
       setCourses(coursesData)
+      setNextPage(pagePath(response.data.next))
       
       if (coursesData.length === 0) {
         setError('No courses available. Please run: python manage.py load_initial_data')
@@ -43,6 +47,19 @@ const Courses = () => {
     }
   }
 
+  const loadMoreCourses = async () => {
+    setLoadingMore(true)
+    try {
+      const response = await axiosClient.get(nextPage)
+      setCourses((loaded) => [...loaded, ...response.data.results])
+      setNextPage(pagePath(response.data.next))
+    } catch (error) {
+      console.error('Error fetching courses:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const getLevelColor = (level) => {
     switch (level) {
       case 'beginner':
@@ -151,6 +168,14 @@ const Courses = () => {
         ))}
       </div>
 
+      {nextPage && (
+        <div className="text-center mt-8">
+          <button onClick={loadMoreCourses} disabled={loadingMore} className="btn-primary">
+            {loadingMore ? 'Loading...' : 'Load more courses'}
+          </button>
+        </div>
+      )}
+
       {courses.length === 0 && (
         <div className="text-center py-12">
           <p className="text-gray-500 dark:text-gray-400">No courses available yet.</p>
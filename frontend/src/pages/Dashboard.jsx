@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { useAuth } from '../contexts/AuthContext'
 import axiosClient from '../utils/axiosClient'
+import { pagePath } from '../utils/pagination'
 
 const Dashboard = () => {
   const { user } = useAuth()
@@ -9,6 +10,8 @@ const Dashboard = () => {
   const [quizzes, setQuizzes] = useState([])
   const [loading, setLoading] = useState(true)
   const [quizzesLoading, setQuizzesLoading] = useState(true)
+  const [nextQuizzes, setNextQuizzes] = useState(null)
+  const [loadingMoreQuizzes, setLoadingMoreQuizzes] = useState(false)
 
   useEffect(() => {
     fetchCourses()
@@ -17,10 +20,11 @@ const Dashboard = () => {
 
   const fetchCourses = async () => {
     try {
-      const response = await axiosClient.get('/api/courses/')
+      // Only the first 6 courses; "View All" leads to the full list
+      const response = await axiosClient.get('/api/courses/?page_size=6')
       // Handle both paginated and non-paginated responses
       const coursesData = response.data.results || response.data || []
-      setCourses(coursesData.slice(0, 6)) // Show first 6 courses
+      setCourses(coursesData.slice(0, 6))
     } catch (error) {
       console.error('Error fetching courses:', error)
       // Show empty state with motivational message instead of fallback data
@@ -32,8 +36,10 @@ const Dashboard = () => {
 
   const fetchQuizzes = async () => {
     try {
-      const response = await axiosClient.get('/api/quizzes/')
-      setQuizzes(response.data.slice(0, 6)) // Show first 6 quizzes
+      const response = await axiosClient.get('/api/quizzes/?page_size=6')
+      const quizzesData = response.data.results || response.data || []
+      setQuizzes(quizzesData)
+      setNextQuizzes(pagePath(response.data.next))
     } catch (error) {
       console.error('Error fetching quizzes:', error)
       setQuizzes([])
@@ -42,6 +48,19 @@ const Dashboard = () => {
     }
   }
 
+  const loadMoreQuizzes = async () => {
+    setLoadingMoreQuizzes(true)
+    try {
+      const response = await axiosClient.get(nextQuizzes)
+      setQuizzes((loaded) => [...loaded, ...response.data.results])
+      setNextQuizzes(pagePath(response.data.next))
+    } catch (error) {
+      console.error('Error fetching quizzes:', error)
+    } finally {
+      setLoadingMoreQuizzes(false)
+    }
+  }
+
   const getLevelColor = (level) => {
     switch (level) {
       case 'beginner':
@@ -223,6 +242,13 @@ const Dashboard = () => {
             ))}
           </div>
         )}
+        {nextQuizzes && !quizzesLoading && (
+          <div className="text-center mt-8">
+            <button onClick={loadMoreQuizzes} disabled={loadingMoreQuizzes} className="btn-primary">
+              {loadingMoreQuizzes ? 'Loading...' : 'Load more quizzes'}
+            </button>
+          </div>
+        )}
         {quizzes.length === 0 && !quizzesLoading && (
           <div className="text-center py-12 card bg-gradient-to-r from-purple-50 to-pink-50 dark:from-purple-900/20 dark:to-pink-900/20 border-purple-200 dark:border-purple-700">
             <div className="text-6xl mb-4">📝</div>
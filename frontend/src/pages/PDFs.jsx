@@ -1,11 +1,14 @@
 import { useState, useEffect } from 'react'
 import axiosClient from '../utils/axiosClient'
+import { pagePath } from '../utils/pagination'
 
 const PDFs = () => {
   const [pdfs, setPdfs] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
   const [filter, setFilter] = useState('all')
+  const [nextPage, setNextPage] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     fetchPDFs()
@@ -14,7 +17,8 @@ const PDFs = () => {
   const fetchPDFs = async () => {
     try {
       const response = await axiosClient.get('/api/pdfs/')
-      setPdfs(response.data)
+      setPdfs(response.data.results || response.data || [])
+      setNextPage(pagePath(response.data.next))
     } catch (error) {
       setError('Failed to load PDFs')
       console.error('Error fetching PDFs:', error)
@@ -23,6 +27,20 @@ const PDFs = () => {
     }
   }
 
+  const loadMorePDFs = async () => {
+    setLoadingMore(true)
+    try {
+      const response = await axiosClient.get(nextPage)
+      setPdfs((loaded) => [...loaded, ...response.data.results])
+      setNextPage(pagePath(response.data.next))
+    } catch (error) {
+      setError('Failed to load more PDFs')
+      console.error('Error fetching PDFs:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const filteredPDFs = filter === 'all' 
     ? pdfs 
     : pdfs.filter(pdf => pdf.course === parseInt(filter))
@@ -91,6 +109,14 @@ const PDFs = () => {
         ))}
       </div>
 
+      {nextPage && (
+        <div className="text-center mt-8">
+          <button onClick={loadMorePDFs} disabled={loadingMore} className="btn-primary">
+            {loadingMore ? 'Loading...' : 'Load more PDFs'}
+          </button>
+        </div>
+      )}
+
       {filteredPDFs.length === 0 && (
         <div className="text-center py-12">
           <p className="text-gray-500 dark:text-gray-400">
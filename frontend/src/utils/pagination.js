@@ -0,0 +1,7 @@
+// Paginated endpoints link to the next page with an absolute URL; keep only
+// its path and query so the request goes through axiosClient's base URL
+export const pagePath = (url) => {
+  if (!url) return null
+  const { pathname, search } = new URL(url, window.location.origin)
+  return `${pathname}${search}`
+}